@@ -0,0 +1,2 @@
+# This file can be left empty.
+# It marks the 'cli' directory as a Python package.
@@ -0,0 +1,286 @@
+"""
+Bulk enrollment of a whole cohort from a CSV roster and a directory of photos.
+
+The roster needs `roll_number`, `name` and `email` columns, and may have
+`class` and `password` columns (otherwise --default-password is used). Photos
+are found under the photo directory either in a sub-directory named after the
+roll number (photos/1001/*.jpg) or as files named after it (photos/1001.jpg,
+photos/1001_2.jpg).
+
+Students missing from the database are created with bulk inserts. Faces are
+extracted on every core with the same pipeline as save_face_images, the
+samples are stored, and the model is trained once at the end.
+
+Progress is appended to a state file (default: <roster>.state.jsonl), so an
+interrupted import picks up after the last enrolled student when re-run.
+
+Usage:
+    python -m app.cli.bulk_enroll roster.csv photos/ [--default-password PW]
+        [--workers N] [--state PATH] [--full-train | --no-train]
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, List
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from ..database.connection import SessionLocal
+from ..models.attendance import Student, User, UserRole
+from ..services import face_rec_service
+from ..services.auth_service import get_password_hash
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+# Rows per bulk insert.
+INSERT_CHUNK_SIZE = 1000
+
+
+# --- Roster ---
+def read_roster(path: str, default_password: str = None):
+    """Returns (students, failures) from the CSV roster; invalid rows become failures."""
+    students, failures, seen, seen_emails = [], [], set(), set()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            row = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+            roll_number = row.get("roll_number", "")
+            missing = [column for column in ("roll_number", "name", "email") if not row.get(column)]
+            if not row.get("password") and not default_password:
+                missing.append("password")
+            if missing:
+                failures.append({"roll_number": roll_number, "reason": f"Line {line}: missing {', '.join(missing)}."})
+            elif roll_number in seen:
+                failures.append({"roll_number": roll_number, "reason": f"Line {line}: duplicate roll number."})
+            elif row["email"].lower() in seen_emails:
+                failures.append({"roll_number": roll_number, "reason": f"Line {line}: duplicate email."})
+            else:
+                seen.add(roll_number)
+                seen_emails.add(row["email"].lower())
+                students.append({
+                    "roll_number": roll_number,
+                    "name": row["name"],
+                    "email": row["email"],
+                    "student_class": row.get("class") or None,
+                    "password": row.get("password") or default_password,
+                })
+    return students, failures
+
+
+def create_students(students: List[dict], workers: int):
+    """
+    Inserts the roster students missing from the database, in bulk.
+    Returns (created count, failures); students whose email belongs to a
+    different user are failures and are removed from `students`.
+    """
+    created, failures = 0, []
+    # Hash each distinct password once; bcrypt releases the GIL, so threads parallelize it.
+    passwords = sorted({student["password"] for student in students})
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        hashes = dict(zip(passwords, executor.map(get_password_hash, passwords)))
+
+    db = SessionLocal()
+    try:
+        for start in range(0, len(students), INSERT_CHUNK_SIZE):
+            chunk = students[start:start + INSERT_CHUNK_SIZE]
+            existing_rolls = set(db.scalars(
+                select(Student.rollNumber).where(Student.rollNumber.in_([s["roll_number"] for s in chunk]))
+            ))
+            # Lower-cased: MySQL's default collation compares emails case-insensitively.
+            taken_emails = {
+                email.lower() for email in db.scalars(select(User.email).where(User.email.in_([s["email"] for s in chunk])))
+            }
+
+            new = []
+            for student in chunk:
+                if student["roll_number"] in existing_rolls:
+                    continue
+                if student["email"].lower() in taken_emails:
+                    failures.append({"roll_number": student["roll_number"], "reason": "Email already registered."})
+                    continue
+                new.append(student)
+            if not new:
+                continue
+
+            # Joined-table inheritance: the user rows first, then the student rows keyed by their IDs.
+            db.execute(User.__table__.insert(), [
+                {"name": s["name"], "email": s["email"], "hashed_password": hashes[s["password"]],
+                 "role": UserRole.student}
+                for s in new
+            ])
+            user_ids = dict(db.execute(
+                select(User.email, User.userID).where(User.email.in_([s["email"] for s in new]))
+            ).all())
+            db.execute(Student.__table__.insert(), [
+                {"studentID": user_ids[s["email"]], "rollNumber": s["roll_number"], "class": s["student_class"]}
+                for s in new
+            ])
+            db.commit()
+            created += len(new)
+    finally:
+        db.close()
+
+    failed = {failure["roll_number"] for failure in failures}
+    students[:] = [student for student in students if student["roll_number"] not in failed]
+    return created, failures
+
+
+def find_photos(photo_dir: str) -> Dict[str, List[str]]:
+    """Maps each roll number to its photo paths (see the module docstring for the layout)."""
+    photos: Dict[str, List[str]] = {}
+    for entry in sorted(os.listdir(photo_dir)):
+        path = os.path.join(photo_dir, entry)
+        if os.path.isdir(path):
+            photos.setdefault(entry, []).extend(
+                os.path.join(path, file) for file in sorted(os.listdir(path))
+                if file.lower().endswith(IMAGE_EXTENSIONS) and not file.startswith(".")
+            )
+        elif entry.lower().endswith(IMAGE_EXTENSIONS) and not entry.startswith("."):
+            roll_number = os.path.splitext(entry)[0].split("_", 1)[0]
+            photos.setdefault(roll_number, []).append(path)
+    return photos
+
+
+# --- Face extraction (worker processes) ---
+def _warm_detector():
+    """Worker initializer: loads the Haar cascade before the first student arrives."""
+    from ..services.model_registry import registry
+    try:
+        registry.get_detector()
+    except HTTPException:
+        # Missing cascade: every photo will report it.
+        pass
+
+
+def extract_student_faces(paths: List[str]):
+    """Worker job: returns (face crops, per-photo errors) for one student's photos."""
+    crops, errors = [], []
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                faces = face_rec_service.extract_faces(f.read())
+        except (HTTPException, OSError) as e:
+            errors.append(f"{os.path.basename(path)}: {getattr(e, 'detail', None) or e}")
+            continue
+        if not faces:
+            errors.append(f"{os.path.basename(path)}: no face detected.")
+        crops.extend(faces)
+    return crops, errors
+
+
+# --- Resume state ---
+def load_state(path: str):
+    """Returns (enrolled roll numbers, whether they include students not yet trained)."""
+    enrolled, untrained = set(), False
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by an interruption.
+                    continue
+                if entry.get("event") == "trained":
+                    untrained = False
+                elif entry.get("event") == "enrolled":
+                    enrolled.add(entry["roll_number"])
+                    untrained = True
+    return enrolled, untrained
+
+
+def append_state(state_file, entry: dict):
+    state_file.write(json.dumps(entry) + "\n")
+    state_file.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enroll a cohort of students from a CSV roster and their photos.")
+    parser.add_argument("roster", help="CSV with roll_number, name, email and optionally class, password.")
+    parser.add_argument("photos", help="Directory of student photos.")
+    parser.add_argument("--default-password", help="Password for roster rows without one.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Face extraction processes.")
+    parser.add_argument("--state", help="Resume state file (default: <roster>.state.jsonl).")
+    training = parser.add_mutually_exclusive_group()
+    training.add_argument("--full-train", action="store_true", help="Rebuild the model from scratch at the end.")
+    training.add_argument("--no-train", action="store_true", help="Don't train at the end.")
+    args = parser.parse_args()
+
+    state_path = args.state or f"{args.roster}.state.jsonl"
+    started = time.perf_counter()
+
+    students, failures = read_roster(args.roster, args.default_password)
+    created, insert_failures = create_students(students, args.workers)
+    failures.extend(insert_failures)
+    print(f"Roster: {len(students)} students, {created} created in the database "
+          f"({time.perf_counter() - started:.1f}s).", flush=True)
+
+    enrolled, untrained = load_state(state_path)
+    photos = find_photos(args.photos)
+    todo = []
+    for student in students:
+        if student["roll_number"] in enrolled:
+            continue
+        if not photos.get(student["roll_number"]):
+            failures.append({"roll_number": student["roll_number"], "reason": "No photos found."})
+            continue
+        todo.append(student)
+    if enrolled:
+        print(f"Resuming: {len(enrolled)} students already enrolled, {len(todo)} to go.", flush=True)
+
+    enroll_started = time.perf_counter()
+    images = samples = done = 0
+    with open(state_path, "a") as state_file, ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_warm_detector,
+    ) as executor:
+        queue = iter(todo)
+        pending = {}
+        while True:
+            # Keep a few students per worker in flight, so crops don't pile up in memory.
+            for student in queue:
+                paths = photos[student["roll_number"]]
+                pending[executor.submit(extract_student_faces, paths)] = student
+                if len(pending) >= args.workers * 4:
+                    break
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                student = pending.pop(future)
+                roll_number = student["roll_number"]
+                crops, errors = future.result()
+                images += len(photos[roll_number])
+                if not crops:
+                    failures.append({"roll_number": roll_number, "reason": "; ".join(errors) or "No face detected."})
+                    continue
+                saved = face_rec_service.store_face_samples(roll_number, student["name"], crops)
+                samples += len(saved)
+                done += 1
+                untrained = True
+                append_state(state_file, {"event": "enrolled", "roll_number": roll_number, "samples": len(saved),
+                                          "photo_errors": errors})
+                if done % 100 == 0:
+                    elapsed = time.perf_counter() - enroll_started
+                    print(f"Enrolled {done}/{len(todo)} students ({images / elapsed:.1f} images/s).", flush=True)
+
+        elapsed = max(time.perf_counter() - enroll_started, 1e-9)
+        print(f"Enrolled {done} students: {images} photos, {samples} samples in {elapsed:.1f}s "
+              f"({images / elapsed:.1f} images/s, {done / elapsed:.1f} students/s).", flush=True)
+
+        if untrained and not args.no_train:
+            train_started = time.perf_counter()
+            result = face_rec_service.train_model(full=args.full_train)
+            append_state(state_file, {"event": "trained"})
+            print(f"Model trained in {time.perf_counter() - train_started:.1f}s: {result}", flush=True)
+
+    for failure in failures:
+        print(f"FAILED {failure['roll_number'] or '(no roll number)'}: {failure['reason']}")
+    print(f"Done in {time.perf_counter() - started:.1f}s with {len(failures)} failures.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Creates the database schema, or brings an existing one up to date.
+
+Usage:
+    python -m app.cli.migrate_db [--rebuild-rollup]
+"""
+import argparse
+
+from ..database import migrations
+from ..database.connection import engine, SessionLocal
+from ..services import attendance_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply schema migrations to the configured database.")
+    parser.add_argument("--rebuild-rollup", action="store_true",
+                        help="Also recompute the attendance_daily rollup from attendance_record.")
+    args = parser.parse_args()
+
+    migrations.run_all(engine)
+    print("Schema is up to date.")
+
+    if args.rebuild_rollup:
+        db = SessionLocal()
+        try:
+            rows = attendance_service.rebuild_attendance_rollup(db)
+        finally:
+            db.close()
+        print(f"Attendance rollup rebuilt with {rows} rows.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+One-shot migration of the TrainingImage tree into the packed sample store.
+
+Usage:
+    python -m app.cli.migrate_samples [--rebuild]
+"""
+import argparse
+import time
+
+from ..services import face_rec_service
+from ..services.sample_store import sample_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the TrainingImage tree into the sample store.")
+    parser.add_argument("--rebuild", action="store_true", help="Discard the existing store and re-import every image.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.rebuild:
+        sample_store.reset()
+
+    def report(phase, loaded=0, total=0):
+        print(f"{phase}: {loaded}/{total} images", flush=True)
+
+    count = face_rec_service.sync_sample_store(progress=report)
+    print(f"Sample store holds {count} samples ({time.perf_counter() - started:.1f}s).")
+
+
+if __name__ == "__main__":
+    main()
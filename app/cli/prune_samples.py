@@ -0,0 +1,59 @@
+"""
+Prunes near-duplicate and over-budget samples from the TrainingImage tree.
+
+Each student's samples are re-selected the way enrollment selects new crops
+(see app.services.sample_selection); the rest are deleted, the sample store is
+synced, and the model can be retrained from the pruned tree.
+
+Usage:
+    python -m app.cli.prune_samples [--dry-run] [--budget N] [--distance BITS] [--train]
+"""
+import argparse
+import os
+import time
+
+from .. import config
+from ..services import face_rec_service
+from ..services.sample_selection import plan_prune
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drop near-duplicate and over-budget training samples.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted.")
+    parser.add_argument("--budget", type=int, default=config.SAMPLES_PER_STUDENT,
+                        help="Samples to keep per student (default: SAMPLES_PER_STUDENT).")
+    parser.add_argument("--distance", type=int, default=config.SAMPLE_DUPLICATE_MAX_DISTANCE,
+                        help="Near-duplicate dHash distance in bits (default: SAMPLE_DUPLICATE_MAX_DISTANCE).")
+    parser.add_argument("--train", action="store_true", help="Retrain the model from scratch afterwards.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    root = config.TRAINING_IMAGE_DIR
+    students = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))) if os.path.isdir(root) else []
+    removed = 0
+    for student in students:
+        student_dir = os.path.join(root, student)
+        drop = plan_prune(student_dir, args.budget, args.distance)
+        if not drop:
+            continue
+        print(f"{student}: {'would remove' if args.dry_run else 'removing'} {len(drop)} samples", flush=True)
+        if not args.dry_run:
+            for file in drop:
+                os.remove(os.path.join(student_dir, file))
+        removed += len(drop)
+
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(f"{verb} {removed} samples across {len(students)} students ({time.perf_counter() - started:.1f}s).")
+    if args.dry_run:
+        return
+
+    if removed:
+        count = face_rec_service.sync_sample_store()
+        print(f"Sample store holds {count} samples.")
+    if args.train:
+        face_rec_service.train_model(full=True)
+        print("Model retrained.")
+
+
+if __name__ == "__main__":
+    main()
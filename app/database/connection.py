@@ -1,14 +1,107 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Optional
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .. import config
+from ..utils import metrics
+
+
+class PoolCheckoutStats:
+    """Counts pool checkouts and how long callers waited for a connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "total_wait_seconds": round(self.total_wait, 6),
+                "mean_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else None,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+pool_stats = {"sync": PoolCheckoutStats(), "async": PoolCheckoutStats()}
+
+
+class _TimedCheckout:
+    """Pool mixin that records how long each checkout waited for a connection."""
+
+    stats: PoolCheckoutStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    stats = pool_stats["sync"]
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    stats = pool_stats["async"]
+
+
+def _engine_options(url: str, poolclass) -> dict:
+    """Pool settings from the config; SQLite keeps SQLAlchemy's defaults."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+
+
+def async_database_url() -> str:
+    """The async-driver equivalent of DATABASE_URL, unless set explicitly."""
+    if config.ASYNC_DATABASE_URL:
+        return config.ASYNC_DATABASE_URL
+    url = make_url(config.DATABASE_URL)
+    backend = url.get_backend_name()
+    if backend == "mysql":
+        return url.set(drivername="mysql+aiomysql").render_as_string(hide_password=False)
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    raise RuntimeError(f"No async driver configured for '{backend}'; set ASYNC_DATABASE_URL.")
+
 
 # --- ENGINE CREATION CHANGE ---
 # Create the SQLAlchemy engine for MySQL
 # The 'connect_args' argument for SQLite has been removed.
 engine = create_engine(
-    config.DATABASE_URL
+    config.DATABASE_URL,
+    **_engine_options(config.DATABASE_URL, TimedQueuePool)
 )
+metrics.instrument_engine(engine)
 
 # Create a session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -20,9 +113,64 @@ def get_db():
     """
     FastAPI dependency to get a database session for a request.
     Ensures the session is closed after the request is finished.
+    Use it from sync (def) routes, which FastAPI runs in its threadpool.
     """
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# --- Async engine ---
+# Created on first use, so the async driver is only needed if async routes run.
+# Only the auth routes (register, login) use it: their handlers are plain
+# queries that await password hashing in between. Every other DB-bound route
+# goes through the attendance and enrollment services, which the CLI tools,
+# the ingest thread and the benchmarks share and which therefore stay
+# synchronous; those routes are sync or hand the service call to the
+# threadpool, so they don't block the event loop either.
+_async_engine = None
+_async_sessionmaker = None
+_async_lock = threading.Lock()
+
+def async_engine_unavailable() -> Optional[str]:
+    """Why the async engine can't be created (no URL or driver), or None if it can."""
+    try:
+        make_url(async_database_url()).get_dialect().import_dbapi()
+    except (RuntimeError, ImportError) as e:
+        return str(e)
+    return None
+
+def get_async_sessionmaker():
+    global _async_engine, _async_sessionmaker
+    if _async_sessionmaker is None:
+        with _async_lock:
+            if _async_sessionmaker is None:
+                from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+                url = async_database_url()
+                _async_engine = create_async_engine(url, **_engine_options(url, TimedAsyncQueuePool))
+                metrics.instrument_engine(_async_engine.sync_engine)
+                _async_sessionmaker = async_sessionmaker(
+                    _async_engine, autoflush=False, expire_on_commit=False
+                )
+    return _async_sessionmaker
+
+async def get_async_db():
+    """
+    FastAPI dependency for async (async def) routes: an AsyncSession, so
+    queries are awaited instead of blocking the event loop.
+    """
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+async def dispose_async_engine():
+    """Closes the async pool's connections (on shutdown)."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+def pool_status() -> dict:
+    """Pool occupancy and checkout wait statistics for both engines."""
+    status = {"sync": {"pool": engine.pool.status(), **pool_stats["sync"].snapshot()}}
+    if _async_engine is not None:
+        status["async"] = {"pool": _async_engine.pool.status(), **pool_stats["async"].snapshot()}
+    return status
@@ -0,0 +1,91 @@
+"""
+Schema migrations for databases created before a model change.
+Each migration is idempotent, so running it twice is harmless.
+"""
+from sqlalchemy import exists, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .connection import Base
+from ..models.attendance import AttendanceDaily, AttendanceRecord
+from ..services.attendance_service import rebuild_attendance_rollup
+
+
+def add_attendance_date(engine: Engine):
+    """
+    Adds attendance_record.attendance_date, backfills it from the timestamp,
+    removes duplicate (student, subject, day) rows left by the old
+    read-then-write marking (keeping the earliest), and creates the composite
+    indexes, including the unique one the idempotent upsert relies on.
+    """
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("attendance_record")}
+    existing_indexes = {index["name"] for index in inspector.get_indexes("attendance_record")}
+    dialect = engine.dialect.name
+
+    with engine.begin() as conn:
+        if "attendance_date" not in columns:
+            conn.execute(text("ALTER TABLE attendance_record ADD COLUMN attendance_date DATE"))
+
+        conn.execute(text(
+            "UPDATE attendance_record SET attendance_date = DATE(timestamp) WHERE attendance_date IS NULL"
+        ))
+
+        if dialect == "mysql":
+            conn.execute(text(
+                "DELETE newer FROM attendance_record newer "
+                "JOIN attendance_record older "
+                "ON newer.studentID = older.studentID AND newer.subjectID = older.subjectID "
+                "AND newer.attendance_date = older.attendance_date AND newer.recordID > older.recordID"
+            ))
+            conn.execute(text("ALTER TABLE attendance_record MODIFY attendance_date DATE NOT NULL"))
+        else:
+            conn.execute(text(
+                "DELETE FROM attendance_record WHERE recordID NOT IN ("
+                "SELECT MIN(recordID) FROM attendance_record "
+                "GROUP BY studentID, subjectID, attendance_date)"
+            ))
+
+        for index in AttendanceRecord.__table__.indexes:
+            if index.name not in existing_indexes:
+                index.create(conn)
+
+
+def widen_attendance_timestamp(engine: Engine):
+    """
+    Gives attendance_record.timestamp microsecond precision on MySQL, which
+    marking needs to recognize the rows it inserted. Other databases already
+    keep microseconds.
+    """
+    if engine.dialect.name != "mysql":
+        return
+    column = next(c for c in inspect(engine).get_columns("attendance_record") if c["name"] == "timestamp")
+    if getattr(column["type"], "fsp", None) == 6:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(
+            "ALTER TABLE attendance_record MODIFY timestamp DATETIME(6) NULL DEFAULT CURRENT_TIMESTAMP(6)"
+        ))
+
+
+def fill_attendance_rollup(engine: Engine):
+    """
+    Fills attendance_daily from attendance_record when the rollup is empty but
+    there are records, i.e. on the first run after the rollup was introduced,
+    so the summary covers the history marked before it.
+    """
+    with Session(engine) as db:
+        if db.scalar(select(exists().select_from(AttendanceDaily))):
+            return
+        if not db.scalar(select(exists().select_from(AttendanceRecord))):
+            return
+        rows = rebuild_attendance_rollup(db)
+    print(f"Attendance rollup filled with {rows} rows.")
+
+
+def run_all(engine: Engine):
+    """Creates missing tables, then applies every migration."""
+    Base.metadata.create_all(bind=engine)
+    add_attendance_date(engine)
+    widen_attendance_timestamp(engine)
+    fill_attendance_rollup(engine)
@@ -0,0 +1,65 @@
+from sqlalchemy import Table, select, tuple_
+from sqlalchemy.orm import Session
+from typing import List, Sequence, Set
+
+
+def insert_ignoring_duplicates(db: Session, table: Table, rows: List[dict]) -> int:
+    """
+    Inserts rows in one statement, skipping any that would violate a unique key.
+
+    Uses INSERT ... ON DUPLICATE KEY UPDATE with a no-op update on MySQL and
+    INSERT ... ON CONFLICT DO NOTHING on SQLite/PostgreSQL, so concurrent writers
+    marking the same row never fail or create duplicates. Returns the driver's
+    affected-row count.
+    """
+    if not rows:
+        return 0
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        column = list(table.primary_key.columns)[0]
+        # "SET pk = pk" leaves the existing row untouched.
+        stmt = insert(table).on_duplicate_key_update({column.name: column})
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).on_conflict_do_nothing()
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).on_conflict_do_nothing()
+    else:
+        stmt = table.insert()
+
+    return db.execute(stmt, rows).rowcount
+
+
+def insert_new_rows(db: Session, table: Table, rows: List[dict], key_columns: Sequence[str],
+                    marker_column: str) -> Set[tuple]:
+    """
+    Inserts rows like insert_ignoring_duplicates, in one statement, and returns
+    the `key_columns` values of the rows that were actually inserted.
+
+    On SQLite and PostgreSQL the INSERT ... ON CONFLICT DO NOTHING returns
+    them itself. MySQL has no RETURNING (and its affected-row count doesn't
+    tell which rows were new), so there one SELECT afterwards finds the rows
+    whose `marker_column` holds the value this call wrote (a timestamp), which
+    a row kept from an earlier insert doesn't. Errors other than duplicate keys,
+    e.g. a foreign key violation, propagate.
+    """
+    if not rows:
+        return set()
+
+    dialect = db.get_bind().dialect
+    columns = [table.c[name] for name in key_columns]
+    if dialect.name in ("sqlite", "postgresql") and dialect.insert_executemany_returning:
+        if dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).on_conflict_do_nothing().returning(*columns)
+        return {tuple(row) for row in db.execute(stmt, rows)}
+
+    insert_ignoring_duplicates(db, table, rows)
+    names = list(key_columns) + [marker_column]
+    written = tuple_(*columns, table.c[marker_column]).in_([tuple(row[name] for name in names) for row in rows])
+    return {tuple(row) for row in db.execute(select(*columns).where(written))}
@@ -1,9 +1,10 @@
-from sqlalchemy import (Column, Integer, String, DateTime, ForeignKey, 
-                        Enum as SQLAlchemyEnum)
+from sqlalchemy import (Column, Integer, String, Date, DateTime, ForeignKey,
+                        Index, Enum as SQLAlchemyEnum)
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
 from ..database.connection import Base
 import enum
+from datetime import date, datetime
 
 # Enum for user roles
 class UserRole(str, enum.Enum):
@@ -22,8 +23,9 @@ class User(Base):
     # Relationship for subjects taught by this user (if they are a teacher)
     subjects_taught = relationship("Subject", back_populates="teacher")
 
+    # Plain users are teachers; students are mapped by the Student subclass.
     __mapper_args__ = {
-        "polymorphic_identity": "user",
+        "polymorphic_identity": UserRole.teacher,
         "polymorphic_on": role,
     }
 
@@ -55,8 +57,33 @@ class AttendanceRecord(Base):
     recordID = Column(Integer, primary_key=True, index=True)
     studentID = Column(Integer, ForeignKey("student.studentID"), nullable=False)
     subjectID = Column(Integer, ForeignKey("subject.subjectID"), nullable=False)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    # Microseconds on MySQL too (its DATETIME defaults to whole seconds): marking
+    # recognizes the rows it inserted by their timestamp. Set by the app, since
+    # MySQL won't take DEFAULT now() on a DATETIME(6).
+    timestamp = Column(DateTime(timezone=True).with_variant(mysql.DATETIME(fsp=6), "mysql"), default=datetime.now)
+    # The day the attendance counts for, stored so it can be indexed.
+    attendance_date = Column(Date, nullable=False, default=date.today)
     isPresent = Column(String(255), default=True)
 
     student = relationship("Student", back_populates="attendances")
-    subject = relationship("Subject", back_populates="attendance_records")
\ No newline at end of file
+    subject = relationship("Subject", back_populates="attendance_records")
+
+    __table_args__ = (
+        # One record per student, subject and day; marking upserts against it.
+        Index("uq_attendance_record_student_subject_date", "studentID", "subjectID", "attendance_date", unique=True),
+        Index("ix_attendance_record_subject_date", "subjectID", "attendance_date"),
+    )
+
+class AttendanceDaily(Base):
+    """
+    Rollup of attendance_record: one row per (subject, day, student) present.
+    Kept up to date when attendance is marked; the summary is computed from it.
+    """
+    __tablename__ = "attendance_daily"
+    subjectID = Column(Integer, ForeignKey("subject.subjectID"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    studentID = Column(Integer, ForeignKey("student.studentID"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_attendance_daily_subject_student_day", "subjectID", "studentID", "day"),
+    )
@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+from starlette.concurrency import run_in_threadpool
 
 from ..database.connection import get_db
+from ..models.attendance import User
 from ..services import attendance_service
-from ..utils import image_utils
+from ..services.attendance_stream import AttendanceStream
+from ..services.auth_service import get_current_user
+from ..utils.metrics import STAGE_SECONDS
 
 router = APIRouter(
     prefix="/attendance",
@@ -14,6 +22,7 @@ router = APIRouter(
 async def mark_attendance_endpoint(
     subject: str = Form(...),
     image_file: UploadFile = File(...),
+    student_class: Optional[str] = Form(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -21,22 +30,207 @@ async def mark_attendance_endpoint(
 
     - **subject**: The subject for which attendance is being taken (e.g., 'Math').
     - **image_file**: An image containing faces of students.
+    - **student_class**: Optional class attending the lecture. Faces are then only
+      matched against that class's students.
     """
     if not image_file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File provided is not an image.")
         
-    cv2_image = await image_utils.to_cv2_image(image_file)
-    
-    return attendance_service.mark_attendance(db=db, subject=subject, image=cv2_image)
+    with STAGE_SECONDS.time("upload_read"):
+        contents = await image_file.read()
+
+    # Detection and recognition are CPU-bound, so they run in the worker pool;
+    # the database work then runs in the threadpool, off the event loop.
+    with STAGE_SECONDS.time("recognition_job"):
+        predictions = await attendance_service.recognize_upload(contents, student_class)
+
+    return await run_in_threadpool(
+        attendance_service.record_attendance, db=db, subject=subject, predictions=predictions
+    )
+
+
+@router.post("/mark-batch")
+async def mark_attendance_batch_endpoint(
+    subject: str = Form(...),
+    image_files: List[UploadFile] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    student_class: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Mark attendance from several photos of one session (e.g. one per row of a hall).
+
+    - **subject**: The subject for which attendance is being taken.
+    - **image_files**: Any number of images, and/or
+    - **archive**: A zip archive of images.
+    - **student_class**: Optional class attending the lecture.
+
+    Students recognized in several photos are marked once, with their best
+    confidence. Returns a per-image report and the merged roster.
+    """
+    uploads = []
+    for image_file in image_files or []:
+        if not image_file.content_type.startswith("image/"):
+            raise HTTPException(status_code=400, detail=f"File '{image_file.filename}' is not an image.")
+        uploads.append((image_file.filename, await image_file.read()))
+    if archive is not None:
+        contents = await archive.read()
+        uploads.extend(await run_in_threadpool(attendance_service.unpack_image_archive, contents))
+
+    return await attendance_service.mark_attendance_batch(
+        db=db, subject=subject, uploads=uploads, student_class=student_class
+    )
+
+
+@router.websocket("/stream")
+async def attendance_stream_endpoint(
+    websocket: WebSocket,
+    subject: str,
+    student_class: Optional[str] = None,
+):
+    """
+    Mark attendance from a stream of video frames.
+
+    Connect with `?subject=...` (and optionally `&student_class=...`), then send
+    each frame as a binary message holding an encoded image. Faces are tracked
+    across frames and only new faces are recognized. The server replies with an
+    `attendance` event for every student marked and a `frame` event per frame
+    processed. Frames that arrive while the previous one is still being
+    processed replace each other, so only the latest is processed and latency
+    stays bounded; the number skipped is reported as `dropped`.
+    """
+    await websocket.accept()
+    stream = AttendanceStream(subject=subject, student_class=student_class)
+    try:
+        await stream.open()
+    except HTTPException as e:
+        await websocket.send_json({"event": "error", "status": e.status_code, "detail": e.detail})
+        await websocket.close(code=1008)
+        return
+
+    latest = None
+    dropped = 0
+    frame_ready = asyncio.Event()
+
+    async def receive_frames():
+        nonlocal latest, dropped
+        while True:
+            contents = await websocket.receive_bytes()
+            if latest is not None:
+                dropped += 1
+            latest = contents
+            frame_ready.set()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            waiter = asyncio.create_task(frame_ready.wait())
+            await asyncio.wait({waiter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                # The client disconnected (or sent something other than a frame).
+                waiter.cancel()
+                receiver.exception()
+                break
+            frame_ready.clear()
+            contents, latest = latest, None
+
+            try:
+                events = await stream.process(contents)
+            except HTTPException as e:
+                events = [{"event": "error", "status": e.status_code, "detail": e.detail}]
+            events[-1]["dropped"] = dropped
+            for event in events:
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+
+
+@router.get("/cache-stats")
+def recognition_cache_stats(current_user: User = Depends(get_current_user)):
+    """Hit/miss counters of the recognition result cache. (Protected endpoint)"""
+    if current_user.role not in ['admin', 'teacher']:
+        raise HTTPException(status_code=403, detail="Not authorized to view cache statistics.")
+    return attendance_service.recognition_cache.stats()
 
 
 @router.get("/summary/{subject}")
-def get_attendance_summary_endpoint(subject: str, db: Session = Depends(get_db)):
+def get_attendance_summary_endpoint(
+    subject: str,
+    student_class: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
     """
     Get a summary of attendance for a specific subject.
     Calculates the attendance percentage for each registered student.
+
+    - **student_class**: Only include students of this class.
+    - **start_date** / **end_date**: Only count class days in this range (inclusive).
+    - **offset** / **limit**: Page through the students, ordered by roll number.
     """
-    summary = attendance_service.get_attendance_summary(db=db, subject=subject)
+    summary = attendance_service.get_attendance_summary(
+        db=db, subject=subject, student_class=student_class,
+        start_date=start_date, end_date=end_date, offset=offset, limit=limit,
+    )
     if not summary:
         raise HTTPException(status_code=404, detail=f"No student or attendance data found for subject '{subject}'.")
-    return summary
\ No newline at end of file
+    return summary
+
+
+@router.post("/summary/rebuild")
+def rebuild_attendance_summary_endpoint(
+    subject: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Recompute the daily attendance rollup behind the summary from the raw
+    attendance records, for one subject or (without `subject`) all of them.
+    (Protected endpoint)
+    """
+    if current_user.role not in ['admin', 'teacher']:
+        raise HTTPException(status_code=403, detail="Not authorized to rebuild the attendance summary.")
+    rows = attendance_service.rebuild_attendance_rollup(db=db, subject=subject)
+    return {"message": f"Attendance rollup rebuilt with {rows} rows."}
+
+
+@router.get("/export")
+def export_attendance_endpoint(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    subject: Optional[str] = None,
+    student_class: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream attendance records (with student and subject) as CSV or NDJSON.
+    (Protected endpoint)
+
+    - **format**: `csv` or `ndjson`.
+    - **subject** / **student_class**: Only export this subject / class.
+    - **start_date** / **end_date**: Only export records in this range (inclusive).
+
+    Rows are read and sent in chunks, so exports of any size use constant memory.
+    """
+    if current_user.role not in ['admin', 'teacher']:
+        raise HTTPException(status_code=403, detail="Not authorized to export attendance.")
+    subject_id = attendance_service.resolve_export_subject(subject)
+
+    chunks = attendance_service.iter_attendance_records(
+        subject_id=subject_id, student_class=student_class, start_date=start_date, end_date=end_date,
+    )
+    if format == "csv":
+        body, media_type = attendance_service.export_csv(chunks), "text/csv"
+    else:
+        body, media_type = attendance_service.export_ndjson(chunks), "application/x-ndjson"
+    label = "".join(c if c.isalnum() or c in "-_" else "_" for c in subject or "all")
+    filename = f"attendance-{label}.{format}"
+    return StreamingResponse(
+        body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
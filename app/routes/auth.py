@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
-from ..database.connection import get_db
+from ..database.connection import get_async_db
 from ..services import auth_service
 from ..models.attendance import User, Student, UserRole
 
@@ -27,7 +28,7 @@ async def registration_page(request: Request):
 # --- API Logic Routes ---
 @router.post("/register")
 async def register_user_submit(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     name: str = Form(...),
     email: str = Form(...),
     password: str = Form(...),
@@ -36,12 +37,12 @@ async def register_user_submit(
     studentClass: Optional[str] = Form(None)
 ):
     """Handles submission of the registration form."""
-    db_user = db.query(User).filter(User.email == email).first()
+    db_user = (await db.execute(select(User.userID).where(User.email == email))).first()
     if db_user:
         # In a real app, you'd return an error message to the template
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = auth_service.get_password_hash(password)
+    hashed_password = await auth_service.get_password_hash_async(password)
     
     if role == UserRole.student:
         if not rollNumber:
@@ -62,7 +63,8 @@ async def register_user_submit(
         )
     
     db.add(new_user)
-    db.commit()
+    await db.commit()
+    auth_service.invalidate_user(email)
     
     # Redirect to login page after successful registration
     return RedirectResponse(url="/auth/login", status_code=status.HTTP_303_SEE_OTHER)
@@ -70,15 +72,23 @@ async def register_user_submit(
 
 @router.post("/login")
 async def login_submit(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     username: str = Form(...), # from <input name="username">
     password: str = Form(...)  # from <input name="password">
 ):
     """Handles submission of the login form and sets a session cookie."""
-    user = db.query(User).filter(User.email == username).first()
-    if not user or not auth_service.verify_password(password, user.hashed_password):
+    user = (await db.execute(select(User).where(User.email == username))).scalars().first()
+    if not user:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    verified, new_hash = await auth_service.verify_and_update_password_async(password, user.hashed_password)
+    if not verified:
         # In a real app, you'd return an error message to the login page
         raise HTTPException(status_code=401, detail="Incorrect email or password")
+    if new_hash:
+        # The stored hash used an outdated cost factor; upgrade it now that we know the password.
+        user.hashed_password = new_hash
+        await db.commit()
+        auth_service.invalidate_user(user.email)
 
     access_token = auth_service.create_access_token(data={"sub": user.email})
     
@@ -87,6 +97,13 @@ async def login_submit(
     response.set_cookie(key="access_token", value=f"Bearer {access_token}", httponly=True)
     return response
 
+@router.get("/cache-stats")
+def user_cache_stats(current_user: User = Depends(auth_service.get_current_user)):
+    """Hit/miss counters of the authenticated-user cache. (Protected endpoint)"""
+    if current_user.role not in ['admin', 'teacher']:
+        raise HTTPException(status_code=403, detail="Not authorized to view cache statistics.")
+    return auth_service.user_cache.stats()
+
 # NEW ROUTE: Logout
 @router.get("/logout")
 async def logout():
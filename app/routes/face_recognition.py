@@ -4,6 +4,9 @@ from typing import List
 
 from ..database.connection import get_db
 from ..services import face_rec_service
+from ..services.model_registry import worker_status
+from ..services.training_jobs import training_jobs
+from ..services.worker_pool import recognition_pool
 from ..services.auth_service import get_current_user # To protect routes
 from ..models.attendance import User # To check user role
 
@@ -38,12 +41,40 @@ async def register_student_faces(
     # 2. Save the images.
     return await face_rec_service.save_face_images(roll_number=roll_number, name=name, images=images)
 
-@router.post("/train")
-def train_model_endpoint(current_user: User = Depends(get_current_user)):
+@router.post("/train", status_code=202)
+def train_model_endpoint(full: bool = False, current_user: User = Depends(get_current_user)):
     """
-    Trigger the face recognition model training process.
+    Start the face recognition model training process in the background.
     (Protected endpoint)
+    - **full**: Rebuild the model from every training image instead of only
+      adding the images enrolled since the last training (e.g. after deletions).
+
+    Returns the training job; poll `/face-recognition/train/{job_id}` for progress.
+    If a training job is already queued or running, that job is returned instead.
     """
     if current_user.role not in ['admin', 'teacher']:
         raise HTTPException(status_code=403, detail="Not authorized to train the model.")
-    return face_rec_service.train_model()
\ No newline at end of file
+    return training_jobs.submit(full=full).to_dict()
+
+@router.get("/train/{job_id}")
+def training_status_endpoint(job_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Report the status and progress of a training job.
+    (Protected endpoint)
+    """
+    if current_user.role not in ['admin', 'teacher']:
+        raise HTTPException(status_code=403, detail="Not authorized to view training jobs.")
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Training job '{job_id}' not found.")
+    return job.to_dict()
+
+@router.get("/model")
+async def model_status_endpoint():
+    """
+    Report which trained model is currently loaded for recognition.
+    Recognition runs in the worker pool, so this asks one of its workers (each
+    loads the model on its own). Returns the model version (file mtime in ns),
+    when it was loaded and the worker's process ID.
+    """
+    return await recognition_pool.run(worker_status)
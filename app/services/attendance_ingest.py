@@ -0,0 +1,348 @@
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, List
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+try:
+    import fcntl
+except ImportError:
+    # No POSIX file locks (Windows): spools are still per process, but only
+    # safe to take over when a single process uses the spool directory.
+    fcntl = None
+
+# Lost connections, timeouts and deadlocks: the database, not the rows, is at fault.
+_TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+# Longest pause between retries of a failing batch, in seconds.
+_MAX_RETRY_PAUSE = 30.0
+
+
+class AttendanceIngest:
+    """
+    Write-behind queue for attendance rows.
+
+    Callers hand over rows with submit(), which appends them to this process's
+    spool file (fsync'ed before it returns) and queues them in memory. A
+    background thread writes queued rows to the database in batches, whenever
+    BATCH_SIZE rows are waiting or FLUSH_INTERVAL seconds have passed, one
+    transaction per batch.
+
+    Each process spools to its own file in `spool_dir`, holding an exclusive
+    lock on it while it runs. The spool is truncated when the queue drains,
+    and rewritten without the rows already written once those exceed
+    `compact_bytes`. On start, the files of processes that are gone (unlocked
+    files, e.g. left by a crash) are replayed and taken over; the writer must
+    therefore be idempotent (the attendance upsert is).
+
+    A batch that keeps failing is retried `max_attempts` times, then written
+    row by row; rows the database rejects go to the dead-letter file.
+    """
+
+    def __init__(self, spool_dir, writer: Callable[[List[dict]], None], batch_size: int, flush_interval: float,
+                 max_attempts: int = 5, dead_letter_path=None, compact_bytes: int = 1024 * 1024):
+        self.spool_dir = Path(spool_dir)
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path or self.spool_dir / "dead_letter.jsonl"
+        self.compact_bytes = compact_bytes
+        # Queued rows as (spool offset just past the row, row), in spool order.
+        self._queue = []
+        self._in_flight = []
+        self._cond = threading.Condition()
+        # Held while appending to or rewriting the spool.
+        self._spool_lock = threading.Lock()
+        self._spool = None
+        # Spool bytes whose rows have all reached the database (or the dead letters).
+        self._written_offset = 0
+        self._thread = None
+        self._stopping = False
+
+    # --- Lifecycle ---
+    def start(self):
+        """Takes over orphaned spools, replays them and starts the background writer."""
+        if self._thread is not None:
+            return
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        orphans = self._claim_orphaned_spools()
+        with self._spool_lock:
+            self._spool = self._new_spool()
+            self._written_offset = 0
+        rows = []
+        for _, f in orphans:
+            rows.extend(_read_rows(f))
+        with self._cond:
+            self._stopping = False
+        # Re-spool the replayed rows in our own file before letting go of the old ones.
+        self.submit(rows)
+        for _, f in orphans:
+            _discard(f)
+        self._thread = threading.Thread(target=self._run, name="attendance-ingest", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Writes out everything still queued and stops the background writer."""
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+        with self._spool_lock, self._cond:
+            spool, self._spool = self._spool, None
+            if not self._queue:
+                # Everything reached the database; nothing to replay.
+                _discard(spool)
+            else:
+                # The next start (of any process) replays what is left.
+                spool.close()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    # --- Producers ---
+    def submit(self, rows: List[dict]):
+        """Durably queues attendance rows for writing. Returns once they are in the spool."""
+        with self._spool_lock:
+            self._append(rows)
+
+    def submit_new(self, rows: List[dict]) -> List[dict]:
+        """
+        Like submit(), but skips rows for a (student, subject, day) that is
+        already queued or being written. Checking and queuing happen atomically,
+        so concurrent calls never both accept the same row. Returns the rows
+        accepted.
+        """
+        with self._spool_lock:
+            with self._cond:
+                queued = {_key(row) for _, row in self._queue + self._in_flight}
+            accepted = []
+            for row in rows:
+                if _key(row) not in queued:
+                    queued.add(_key(row))
+                    accepted.append(row)
+            self._append(accepted)
+        return accepted
+
+    def _append(self, rows: List[dict]):
+        """Appends rows to the spool and the queue. Called with the spool lock held."""
+        if not rows:
+            return
+        lines = [(json.dumps(row, default=_encode) + "\n").encode() for row in rows]
+        offset = self._spool.tell()
+        self._spool.write(b"".join(lines))
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+        entries = []
+        for line, row in zip(lines, rows):
+            offset += len(line)
+            entries.append((offset, row))
+        with self._cond:
+            self._queue.extend(entries)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+
+    @property
+    def backlog(self) -> int:
+        with self._cond:
+            return len(self._queue) + len(self._in_flight)
+
+    # --- Writer ---
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._cond.wait(timeout=self.flush_interval)
+                if not self._queue:
+                    if self._stopping:
+                        return
+                    continue
+                self._in_flight = self._queue[:self.batch_size]
+                del self._queue[:self.batch_size]
+                batch = self._in_flight
+
+            if not self._write([_decode(row) for _, row in batch]):
+                # Stopping while the database is failing: leave the rows in the
+                # spool for the next start.
+                with self._cond:
+                    self._queue[:0] = batch
+                    self._in_flight = []
+                return
+
+            with self._spool_lock:
+                with self._cond:
+                    self._in_flight = []
+                    drained = not self._queue
+                # Batches are taken in spool order, so everything before the
+                # batch's last row has been written too.
+                self._written_offset = batch[-1][0]
+                self._discard_written(drained)
+
+    def _write(self, rows: List[dict]) -> bool:
+        """
+        Writes a batch, retrying with a growing pause. After `max_attempts`
+        failures that aren't connection errors, the rows are tried one by one
+        and those the database rejects are dead-lettered; connection errors are
+        retried until the database is back. Returns False if stopped first.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self.writer(rows)
+                return True
+            except Exception as e:
+                error = e
+                print(f"Warning: Attendance batch of {len(rows)} rows failed (attempt {attempt}): {e}")
+            if self._stopping:
+                return False
+            if attempt >= self.max_attempts and not isinstance(error, _TRANSIENT_ERRORS):
+                rows = self._isolate_bad_rows(rows)
+                if not rows:
+                    return True
+            time.sleep(min(self.flush_interval * attempt, _MAX_RETRY_PAUSE))
+
+    def _isolate_bad_rows(self, rows: List[dict]) -> List[dict]:
+        """Writes rows one at a time, dead-letters rejected ones. Returns those to retry."""
+        retry = []
+        for row in rows:
+            try:
+                self.writer([row])
+            except _TRANSIENT_ERRORS:
+                retry.append(row)
+            except Exception as e:
+                self._dead_letter(row, e)
+        return retry
+
+    def _dead_letter(self, row: dict, error: Exception):
+        print(f"Warning: Attendance row moved to {self.dead_letter_path}: {error}")
+        entry = {"row": row, "error": str(error), "failed_at": datetime.now().isoformat(timespec="seconds")}
+        with open(self.dead_letter_path, "a") as f:
+            f.write(json.dumps(entry, default=_encode) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    # --- Spool files ---
+    def _new_spool(self):
+        """Creates and locks a fresh spool file for this process."""
+        path = self.spool_dir / f"spool-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+        f = open(path, "a+b")
+        _try_lock(f)
+        return f
+
+    def _discard_written(self, drained: bool):
+        """Drops the written rows from the spool. Called with the spool lock held."""
+        if drained:
+            self._spool.truncate(0)
+            self._spool.seek(0)
+        elif self._written_offset >= self.compact_bytes:
+            # Move the unwritten tail to a new spool, then drop the old file.
+            old = self._spool
+            old.seek(self._written_offset)
+            tail = old.read()
+            new = self._new_spool()
+            new.write(tail)
+            new.flush()
+            os.fsync(new.fileno())
+            shift = self._written_offset
+            with self._cond:
+                self._queue = [(offset - shift, row) for offset, row in self._queue]
+            self._spool = new
+            _discard(old)
+        else:
+            return
+        self._written_offset = 0
+
+    def _claim_orphaned_spools(self):
+        """Locks the spool files no running process holds. Returns [(path, open file)]."""
+        claimed = []
+        for path in sorted(self.spool_dir.glob("spool-*.jsonl")):
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue
+            # The file may have been replaced (compacted away) between the glob and the lock.
+            if _try_lock(f) and _same_file(f, path):
+                claimed.append((path, f))
+            else:
+                f.close()
+        return claimed
+
+
+def _try_lock(f) -> bool:
+    """Takes an exclusive, non-blocking lock on an open file. Returns whether it was taken."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _same_file(f, path) -> bool:
+    try:
+        return os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def _discard(f):
+    """Deletes a spool file and lets go of it."""
+    if fcntl is None:
+        # Windows cannot delete an open file.
+        f.close()
+        _remove(f.name)
+    else:
+        # Delete before unlocking, so no other process can claim it in between.
+        _remove(f.name)
+        f.close()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _read_rows(f) -> List[dict]:
+    rows = []
+    f.seek(0)
+    for line in f:
+        try:
+            rows.append(json.loads(line))
+        except ValueError:
+            # A line cut short by a crash mid-write was never acknowledged.
+            continue
+    return rows
+
+
+def _encode(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {value!r}")
+
+
+def _key(row: dict) -> tuple:
+    return row["studentID"], row["subjectID"], _as_date(row["attendance_date"])
+
+
+def _as_date(value) -> date:
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _decode(row: dict) -> dict:
+    row = dict(row)
+    row["attendance_date"] = _as_date(row["attendance_date"])
+    if isinstance(row.get("timestamp"), str):
+        row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
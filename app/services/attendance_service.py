@@ -1,102 +1,520 @@
-import cv2
+import asyncio
+import csv
+import hashlib
+import io
+import json
 import os
+import zipfile
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from datetime import date
+from sqlalchemy import and_, func, select
+from datetime import date, datetime
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from typing import Iterator, List, Optional, Tuple
 import numpy as np
 
 from .. import config
-from ..models.attendance import Student, AttendanceRecord
+from ..database.connection import SessionLocal
+from ..database.upsert import insert_ignoring_duplicates, insert_new_rows
+from ..models.attendance import Student, Subject, AttendanceRecord, AttendanceDaily
+from ..utils import image_utils
+from ..utils.cache import TTLCache
+from ..utils.lazy_import import lazy_import
+from ..utils.metrics import FACES_PER_IMAGE, RECOGNITION_CONFIDENCE, STAGE_SECONDS
+from .attendance_ingest import AttendanceIngest
+from .model_registry import registry
+from .worker_pool import recognition_pool
+from .sample_store import normalize_crop
 
-def load_recognizer():
-    """Loads the trained LBPH recognizer model from file."""
-    if not os.path.exists(config.TRAINED_MODEL_PATH):
-        raise HTTPException(status_code=500, detail="Model not found. Please train the model first via the /face-recognition/train endpoint.")
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    recognizer.read(str(config.TRAINED_MODEL_PATH))
-    return recognizer
+cv2 = lazy_import("cv2")
 
-def mark_attendance(db: Session, subject: str, image: np.ndarray):
+
+def load_recognizer(student_class: Optional[str] = None):
+    """Returns the shared LBPH recognizer, reloading it only when the model file changed."""
+    return registry.get_recognizer(student_class)
+
+def detect_faces(gray: np.ndarray) -> np.ndarray:
+    """
+    Finds the faces in a grayscale classroom image.
+    Uses the fast path (downscaled search, optionally bounded by the classroom
+    geometry) unless it is disabled in the config.
+    """
+    detector = registry.get_detector()
+    with STAGE_SECONDS.time("detect"):
+        if not config.DETECTION_FAST_PATH:
+            return detector.detectMultiScale(gray, 1.3, 5)
+        return image_utils.detect_faces(
+            detector,
+            gray,
+            max_dimension=config.DETECTION_MAX_DIMENSION,
+            min_face_fraction=config.DETECTION_MIN_FACE_FRACTION,
+            max_face_fraction=config.DETECTION_MAX_FACE_FRACTION,
+        )
+
+def recognize_faces(image: np.ndarray, student_class: Optional[str] = None) -> List[Tuple[int, float]]:
+    """
+    Detects faces in an image and predicts a (label, confidence) pair for each.
+    Pure CPU work with no database access, so it can run in a worker process.
+    If `student_class` is given, faces are matched against that class's model
+    shard only (falling back to the global model when it has none).
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return recognize_gray(gray, student_class)
+
+def recognize_gray(gray: np.ndarray, student_class: Optional[str] = None) -> List[Tuple[int, float]]:
+    """Same as recognize_faces, for an image that is already grayscale."""
+    faces = detect_faces(gray)
+    FACES_PER_IMAGE.observe(len(faces))
+    return predict_faces(gray, faces, student_class)
+
+def predict_faces(gray: np.ndarray, faces, student_class: Optional[str] = None) -> List[Tuple[int, float]]:
+    """Predicts a (label, confidence) pair for each (x, y, w, h) face box in `gray`."""
+    # Crops are normalized to the same size the model was trained on.
+    crops = [normalize_crop(gray[y:y+h, x:x+w]) for (x, y, w, h) in faces]
+    if not crops:
+        return []
+
+    if config.RECOGNIZER_BACKEND == "roster":
+        # Score every face against the whole roster in one batched computation.
+        matcher = registry.get_matcher(student_class)
+        with STAGE_SECONDS.time("predict"):
+            matches = matcher.match(crops, k=1)
+        predictions = [candidates[0] if candidates else (-1, float("inf")) for candidates in matches]
+    else:
+        recognizer = load_recognizer(student_class)
+        predictions = []
+        with STAGE_SECONDS.time("predict"):
+            for crop in crops:
+                label, confidence = recognizer.predict(crop)
+                predictions.append((int(label), float(confidence)))
+
+    for _, confidence in predictions:
+        RECOGNITION_CONFIDENCE.observe(confidence)
+    return predictions
+
+def decode_upload(contents: bytes) -> np.ndarray:
+    """Decodes uploaded image bytes to grayscale, via the fast path unless it is disabled."""
+    if config.DETECTION_FAST_PATH:
+        gray = image_utils.decode_grayscale(contents, min_dimension=config.DETECTION_DECODE_MIN_DIMENSION)
+    else:
+        image = image_utils.decode_image(contents)
+        gray = None if image is None else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if gray is None:
+        raise HTTPException(status_code=400, detail="Could not decode the uploaded image.")
+    return gray
+
+def recognize_image_bytes(contents: bytes, student_class: Optional[str] = None):
+    """
+    Worker-pool entry point: decodes an uploaded image and recognizes the faces
+    in it. Returns (predictions, version of the model used), the version being
+    None if no model was needed.
+    """
+    predictions = recognize_gray(decode_upload(contents), student_class)
+    return predictions, (registry.loaded_version(student_class) if predictions else None)
+
+# Recognition results by (upload hash, model version, class, recognition settings).
+recognition_cache = TTLCache(maxsize=config.RECOGNITION_CACHE_SIZE, ttl=config.RECOGNITION_CACHE_TTL_SECONDS)
+
+async def recognize_upload(contents: bytes, student_class: Optional[str] = None) -> List[Tuple[int, float]]:
+    """
+    Recognizes the faces in an uploaded image on the recognition pool, or
+    returns the cached result if the same bytes were recognized before with the
+    same model (e.g. a kiosk retrying an upload).
+
+    Lookups use the version of the model file on disk; results are stored under
+    the version the worker actually used, which lags behind for up to
+    MODEL_RELOAD_CHECK_INTERVAL after a publish.
+    """
+    digest = (await run_in_threadpool(hashlib.sha256, contents)).hexdigest()
+    settings = (student_class, config.RECOGNIZER_BACKEND, config.ROSTER_MATCHER_CENTROIDS, config.DETECTION_FAST_PATH)
+    current = registry.model_version(student_class)
+    predictions = recognition_cache.get((digest, current, *settings))
+    if predictions is None:
+        predictions, used = await recognition_pool.run(recognize_image_bytes, contents, student_class)
+        recognition_cache.set((digest, used or current, *settings), predictions)
+    return predictions
+
+def recognize_frame(contents: bytes, known_boxes: List[Tuple[int, int, int, int]],
+                    student_class: Optional[str] = None) -> List[dict]:
+    """
+    Worker-pool entry point for video frames. Detects every face but only runs
+    recognition on faces that don't overlap one of `known_boxes` (faces already
+    identified by the tracker). Returns {"box", "label", "confidence"} per face,
+    with label and confidence None for the faces that were skipped.
+    """
+    gray = decode_upload(contents)
+    faces = [tuple(int(v) for v in face) for face in detect_faces(gray)]
+    unknown = [
+        face for face in faces
+        if not any(image_utils.box_iou(face, known) >= config.STREAM_TRACK_IOU_THRESHOLD for known in known_boxes)
+    ]
+    predictions = dict(zip(unknown, predict_faces(gray, unknown, student_class)))
+
+    results = []
+    for face in faces:
+        label, confidence = predictions.get(face, (None, None))
+        results.append({"box": face, "label": label, "confidence": confidence})
+    return results
+
+def mark_attendance(db: Session, subject: str, image: np.ndarray, student_class: Optional[str] = None):
     """
     Recognizes faces in a given image and marks attendance in the database.
     """
-    recognizer = load_recognizer()
-    detector = cv2.CascadeClassifier(str(config.HAAR_CASCADE_PATH))
-    
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    faces = detector.detectMultiScale(gray, 1.3, 5)
+    return record_attendance(db=db, subject=subject, predictions=recognize_faces(image, student_class))
 
-    if len(faces) == 0:
-        raise HTTPException(status_code=400, detail="No faces detected in the uploaded image.")
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+
+def unpack_image_archive(contents: bytes) -> List[Tuple[str, bytes]]:
+    """Returns (filename, bytes) for every image file in a zip archive."""
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(contents))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="The uploaded archive is not a valid zip file.")
+
+    images = []
+    with archive:
+        for info in archive.infolist():
+            name = info.filename
+            if info.is_dir() or os.path.basename(name).startswith(".") or \
+                    os.path.splitext(name)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            if info.file_size > config.ATTENDANCE_BATCH_MAX_IMAGE_BYTES:
+                raise HTTPException(status_code=413, detail=f"Image '{name}' in the archive is too large.")
+            if len(images) >= config.ATTENDANCE_BATCH_MAX_IMAGES:
+                raise HTTPException(status_code=413, detail=f"At most {config.ATTENDANCE_BATCH_MAX_IMAGES} images can be processed at once.")
+            images.append((name, archive.read(info)))
+    return images
+
+async def mark_attendance_batch(db: Session, subject: str, uploads: List[Tuple[str, bytes]],
+                                student_class: Optional[str] = None):
+    """
+    Marks attendance from several photos of the same session.
+
+    The images are recognized in parallel on the recognition pool (never more
+    at once than there are workers, so a batch cannot fill the queue), the
+    predictions of all images are merged, keeping each student's best
+    confidence, and recorded with a single record_attendance call.
+    """
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No images were uploaded.")
+    if len(uploads) > config.ATTENDANCE_BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"At most {config.ATTENDANCE_BATCH_MAX_IMAGES} images can be processed at once.")
+
+    slots = asyncio.Semaphore(recognition_pool.workers)
+
+    async def recognize(contents: bytes):
+        async with slots:
+            return await recognize_upload(contents, student_class)
+
+    outcomes = await asyncio.gather(*(recognize(contents) for _, contents in uploads), return_exceptions=True)
+
+    predictions = []
+    report = []
+    for (filename, _), outcome in zip(uploads, outcomes):
+        if isinstance(outcome, HTTPException) and outcome.status_code == 400:
+            report.append({"filename": filename, "faces_found": 0, "status": "rejected", "reason": outcome.detail})
+        elif isinstance(outcome, Exception):
+            raise outcome
+        else:
+            predictions.extend(outcome)
+            report.append({"filename": filename, "faces_found": len(outcome), "status": "processed", "reason": None})
 
-    recognized_students = []
-    today = date.today()
+    if not predictions:
+        raise HTTPException(status_code=400, detail="No faces detected in the uploaded images.")
 
-    for (x, y, w, h) in faces:
-        # Predict the face
-        enrollment_id_pred, confidence = recognizer.predict(gray[y:y+h, x:x+w])
+    results = await run_in_threadpool(record_attendance, db=db, subject=subject, predictions=predictions)
+    return {"images": report, "results": results}
 
-        # Check if the recognition is confident enough
+def record_attendance(db: Session, subject: str, predictions: List[Tuple[int, float]]):
+    """
+    Marks attendance for the students behind a list of (label, confidence) predictions.
+
+    Works on the whole set at once: predictions are de-duplicated per student,
+    resolved with one roster query and written with a single bulk upsert. A
+    student counts as newly marked only if this call's row was the one
+    inserted, so concurrent requests never both report the same student.
+    """
+    if len(predictions) == 0:
+        raise HTTPException(status_code=400, detail="No faces detected in the uploaded image.")
+
+    # Keep only confident predictions, and the best one for each student.
+    best_confidence = {}
+    for label, confidence in predictions:
         if confidence < config.RECOGNITION_CONFIDENCE_THRESHOLD:
-            student = db.query(Student).filter(Student.enrollment_id == str(enrollment_id_pred)).first()
-            if student:
-                # Check if attendance was already marked for this student, subject, and day
-                existing_record = db.query(AttendanceRecord).filter(
-                    and_(
-                        AttendanceRecord.student_id == student.id,
-                        AttendanceRecord.subject == subject,
-                        func.date(AttendanceRecord.timestamp) == today
-                    )
-                ).first()
-
-                if not existing_record:
-                    attendance_record = AttendanceRecord(student_id=student.id, subject=subject)
-                    db.add(attendance_record)
-                    recognized_students.append({"enrollment_id": student.enrollment_id, "name": student.name, "status": "Attendance Marked"})
-                else:
-                    recognized_students.append({"enrollment_id": student.enrollment_id, "name": student.name, "status": "Already Marked Today"})
-    
-    if not recognized_students:
+            if label not in best_confidence or confidence < best_confidence[label]:
+                best_confidence[label] = confidence
+
+    if not best_confidence:
         raise HTTPException(status_code=404, detail="No known students were recognized in the image.")
-        
-    db.commit()
-    return recognized_students
 
-def get_attendance_summary(db: Session, subject: str):
+    with STAGE_SECONDS.time("db_lookup"):
+        db_subject = db.query(Subject).filter(Subject.subjectName == subject).first()
+        if not db_subject:
+            raise HTTPException(status_code=404, detail=f"Subject '{subject}' not found.")
+
+        # The model is trained with the roll number as the label.
+        students = db.query(Student).filter(
+            Student.rollNumber.in_([str(label) for label in best_confidence])
+        ).all()
+        if not students:
+            raise HTTPException(status_code=404, detail="No known students were recognized in the image.")
+
+        today = date.today()
+        rows = [
+            {
+                "studentID": s.studentID,
+                "subjectID": db_subject.subjectID,
+                "attendance_date": today,
+                "timestamp": datetime.now(),
+            }
+            for s in students
+        ]
+        if ingest.running:
+            in_database = {
+                student_id for (student_id,) in db.query(AttendanceRecord.studentID).filter(
+                    AttendanceRecord.studentID.in_([s.studentID for s in students]),
+                    AttendanceRecord.subjectID == db_subject.subjectID,
+                    AttendanceRecord.attendance_date == today,
+                )
+            }
+            rows = [row for row in rows if row["studentID"] not in in_database]
+
+    if ingest.running:
+        # Write-behind: durable in the spool now, in the database within a flush
+        # interval. Rows another request already queued are not accepted again.
+        newly_marked = {row["studentID"] for row in ingest.submit_new(rows)}
+    else:
+        newly_marked = {student_id for student_id, _, _ in write_attendance_rows(db, rows, return_inserted=True)}
+
+    return [
+        {
+            "roll_number": s.rollNumber,
+            "name": s.name,
+            "confidence": round(best_confidence[int(s.rollNumber)], 2),
+            "status": "Attendance Marked" if s.studentID in newly_marked else "Already Marked Today",
+        }
+        for s in students
+    ]
+
+def write_attendance_rows(db: Session, rows: List[dict], return_inserted: bool = False):
+    """
+    Writes attendance rows (and their rollup rows) in one transaction.
+    Idempotent upserts: rows already present, e.g. marked by a concurrent upload
+    in the meantime or replayed from the ingest spool, are silently absorbed by
+    the unique index. With `return_inserted`, returns the (studentID,
+    subjectID, attendance_date) keys of the rows that were new.
+    """
+    inserted = None
+    with STAGE_SECONDS.time("db_write"):
+        if return_inserted:
+            inserted = insert_new_rows(
+                db, AttendanceRecord.__table__, rows, ("studentID", "subjectID", "attendance_date"), "timestamp"
+            )
+        else:
+            insert_ignoring_duplicates(db, AttendanceRecord.__table__, rows)
+        # Keep the per-day rollup used by the summary in step, in the same transaction.
+        insert_ignoring_duplicates(db, AttendanceDaily.__table__, [
+            {"subjectID": row["subjectID"], "day": row["attendance_date"], "studentID": row["studentID"]}
+            for row in rows
+        ])
+    with STAGE_SECONDS.time("commit"):
+        db.commit()
+    return inserted
+
+def _write_attendance_batch(rows: List[dict]):
+    """Ingest writer: flushes one batch of queued attendance rows in its own session."""
+    db = SessionLocal()
+    try:
+        write_attendance_rows(db, rows)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+# Write-behind ingest, started at app startup when ATTENDANCE_INGEST_MODE is
+# "write_behind". While it is not running, rows are written directly.
+ingest = AttendanceIngest(
+    spool_dir=config.ATTENDANCE_SPOOL_DIR,
+    writer=_write_attendance_batch,
+    batch_size=config.ATTENDANCE_INGEST_BATCH_SIZE,
+    flush_interval=config.ATTENDANCE_INGEST_FLUSH_INTERVAL,
+    max_attempts=config.ATTENDANCE_INGEST_MAX_ATTEMPTS,
+    dead_letter_path=config.ATTENDANCE_DEAD_LETTER_PATH,
+    compact_bytes=config.ATTENDANCE_SPOOL_COMPACT_BYTES,
+)
+
+def get_attendance_summary(db: Session, subject: str, student_class: Optional[str] = None,
+                           start_date: Optional[date] = None, end_date: Optional[date] = None,
+                           offset: int = 0, limit: int = 100):
     """
     Calculates and returns the attendance summary for a given subject.
+
+    Computed in one aggregated query over the attendance_daily rollup, so its
+    cost does not grow with the history in attendance_record.
+    - **student_class**: Only include students of this class.
+    - **start_date** / **end_date**: Only count class days in this (inclusive) range.
+    - **offset** / **limit**: Page through the students, ordered by roll number.
     """
-    students = db.query(Student).all()
-    if not students:
+    db_subject = db.query(Subject).filter(Subject.subjectName == subject).first()
+    if not db_subject:
         return []
 
-    # Get the total number of unique class days for the subject
-    total_days_query = db.query(func.count(func.distinct(func.date(AttendanceRecord.timestamp)))).filter(AttendanceRecord.subject == subject)
-    total_class_days = total_days_query.scalar() or 0
-
-    if total_class_days == 0:
-        return [{"enrollment_id": s.enrollment_id, "name": s.name, "attendance_percentage": "0%"} for s in students]
-
-    # Get the number of days each student was present
-    attendance_counts = db.query(
-        AttendanceRecord.student_id,
-        func.count(AttendanceRecord.id).label("days_present")
-    ).filter(AttendanceRecord.subject == subject).group_by(AttendanceRecord.student_id).all()
-    
-    present_map = {student_id: count for student_id, count in attendance_counts}
-    
-    # Calculate percentage for each student
+    day_filters = [AttendanceDaily.subjectID == db_subject.subjectID]
+    if start_date:
+        day_filters.append(AttendanceDaily.day >= start_date)
+    if end_date:
+        day_filters.append(AttendanceDaily.day <= end_date)
+
+    # The number of distinct days the subject was held, as a scalar subquery.
+    total_class_days = (
+        select(func.count(func.distinct(AttendanceDaily.day)))
+        .where(*day_filters)
+        .scalar_subquery()
+    )
+
+    query = (
+        db.query(
+            Student.rollNumber,
+            Student.name,
+            func.count(AttendanceDaily.day).label("days_present"),
+            total_class_days.label("total_class_days"),
+        )
+        .outerjoin(AttendanceDaily, and_(AttendanceDaily.studentID == Student.studentID, *day_filters))
+        .group_by(Student.studentID, Student.rollNumber, Student.name)
+        .order_by(Student.rollNumber)
+    )
+    if student_class:
+        query = query.filter(Student.student_class == student_class)
+
     summary = []
-    for student in students:
-        days_present = present_map.get(student.id, 0)
-        percentage = round((days_present / total_class_days) * 100) if total_class_days > 0 else 0
+    for roll_number, name, days_present, total_days in query.offset(offset).limit(limit):
+        percentage = round((days_present / total_days) * 100) if total_days else 0
         summary.append({
-            "enrollment_id": student.enrollment_id,
-            "name": student.name,
+            "roll_number": roll_number,
+            "name": name,
             "days_present": days_present,
-            "total_class_days": total_class_days,
+            "total_class_days": total_days,
             "attendance_percentage": f"{percentage}%"
         })
 
-    return summary
\ No newline at end of file
+    return summary
+
+def rebuild_attendance_rollup(db: Session, subject: Optional[str] = None) -> int:
+    """
+    Recomputes the attendance_daily rollup from attendance_record, for one subject
+    or for all of them. Returns the number of rollup rows written.
+    """
+    delete = AttendanceDaily.__table__.delete()
+    source = select(
+        AttendanceRecord.subjectID,
+        AttendanceRecord.attendance_date,
+        AttendanceRecord.studentID,
+    ).distinct()
+
+    if subject is not None:
+        db_subject = db.query(Subject).filter(Subject.subjectName == subject).first()
+        if not db_subject:
+            raise HTTPException(status_code=404, detail=f"Subject '{subject}' not found.")
+        delete = delete.where(AttendanceDaily.subjectID == db_subject.subjectID)
+        source = source.where(AttendanceRecord.subjectID == db_subject.subjectID)
+
+    db.execute(delete)
+    result = db.execute(
+        AttendanceDaily.__table__.insert().from_select(["subjectID", "day", "studentID"], source)
+    )
+    db.commit()
+    return result.rowcount
+
+# --- Export ---
+EXPORT_COLUMNS = ["record_id", "attendance_date", "timestamp", "roll_number", "name", "class", "subject"]
+
+def resolve_export_subject(subject: Optional[str]) -> Optional[int]:
+    """Returns the subject's ID for an export (None for all subjects); 404 if unknown."""
+    if subject is None:
+        return None
+    db = SessionLocal()
+    try:
+        subject_id = db.query(Subject.subjectID).filter(Subject.subjectName == subject).scalar()
+    finally:
+        db.close()
+    if subject_id is None:
+        raise HTTPException(status_code=404, detail=f"Subject '{subject}' not found.")
+    return subject_id
+
+def iter_attendance_records(subject_id: Optional[int] = None, student_class: Optional[str] = None,
+                            start_date: Optional[date] = None, end_date: Optional[date] = None,
+                            chunk_size: Optional[int] = None) -> Iterator[List[tuple]]:
+    """
+    Yields the matching attendance records, joined with their student and
+    subject, in chunks of `chunk_size` rows ordered by record ID.
+
+    Chunks are fetched with keyset pagination (recordID > last seen), each in
+    its own short session with a server-side cursor, so memory stays flat and
+    no connection or transaction is held between chunks.
+    """
+    chunk_size = chunk_size or config.ATTENDANCE_EXPORT_CHUNK_SIZE
+    query = (
+        select(
+            AttendanceRecord.recordID,
+            AttendanceRecord.attendance_date,
+            AttendanceRecord.timestamp,
+            Student.rollNumber,
+            Student.name,
+            Student.student_class,
+            Subject.subjectName,
+        )
+        .join(Student, Student.studentID == AttendanceRecord.studentID)
+        .join(Subject, Subject.subjectID == AttendanceRecord.subjectID)
+        .order_by(AttendanceRecord.recordID)
+        .limit(chunk_size)
+    )
+    if subject_id is not None:
+        query = query.where(AttendanceRecord.subjectID == subject_id)
+    if student_class:
+        query = query.where(Student.student_class == student_class)
+    if start_date:
+        query = query.where(AttendanceRecord.attendance_date >= start_date)
+    if end_date:
+        query = query.where(AttendanceRecord.attendance_date <= end_date)
+
+    last_id = 0
+    while True:
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                query.where(AttendanceRecord.recordID > last_id),
+                execution_options={"stream_results": True, "yield_per": 1000},
+            )
+            chunk = [tuple(row) for row in result]
+        finally:
+            db.close()
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1][0]
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+def export_csv(chunks: Iterator[List[tuple]]) -> Iterator[str]:
+    """Formats record chunks as CSV text, one piece per chunk, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([[_export_value(value) for value in row] for row in chunk])
+        yield buffer.getvalue()
+
+def export_ndjson(chunks: Iterator[List[tuple]]) -> Iterator[str]:
+    """Formats record chunks as newline-delimited JSON, one piece per chunk."""
+    for chunk in chunks:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, (_export_value(value) for value in row)))) + "\n"
+            for row in chunk
+        )
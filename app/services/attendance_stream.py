@@ -0,0 +1,100 @@
+from fastapi import HTTPException
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+
+from .. import config
+from ..database.connection import SessionLocal
+from ..models.attendance import Subject
+from . import attendance_service
+from .face_tracker import FaceTracker
+from .worker_pool import recognition_pool
+
+
+class AttendanceStream:
+    """
+    One streaming attendance session: a sequence of frames for a subject.
+
+    Faces are tracked across frames, so recognition only runs on faces that
+    are not already identified, and each student is recorded at most once per
+    session. Detection and recognition run in the recognition worker pool.
+    """
+
+    def __init__(self, subject: str, student_class: Optional[str] = None):
+        self.subject = subject
+        self.student_class = student_class
+        self.tracker = FaceTracker(
+            iou_threshold=config.STREAM_TRACK_IOU_THRESHOLD,
+            max_missed_frames=config.STREAM_TRACK_MAX_MISSED_FRAMES,
+            retry_frames=config.STREAM_RECOGNITION_RETRY_FRAMES,
+            confidence_threshold=config.RECOGNITION_CONFIDENCE_THRESHOLD,
+        )
+        self.frames = 0
+        # Labels already handed to record_attendance in this session.
+        self._recorded = set()
+
+    async def open(self):
+        """Checks that the subject exists before any frames are accepted."""
+        exists = await run_in_threadpool(self._subject_exists)
+        if not exists:
+            raise HTTPException(status_code=404, detail=f"Subject '{self.subject}' not found.")
+
+    def _subject_exists(self) -> bool:
+        db = SessionLocal()
+        try:
+            return db.query(Subject.subjectID).filter(Subject.subjectName == self.subject).first() is not None
+        finally:
+            db.close()
+
+    async def process(self, contents: bytes) -> List[dict]:
+        """
+        Runs one frame through detection, tracking and (for new faces)
+        recognition. Returns the events to send to the client: one
+        "attendance" event per student newly marked, then a "frame" event.
+        """
+        self.frames += 1
+        frame = self.frames
+        detections = await recognition_pool.run(
+            attendance_service.recognize_frame, contents, self.tracker.settled_boxes(frame), self.student_class
+        )
+        self.tracker.update(detections, frame)
+
+        # Every identified face in view whose student isn't recorded yet, so a
+        # frame whose write failed is retried with the next one.
+        predictions = [
+            (track.label, track.confidence) for track in self.tracker.tracks
+            if track.identified and track.last_seen == frame and track.label not in self._recorded
+        ]
+        events = []
+        if predictions:
+            results = await run_in_threadpool(self._record, predictions)
+            self._recorded.update(label for label, _ in predictions)
+            for result in results:
+                events.append({"event": "attendance", **result})
+
+        events.append({
+            "event": "frame",
+            "frame": frame,
+            "faces": len(detections),
+            "recognized": sum(1 for detection in detections if detection["label"] is not None),
+            "tracks": [
+                {"id": track.id, "box": list(track.box), "roll_number": track.label}
+                for track in self.tracker.tracks if track.last_seen == frame
+            ],
+        })
+        return events
+
+    def _record(self, predictions) -> List[dict]:
+        db = SessionLocal()
+        try:
+            return attendance_service.record_attendance(db=db, subject=self.subject, predictions=predictions)
+        except HTTPException as e:
+            if e.status_code == 404:
+                # The labels belong to no enrolled student (e.g. a stale model).
+                return []
+            raise
+        except SQLAlchemyError as e:
+            # Reported for this frame; the session goes on and the next frame retries.
+            raise HTTPException(status_code=503, detail=f"Could not record attendance: {e}")
+        finally:
+            db.close()
@@ -1,13 +1,17 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, with_polymorphic
 from fastapi import Depends, HTTPException, status, Cookie
 from fastapi.security import OAuth2PasswordBearer
 
-from ..models.attendance import User
+from .. import config
+from ..models.attendance import User, Student
 from ..database.connection import get_db
+from ..utils.cache import TTLCache
 
 # --- Configuration ---
 SECRET_KEY = "a_very_secret_key_change_this_in_production" # Use environment variables for this
@@ -15,7 +19,44 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 # --- Password Hashing ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes whose cost differs from BCRYPT_ROUNDS are flagged for rehashing.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=config.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=config.BCRYPT_ROUNDS,
+)
+
+# bcrypt is deliberately slow, so async routes hand it to these threads
+# instead of running it on the event loop.
+_password_executor = ThreadPoolExecutor(max_workers=config.PASSWORD_HASH_WORKERS, thread_name_prefix="password")
+
+# --- User Cache ---
+# Detached copies of recently resolved users, keyed by email (the token subject).
+user_cache = TTLCache(maxsize=config.USER_CACHE_MAX_ENTRIES, ttl=config.USER_CACHE_TTL_SECONDS)
+
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    """
+    Returns the user with this email, from the cache when possible.
+    The returned object is attached to `db`, so relationships still lazy-load.
+    """
+    cached = user_cache.get(email)
+    if cached is None:
+        # Load the student columns in the same query, so the cached copy is complete.
+        users = with_polymorphic(User, [Student])
+        user = db.query(users).filter(users.email == email).first()
+        if user is None:
+            return None
+        db.expunge(user)
+        user_cache.set(email, user)
+        cached = user
+    # A per-request copy: the cached instance itself is never bound to a session.
+    return db.merge(cached, load=False)
+
+def invalidate_user(email: str):
+    """Drops a user from the cache; call after creating or changing a user."""
+    user_cache.invalidate(email)
 
 # --- JWT Token Handling ---
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
@@ -28,6 +69,23 @@ def get_password_hash(password: str) -> str:
     """Hashes a plain password."""
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password and, if the stored hash uses an outdated cost factor,
+    also returns a fresh hash to store (otherwise None).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash, run on the password executor."""
+    return await asyncio.get_running_loop().run_in_executor(_password_executor, get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password, run on the password executor."""
+    return await asyncio.get_running_loop().run_in_executor(
+        _password_executor, verify_and_update_password, plain_password, hashed_password
+    )
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Creates a JWT access token."""
     to_encode = data.copy()
@@ -54,7 +112,7 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    user = get_user_by_email(db, email)
     if user is None:
         raise credentials_exception
     return user
@@ -77,5 +135,4 @@ def try_get_current_user(access_token: Optional[str] = Cookie(None), db: Session
     except (JWTError, IndexError):
         return None
     
-    user = db.query(User).filter(User.email == email).first()
-    return user
\ No newline at end of file
+    return get_user_by_email(db, email)
@@ -1,13 +1,31 @@
-import cv2
+import asyncio
+import json
 import os
+import threading
+import time
 import numpy as np
-from PIL import Image
 from sqlalchemy.orm import Session
 from fastapi import UploadFile, HTTPException
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
 
 from .. import config
+from ..database.connection import SessionLocal
 from ..models.attendance import Student  # Updated model import
+from ..utils import image_utils
+from ..utils.lazy_import import lazy_import
+from ..utils.metrics import STAGE_SECONDS, TRAINING_SECONDS
+from .attendance_service import recognition_cache
+from .model_registry import registry, shard_path
+from .sample_selection import crop_hash, directory_hashes, sample_number, select_diverse
+from .sample_store import sample_store
+from .worker_pool import enrollment_pool
+
+cv2 = lazy_import("cv2")
+Image = lazy_import("PIL.Image")
+
+_training_lock = threading.Lock()
 
 def add_student_db(db: Session, roll_number: str, name: str):
     """
@@ -15,7 +33,7 @@ def add_student_db(db: Session, roll_number: str, name: str):
     This function is now simpler as registration is handled by the auth route.
     It's mainly for validating that the student exists before saving images.
     """
-    db_student = db.query(Student).filter(Student.roll_number == roll_number).first()
+    db_student = db.query(Student).filter(Student.rollNumber == roll_number).first()
     if not db_student:
         raise HTTPException(
             status_code=404, 
@@ -29,83 +47,384 @@ def add_student_db(db: Session, roll_number: str, name: str):
     return db_student
 
 async def save_face_images(roll_number: str, name: str, images: List[UploadFile]):
-    """Saves face images using the student's roll_number for identification."""
+    """
+    Saves face images using the student's roll_number for identification.
+
+    The uploads are decoded and searched for faces in parallel on the enrollment
+    worker pool, and the crops are written from the threadpool, so a large
+    enrollment never blocks the event loop. Returns a per-image report.
+    """
+    uploads = [(image_file.filename, await image_file.read()) for image_file in images]
+
+    # One image per worker at a time, so a large enrollment (or several at once)
+    # queues here instead of overflowing the pool and getting 503s.
+    slots = asyncio.Semaphore(enrollment_pool.workers)
+
+    async def extract(contents: bytes):
+        async with slots:
+            return await enrollment_pool.run(extract_faces, contents)
+
+    outcomes = await asyncio.gather(*(extract(contents) for _, contents in uploads), return_exceptions=True)
+
+    crops = []
+    report = []
+    for (filename, _), outcome in zip(uploads, outcomes):
+        # Only a bad image is the image's fault; a full queue (503) or a
+        # timeout (504) fails the whole request so the client retries.
+        if isinstance(outcome, HTTPException) and outcome.status_code == 400:
+            report.append({"filename": filename, "faces_found": 0, "status": "rejected", "reason": outcome.detail})
+        elif isinstance(outcome, Exception):
+            raise outcome
+        elif not outcome:
+            report.append({"filename": filename, "faces_found": 0, "status": "rejected", "reason": "No face detected."})
+        else:
+            crops.extend(outcome)
+            report.append({"filename": filename, "faces_found": len(outcome), "status": "accepted", "reason": None})
+
+    if not crops:
+        raise HTTPException(status_code=400, detail="No faces could be detected in the uploaded images.")
+
+    saved = await run_in_threadpool(store_face_samples, roll_number, name, crops)
+
+    return {
+        "message": f"{len(saved)} face samples saved for {name} ({roll_number}). Ready for training.",
+        "samples_saved": len(saved),
+        # Near-duplicates of existing samples, or over the per-student budget.
+        "samples_skipped": len(crops) - len(saved),
+        "images": report,
+    }
+
+
+def extract_faces(contents: bytes) -> List[np.ndarray]:
+    """
+    Worker-pool entry point: decodes an uploaded image and returns the grayscale
+    crop of every face found in it.
+    """
+    detector = registry.get_detector()
+    if config.DETECTION_FAST_PATH:
+        gray = image_utils.decode_grayscale(contents, min_dimension=config.DETECTION_DECODE_MIN_DIMENSION)
+    else:
+        img = image_utils.decode_image(contents)
+        gray = None if img is None else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if gray is None:
+        raise HTTPException(status_code=400, detail="Could not decode the image.")
+
+    with STAGE_SECONDS.time("enroll_detect"):
+        if config.DETECTION_FAST_PATH:
+            # Enrollment photos are close-ups, so the classroom face-size bounds don't apply.
+            faces = image_utils.detect_faces(detector, gray, max_dimension=config.DETECTION_MAX_DIMENSION)
+        else:
+            faces = detector.detectMultiScale(gray, 1.3, 5)
+    return [gray[y:y+h, x:x+w].copy() for (x, y, w, h) in faces]
+
+
+def store_face_samples(roll_number: str, name: str, crops: List[np.ndarray]) -> List[str]:
+    """
+    Writes face crops for a student to TrainingImage and appends them to the
+    sample store. Returns the paths of the new samples, relative to TrainingImage.
+
+    Crops that are near-duplicates (by dHash) of the student's existing samples
+    or of each other are skipped, and at most SAMPLES_PER_STUDENT samples are
+    kept per student, the most diverse new crops first.
+    """
     student_dir = config.TRAINING_IMAGE_DIR / f"{roll_number}_{name}"
     os.makedirs(student_dir, exist_ok=True)
 
-    detector = cv2.CascadeClassifier(str(config.HAAR_CASCADE_PATH))
-    sample_num = 0
-
-    for image_file in images:
-        contents = await image_file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        faces = detector.detectMultiScale(gray, 1.3, 5)
-        if len(faces) == 0:
-            continue
+    # Write the JPEGs and append to the sample store under the store lock, so a
+    # concurrent sync never sees one without the other.
+    with sample_store.lock:
+        existing = directory_hashes(student_dir)
+        chosen = select_diverse(
+            [crop_hash(crop) for crop in crops],
+            budget=config.SAMPLES_PER_STUDENT,
+            max_duplicate_distance=config.SAMPLE_DUPLICATE_MAX_DISTANCE,
+            kept=list(existing.values()),
+        )
+        crops = [crops[i] for i in chosen]
 
-        for (x, y, w, h) in faces:
-            sample_num += 1
-            # The ID used for training is now the student's primary key (integer)
+        # Continue numbering after the samples already on disk instead of overwriting them.
+        first = _next_sample_number(student_dir)
+        sources = []
+        for sample_num, crop in enumerate(crops, start=first):
             # The filename uses the human-readable roll_number
-            cv2.imwrite(
-                str(student_dir / f"{name}_{roll_number}_{sample_num}.jpg"),
-                gray[y:y+h, x:x+w],
-            )
-    
-    if sample_num == 0:
-        # Clean up empty directory if no faces were found
-        # os.rmdir(student_dir) # Be careful with this in async context
-        raise HTTPException(status_code=400, detail="No faces could be detected in the uploaded images.")
-        
-    return {"message": f"{sample_num} face samples saved for {name} ({roll_number}). Ready for training."}
+            source = f"{student_dir.name}/{name}_{roll_number}_{sample_num}.jpg"
+            cv2.imwrite(str(config.TRAINING_IMAGE_DIR / source), crop)
+            sources.append(source)
+        if crops and roll_number.isdigit():
+            sample_store.append(crops, [int(roll_number)] * len(crops), sources)
+    return sources
+
+
+def _next_sample_number(student_dir) -> int:
+    """Returns the sample number after the highest one saved in `student_dir`."""
+    return max((sample_number(file) for file in os.listdir(student_dir)), default=0) + 1
+
+
+def train_model(full: bool = False, progress: Optional[Callable] = None):
+    """
+    Trains the LBPH face recognition model.
 
+    By default only the images added since the last training (according to the
+    training manifest) are folded into the existing model with
+    `recognizer.update`. A full rebuild happens when `full` is set, when there is
+    no model or manifest yet, or when previously trained images were removed,
+    since LBPH cannot forget samples.
 
-def train_model():
-    """Trains the LBPH face recognition model."""
+    `progress`, if given, is called as progress(phase, loaded, total) while the
+    training images are loaded and the model is built.
+    """
     if not os.path.exists(config.HAAR_CASCADE_PATH):
         raise HTTPException(status_code=500, detail="Haar Cascade file not found.")
-        
+
+    # Two trainings writing the same model file would clobber each other.
+    with _training_lock:
+        started = time.perf_counter()
+        result = _train_model(full, progress or _no_progress)
+        TRAINING_SECONDS.observe(time.perf_counter() - started, result["mode"])
+        return result
+
+
+def _no_progress(phase, loaded=0, total=0):
+    pass
+
+
+def _train_model(full: bool, progress: Callable):
+    # Pick up JPEGs added or removed outside save_face_images (and migrate an
+    # existing TrainingImage tree on first use).
+    progress("syncing")
+    sync_sample_store(progress)
+
+    generation = sample_store.generation
+    samples, labels = sample_store.load()
+    manifest = read_training_manifest()
+    trained_rows = manifest.get("rows", 0)
+    # Map labels to classes up front, so a database problem fails the run before
+    # anything is published.
+    student_classes = _student_classes()
+
+    # The model is a prefix of the store as long as no rows were removed since.
+    incremental = (
+        not full
+        and manifest.get("generation") == generation
+        and 0 < trained_rows <= len(labels)
+        and os.path.exists(config.TRAINED_MODEL_PATH)
+    )
+
     recognizer = cv2.face.LBPHFaceRecognizer_create()
-    
+
+    staged = []
     try:
-        # Pass the database session to map roll_number back to student.id
-        # This requires modifying get_images_and_labels or handling it differently.
-        # Let's simplify: We will train using roll_number as the label ID.
-        faces, ids = get_images_and_labels(config.TRAINING_IMAGE_DIR)
-        if not faces:
-             raise HTTPException(status_code=400, detail="No training data found.")
-        
-        recognizer.train(faces, np.array(ids))
-        recognizer.save(str(config.TRAINED_MODEL_PATH))
+        if incremental:
+            if trained_rows == len(labels):
+                return {"message": "Model is already up to date.", "mode": "incremental", "new_samples": 0}
+
+            # Views into the memory-mapped store: no decoding, no copies.
+            faces = list(samples[trained_rows:])
+            progress("training", len(faces), len(faces))
+            recognizer.read(str(config.TRAINED_MODEL_PATH))
+            recognizer.update(faces, labels[trained_rows:])
+        else:
+            # Train using roll_number as the label ID.
+            faces = list(samples)
+            if not faces:
+                raise HTTPException(status_code=400, detail="No training data found.")
+            progress("training", len(faces), len(faces))
+            recognizer.train(faces, labels)
+
+        # Every artifact is staged before any is published, so a failure leaves
+        # the live model, shards and manifest consistent with each other.
+        staged = [stage_model(recognizer)]
+        progress("sharding", len(faces), len(faces))
+        stale = train_shards(samples, labels, student_classes, trained_rows if incremental else 0, staged)
+        progress("publishing", len(faces), len(faces))
+        publish_staged(staged)
+        staged = []
+        write_training_manifest(generation, len(labels))
+        for path in stale:
+            os.remove(path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Model training failed: {e}")
+    finally:
+        for tmp_path, _ in staged:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
-    return {"message": f"Model trained successfully for {len(set(ids))} users."}
+    return {
+        "message": f"Model trained successfully for {len(np.unique(labels))} users.",
+        "mode": "incremental" if incremental else "full",
+        "new_samples": len(faces),
+    }
 
 
-def get_images_and_labels(path):
-    """Gets images and uses the roll_number from the filename as the label."""
-    image_paths = [os.path.join(path, f) for f in os.listdir(path) if not f.startswith('.')]
+def sync_sample_store(progress: Callable = None, chunk_size: int = 500) -> int:
+    """
+    Brings the sample store in line with the TrainingImage tree.
+
+    Rows whose JPEG was deleted are compacted away (without re-decoding the
+    rest), and JPEGs not yet in the store are decoded and appended. On an empty
+    store this is the one-shot migration of the whole tree. Returns the row count.
+    """
+    progress = progress or _no_progress
+    with sample_store.lock:
+        image_labels = list_training_images(config.TRAINING_IMAGE_DIR)
+        stored = sample_store.sources()
+
+        keep = np.array([source in image_labels for source in stored], dtype=bool)
+        if not keep.all():
+            sample_store.compact(keep)
+
+        stored = set(stored)
+        missing = [(path, label) for path, label in image_labels.items() if path not in stored]
+        for start in range(0, len(missing), chunk_size):
+            chunk = dict(missing[start:start + chunk_size])
+            faces, ids = load_images(config.TRAINING_IMAGE_DIR, chunk)
+            sample_store.append(faces, ids, list(chunk))
+            progress("migrating", start + len(chunk), len(missing))
+        return sample_store.count()
+
+
+def train_shards(samples: np.ndarray, labels: np.ndarray, student_classes: Dict[int, str], start: int = 0,
+                 staged: list = None) -> list:
+    """
+    Trains one model shard per class, so recognition for a lecture only has to
+    match against that class's students.
+
+    With `start` > 0 only the shards of classes that gained samples from row
+    `start` on are touched, and existing shards are updated. With `start` == 0
+    every shard is rebuilt. The shards are staged (see stage_model) and added to
+    `staged` for the caller to publish; returns the paths of the shards of
+    vanished classes, for the caller to remove once it has.
+    """
+    staged = [] if staged is None else staged
+    row_classes = np.array([student_classes.get(int(label)) for label in labels], dtype=object)
+    if start:
+        classes = {c for c in row_classes[start:] if c is not None}
+    else:
+        classes = set(student_classes.values())
+
+    for student_class in sorted(classes):
+        rows = np.flatnonzero(row_classes == student_class)
+        path = shard_path(student_class)
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        if start and os.path.exists(path):
+            new_rows = rows[rows >= start]
+            recognizer.read(str(path))
+            recognizer.update([samples[i] for i in new_rows], labels[new_rows])
+        elif len(rows):
+            recognizer.train([samples[i] for i in rows], labels[rows])
+        else:
+            continue
+        staged.append(stage_model(recognizer, path))
+
+    if start:
+        return []
+    keep = {shard_path(c).name for c in classes} | {os.path.basename(tmp_path) for tmp_path, _ in staged}
+    return [
+        config.MODEL_SHARD_DIR / file for file in os.listdir(config.MODEL_SHARD_DIR)
+        if file.endswith(".yml") and file not in keep
+    ]
+
+
+def _student_classes() -> Dict[int, str]:
+    """Returns {label: class} for every student with a numeric roll number and a class."""
+    db = SessionLocal()
+    try:
+        rows = db.query(Student.rollNumber, Student.student_class).filter(Student.student_class.isnot(None)).all()
+    finally:
+        db.close()
+    return {int(roll): student_class for roll, student_class in rows if roll.isdigit() and student_class}
+
+
+def publish_model(recognizer, model_path=None):
+    """Saves a trained recognizer as the live model (or a class shard)."""
+    publish_staged([stage_model(recognizer, model_path)])
+
+
+def stage_model(recognizer, model_path=None) -> Tuple[Path, Path]:
+    """
+    Writes a trained recognizer next to its live path without publishing it.
+    Returns (temporary path, live path) for publish_staged.
+    """
+    model_path = model_path or config.TRAINED_MODEL_PATH
+    tmp_path = model_path.with_name(f"{model_path.stem}.tmp{model_path.suffix}")
+    recognizer.save(str(tmp_path))
+    return tmp_path, model_path
+
+
+def publish_staged(staged: List[Tuple[Path, Path]]):
+    """
+    Renames staged models into place, so readers never see a half-written
+    Trainner.yml, and tells the registry about them.
+    """
+    for tmp_path, model_path in staged:
+        os.replace(tmp_path, model_path)
+    registry.notify_model_updated()
+    # Cached recognitions were made with the previous model.
+    recognition_cache.clear()
+
+
+# --- Training manifest ---
+def read_training_manifest() -> dict:
+    """
+    Returns which sample-store rows the saved model was trained on, as
+    {"generation": store generation, "rows": number of leading rows}.
+    """
+    try:
+        with open(config.TRAINING_MANIFEST_PATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_training_manifest(generation: str, rows: int):
+    """Records which sample-store rows the saved model was trained on."""
+    tmp_path = f"{config.TRAINING_MANIFEST_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"generation": generation, "rows": rows}, f)
+    os.replace(tmp_path, config.TRAINING_MANIFEST_PATH)
+
+
+# --- Training images ---
+def list_training_images(path) -> Dict[str, int]:
+    """
+    Lists the training images under `path` as {relative image path: label}.
+    The label is the roll number taken from the directory name: "123_JohnDoe" -> 123.
+    """
+    image_labels = {}
+    for student_dir in sorted(os.listdir(path)):
+        image_path = os.path.join(path, student_dir)
+        if student_dir.startswith('.') or not os.path.isdir(image_path):
+            continue
+
+        roll_number_str = student_dir.split("_")[0]
+        try:
+            # The recognizer requires integer labels
+            label = int(roll_number_str)
+        except ValueError:
+            print(f"Warning: Could not parse roll number from {image_path}. Skipping.")
+            continue
+
+        for file in sorted(os.listdir(image_path)):
+            if file.endswith(('.png', '.jpg', '.jpeg')):
+                image_labels[f"{student_dir}/{file}"] = label
+    return image_labels
+
+
+def load_images(path, image_labels: Dict[str, int], progress: Callable = _no_progress):
+    """Loads the given images (relative to `path`) as grayscale arrays with their labels."""
     faces = []
     ids = []
-    
-    for image_path in image_paths:
-        for file in os.listdir(image_path):
-            if file.endswith(('.png', '.jpg', '.jpeg')):
-                full_path = os.path.join(image_path, file)
-                pil_image = Image.open(full_path).convert("L")
-                image_np = np.array(pil_image, "uint8")
-                
-                # Extract roll number from directory name: "123_JohnDoe" -> "123"
-                roll_number_str = os.path.basename(image_path).split("_")[0]
-                try:
-                    # The recognizer requires integer labels
-                    ids.append(int(roll_number_str))
-                    faces.append(image_np)
-                except ValueError:
-                    print(f"Warning: Could not parse roll number from {image_path}. Skipping.")
-                    continue
-    return faces, ids
\ No newline at end of file
+    total = len(image_labels)
+    for relative_path, label in image_labels.items():
+        pil_image = Image.open(os.path.join(path, relative_path)).convert("L")
+        faces.append(np.array(pil_image, "uint8"))
+        ids.append(label)
+        progress("loading", len(faces), total)
+    return faces, ids
+
+
+def get_images_and_labels(path):
+    """Gets images and uses the roll_number from the filename as the label."""
+    return load_images(path, list_training_images(path))
@@ -0,0 +1,98 @@
+from typing import List, Optional, Tuple
+
+from ..utils.image_utils import box_iou
+
+Box = Tuple[int, int, int, int]
+
+
+class Track:
+    """One face followed across the frames of a stream."""
+
+    def __init__(self, track_id: int, box: Box, frame: int):
+        self.id = track_id
+        self.box = box
+        self.label: Optional[int] = None
+        self.confidence: Optional[float] = None
+        self.last_seen = frame
+        # Frame of the last recognition attempt, or None if never attempted.
+        self.last_attempt: Optional[int] = None
+
+    @property
+    def identified(self) -> bool:
+        return self.label is not None
+
+
+class FaceTracker:
+    """
+    Follows faces between frames by box overlap, so each face only has to be
+    recognized once.
+
+    Each frame's detections are matched to the existing tracks greedily by IoU.
+    A track that has been identified keeps its label; an unidentified track is
+    only retried every `retry_frames` frames. Tracks unseen for more than
+    `max_missed_frames` frames are dropped.
+    """
+
+    def __init__(self, iou_threshold: float, max_missed_frames: int, retry_frames: int, confidence_threshold: float):
+        self.iou_threshold = iou_threshold
+        self.max_missed_frames = max_missed_frames
+        self.retry_frames = retry_frames
+        self.confidence_threshold = confidence_threshold
+        self.tracks: List[Track] = []
+        self._next_id = 1
+
+    def settled_boxes(self, frame: int) -> List[Box]:
+        """
+        Boxes of the tracks that need no recognition in `frame`: identified ones,
+        and unidentified ones that were attempted too recently to retry.
+        """
+        return [
+            track.box for track in self.tracks
+            if track.identified
+            or (track.last_attempt is not None and frame - track.last_attempt < self.retry_frames)
+        ]
+
+    def update(self, detections: List[dict], frame: int) -> List[Track]:
+        """
+        Advances the tracks with one frame's detections, as returned by
+        attendance_service.recognize_frame. Returns the tracks identified in this frame.
+        """
+        pairs = sorted(
+            (
+                (box_iou(detection["box"], track.box), d, t)
+                for d, detection in enumerate(detections)
+                for t, track in enumerate(self.tracks)
+            ),
+            key=lambda pair: pair[0],
+            reverse=True,
+        )
+        matched = {}
+        used_tracks = set()
+        for iou, d, t in pairs:
+            if iou < self.iou_threshold:
+                break
+            if d in matched or t in used_tracks:
+                continue
+            matched[d] = self.tracks[t]
+            used_tracks.add(t)
+
+        identified = []
+        for d, detection in enumerate(detections):
+            track = matched.get(d)
+            if track is None:
+                track = Track(self._next_id, tuple(detection["box"]), frame)
+                self._next_id += 1
+                self.tracks.append(track)
+            track.box = tuple(detection["box"])
+            track.last_seen = frame
+
+            if track.identified or detection["label"] is None:
+                continue
+            track.last_attempt = frame
+            if detection["confidence"] < self.confidence_threshold:
+                track.label = detection["label"]
+                track.confidence = detection["confidence"]
+                identified.append(track)
+
+        self.tracks = [track for track in self.tracks if frame - track.last_seen <= self.max_missed_frames]
+        return identified
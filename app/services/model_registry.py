@@ -0,0 +1,239 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from typing import Optional
+
+from .. import config
+from ..utils.lazy_import import lazy_import
+from ..utils.metrics import MODEL_LOAD_SECONDS
+from .roster_matcher import matcher_for
+
+cv2 = lazy_import("cv2")
+
+
+def shard_path(student_class: str):
+    """Path of the model shard trained on the students of one class."""
+    safe = re.sub(r"[^A-Za-z0-9_-]", "_", student_class)
+    digest = hashlib.sha1(student_class.encode("utf-8")).hexdigest()[:8]
+    return config.MODEL_SHARD_DIR / f"{safe}-{digest}.yml"
+
+
+class LoadedModel:
+    """A recognizer together with the file version it was loaded from."""
+
+    def __init__(self, path, recognizer, version: int, loaded_at: datetime, load_seconds: float):
+        self.path = path
+        self.recognizer = recognizer
+        self.version = version
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+        self.last_check = time.monotonic()
+        # Vectorized matcher over this model's histograms, built on first use.
+        self.matcher = None
+
+
+class ModelRegistry:
+    """
+    Process-wide holder for the LBPH recognizers and the Haar cascade.
+
+    The global model (every enrolled student) and the per-class shards are each
+    parsed once and reloaded only when their file's mtime changes (or when
+    train_model signals a new model). A reload builds the new recognizer on the
+    side and swaps it in with a single reference assignment, so requests keep
+    using the previous model until the new one is fully loaded. At most
+    MODEL_SHARD_CACHE_SIZE shards are kept, least recently used first out.
+    """
+
+    def __init__(self, model_path=None, cascade_path=None, shard_cache_size: int = None):
+        self.model_path = model_path or config.TRAINED_MODEL_PATH
+        self.cascade_path = cascade_path or config.HAAR_CASCADE_PATH
+        self.shard_cache_size = shard_cache_size or config.MODEL_SHARD_CACHE_SIZE
+        self._global = None
+        self._shards = OrderedDict()
+        # _load_lock serializes model loads; _cache_lock only guards the lookups,
+        # so a slow reload never blocks requests served by the current model.
+        self._load_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        # cv2.CascadeClassifier is not safe to share between threads, so each
+        # thread parses the cascade once and keeps its own copy.
+        self._local = threading.local()
+
+    # --- Recognizer ---
+    def get_recognizer(self, student_class: Optional[str] = None):
+        """
+        Returns the recognizer for a class (or the global one), reloading it
+        first if its model file changed.
+        """
+        return self.get_model(student_class).recognizer
+
+    def get_matcher(self, student_class: Optional[str] = None):
+        """Returns the roster matcher for the class's (or the global) recognizer."""
+        return matcher_for(self.get_model(student_class), use_centroids=config.ROSTER_MATCHER_CENTROIDS)
+
+    def get_model(self, student_class: Optional[str] = None) -> LoadedModel:
+        """
+        Returns the loaded shard for `student_class`, falling back to the global
+        model when no class is given or the class has no shard.
+        """
+        if student_class:
+            path = shard_path(student_class)
+            if student_class in self._shards or os.path.exists(path):
+                return self._get(student_class, path)
+        return self._get(None, self.model_path)
+
+    def _get(self, key, path) -> LoadedModel:
+        with self._cache_lock:
+            model = self._lookup(key)
+
+        if model is None:
+            # Nothing to serve yet, so this request has to wait for the load.
+            with self._load_lock:
+                with self._cache_lock:
+                    model = self._lookup(key)
+                if model is None:
+                    model = self._load(path, None)
+                    with self._cache_lock:
+                        self._remember(key, model)
+            return model
+
+        now = time.monotonic()
+        if now - model.last_check >= config.MODEL_RELOAD_CHECK_INTERVAL:
+            model.last_check = now
+            if self._disk_version(path) != model.version:
+                # Only one thread reloads; everyone else keeps serving the old model.
+                if self._load_lock.acquire(blocking=False):
+                    try:
+                        model = self._load(path, model)
+                        with self._cache_lock:
+                            self._remember(key, model)
+                    finally:
+                        self._load_lock.release()
+        return model
+
+    def _lookup(self, key) -> Optional[LoadedModel]:
+        if key is None:
+            return self._global
+        model = self._shards.get(key)
+        if model is not None:
+            self._shards.move_to_end(key)
+        return model
+
+    def _remember(self, key, model: LoadedModel):
+        if key is None:
+            self._global = model
+            return
+        self._shards[key] = model
+        self._shards.move_to_end(key)
+        while len(self._shards) > self.shard_cache_size:
+            self._shards.popitem(last=False)
+
+    def model_version(self, student_class: Optional[str] = None) -> tuple:
+        """
+        Identifies the model get_model(student_class) would serve, from the
+        model file on disk, without loading it.
+        """
+        if student_class:
+            path = shard_path(student_class)
+            version = self._disk_version(path)
+            if version is not None:
+                return (path.name, version)
+        return (os.path.basename(self.model_path), self._disk_version(self.model_path))
+
+    def loaded_version(self, student_class: Optional[str] = None) -> Optional[tuple]:
+        """
+        Identifies, like model_version(), the model this process last served for
+        `student_class`: the one a prediction just used, even if a newer file is
+        already on disk. None if no model is loaded.
+        """
+        with self._cache_lock:
+            model = self._shards.get(student_class) if student_class else None
+            model = model or self._global
+        if model is None:
+            return None
+        return (os.path.basename(model.path), model.version)
+
+    def notify_model_updated(self):
+        """Called after a new model has been written so the next request picks it up."""
+        with self._cache_lock:
+            models = [self._global, *self._shards.values()]
+        for model in models:
+            if model is not None:
+                model.last_check = float("-inf")
+
+    def _disk_version(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self, path, current: Optional[LoadedModel]) -> LoadedModel:
+        version = self._disk_version(path)
+        if version is None:
+            if current is not None:
+                return current
+            raise HTTPException(status_code=500, detail="Model not found. Please train the model first via the /face-recognition/train endpoint.")
+
+        started = time.perf_counter()
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        try:
+            recognizer.read(str(path))
+        except cv2.error as e:
+            # A half-written or corrupt file: keep the model we already have.
+            if current is not None:
+                print(f"Warning: Could not reload model from {path}: {e}")
+                return current
+            raise HTTPException(status_code=500, detail=f"Failed to load the trained model: {e}")
+
+        load_seconds = time.perf_counter() - started
+        MODEL_LOAD_SECONDS.observe(load_seconds)
+        return LoadedModel(
+            path=path,
+            recognizer=recognizer,
+            version=version,
+            loaded_at=datetime.now(timezone.utc),
+            load_seconds=load_seconds,
+        )
+
+    # --- Detector ---
+    def get_detector(self):
+        """Returns this thread's Haar cascade, loading it on first use."""
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            if not os.path.exists(self.cascade_path):
+                raise HTTPException(status_code=500, detail="Haar Cascade file not found.")
+            detector = cv2.CascadeClassifier(str(self.cascade_path))
+            self._local.detector = detector
+        return detector
+
+    # --- Introspection ---
+    @staticmethod
+    def _describe(model: Optional[LoadedModel]) -> dict:
+        if model is None:
+            return {"loaded": False, "version": None, "loaded_at": None, "load_seconds": None}
+        return {
+            "loaded": True,
+            "version": model.version,
+            "loaded_at": model.loaded_at.isoformat(),
+            "load_seconds": round(model.load_seconds, 3),
+        }
+
+    def status(self) -> dict:
+        """Describes the currently loaded global model and cached class shards."""
+        status = self._describe(self._global)
+        with self._cache_lock:
+            shards = list(self._shards.items())
+        status["shards"] = {key: self._describe(model) for key, model in shards}
+        return status
+
+
+registry = ModelRegistry()
+
+
+def worker_status() -> dict:
+    """Worker-pool job: the registry status of the worker process that runs it."""
+    return {"worker_pid": os.getpid(), **registry.status()}
@@ -0,0 +1,165 @@
+import threading
+import numpy as np
+from typing import List, Sequence, Tuple
+
+# Upper bound on the scratch memory one chunk of the distance computation may use.
+_CHUNK_BYTES = 64 << 20
+
+
+def lbp_histograms(faces: np.ndarray, radius: int = 1, neighbors: int = 8,
+                   grid_x: int = 8, grid_y: int = 8) -> np.ndarray:
+    """
+    Computes LBPH feature vectors for a batch of equally sized grayscale faces.
+
+    Mirrors OpenCV's LBPHFaceRecognizer (circular extended LBP with bilinear
+    interpolation, then per-cell normalized histograms), so the vectors can be
+    compared with the histograms stored in a trained model. `faces` has shape
+    (n, height, width); the result has shape (n, grid_x * grid_y * 2**neighbors).
+    """
+    src = np.asarray(faces, dtype=np.float32)
+    if src.ndim == 2:
+        src = src[np.newaxis]
+    count, rows, cols = src.shape
+    center = src[:, radius:rows - radius, radius:cols - radius]
+    codes = np.zeros(center.shape, dtype=np.int32)
+    eps = np.finfo(np.float32).eps
+
+    for n in range(neighbors):
+        x = np.float32(radius * np.cos(2.0 * np.pi * n / neighbors))
+        y = np.float32(-radius * np.sin(2.0 * np.pi * n / neighbors))
+        fx, fy = int(np.floor(x)), int(np.floor(y))
+        cx, cy = int(np.ceil(x)), int(np.ceil(y))
+        tx, ty = x - fx, y - fy
+        w1, w2, w3, w4 = (1 - tx) * (1 - ty), tx * (1 - ty), (1 - tx) * ty, tx * ty
+
+        def shifted(dy, dx):
+            return src[:, radius + dy:rows - radius + dy, radius + dx:cols - radius + dx]
+
+        t = w1 * shifted(fy, fx) + w2 * shifted(fy, cx) + w3 * shifted(cy, fx) + w4 * shifted(cy, cx)
+        codes += (((t > center) | (np.abs(t - center) < eps)).astype(np.int32)) << n
+
+    patterns = 2 ** neighbors
+    height = codes.shape[1] // grid_y
+    width = codes.shape[2] // grid_x
+    cells = codes[:, :grid_y * height, :grid_x * width]
+    cells = cells.reshape(count, grid_y, height, grid_x, width).transpose(0, 1, 3, 2, 4)
+    cells = cells.reshape(count, grid_y * grid_x, height * width)
+
+    # One bincount over every (face, cell, pattern) triple at once.
+    offsets = np.arange(count * grid_y * grid_x, dtype=np.int64).reshape(count, grid_y * grid_x, 1) * patterns
+    counts = np.bincount((cells + offsets).ravel(), minlength=count * grid_y * grid_x * patterns)
+    histograms = counts.reshape(count, grid_y * grid_x * patterns).astype(np.float32)
+    return histograms / np.float32(height * width)
+
+
+def chi_square_distances(queries: np.ndarray, references: np.ndarray) -> np.ndarray:
+    """
+    Returns the (len(queries), len(references)) matrix of chi-square distances,
+    as computed by cv2.compareHist(..., HISTCMP_CHISQR_ALT).
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    out = np.empty((len(queries), len(references)), dtype=np.float32)
+    if len(queries) == 0 or len(references) == 0:
+        return out
+
+    row_bytes = len(queries) * queries.shape[1] * 4 * 3
+    chunk = max(1, _CHUNK_BYTES // row_bytes)
+    q = queries[:, np.newaxis, :]
+    for start in range(0, len(references), chunk):
+        h = references[np.newaxis, start:start + chunk, :]
+        total = q + h
+        diff = q - h
+        np.multiply(diff, diff, out=diff)
+        np.divide(diff, total, out=diff, where=total > np.finfo(np.float64).eps)
+        diff[total <= np.finfo(np.float64).eps] = 0
+        out[:, start:start + chunk] = 2 * diff.sum(axis=2)
+    return out
+
+
+class RosterMatcher:
+    """
+    Matches faces against the whole roster with one batched distance computation.
+
+    The LBP histograms of the trained model are held in one contiguous
+    (samples, features) float32 matrix, optionally collapsed to one centroid per
+    student. All faces of an image are scored against it at once, instead of one
+    linear scan per face as LBPHFaceRecognizer.predict does.
+    """
+
+    def __init__(self, histograms: np.ndarray, labels: np.ndarray, radius: int = 1,
+                 neighbors: int = 8, grid_x: int = 8, grid_y: int = 8, use_centroids: bool = False):
+        histograms = np.ascontiguousarray(histograms, dtype=np.float32)
+        labels = np.asarray(labels, dtype=np.int64).ravel()
+        if use_centroids and len(labels):
+            unique, inverse = np.unique(labels, return_inverse=True)
+            sums = np.zeros((len(unique), histograms.shape[1]), dtype=np.float64)
+            np.add.at(sums, inverse, histograms)
+            histograms = (sums / np.bincount(inverse)[:, np.newaxis]).astype(np.float32)
+            labels = unique
+        self.histograms = histograms
+        self.labels = labels
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.use_centroids = use_centroids
+
+    @classmethod
+    def from_recognizer(cls, recognizer, use_centroids: bool = False) -> "RosterMatcher":
+        """Builds a matcher from the histograms stored in a trained LBPHFaceRecognizer."""
+        histograms = recognizer.getHistograms()
+        matrix = np.vstack([np.asarray(h, dtype=np.float32).reshape(1, -1) for h in histograms]) \
+            if len(histograms) else np.empty((0, 0), dtype=np.float32)
+        return cls(
+            matrix,
+            np.asarray(recognizer.getLabels()).ravel(),
+            radius=recognizer.getRadius(),
+            neighbors=recognizer.getNeighbors(),
+            grid_x=recognizer.getGridX(),
+            grid_y=recognizer.getGridY(),
+            use_centroids=use_centroids,
+        )
+
+    def match(self, faces: Sequence[np.ndarray], k: int = 1) -> List[List[Tuple[int, float]]]:
+        """
+        Returns, for each face, up to `k` (label, distance) candidates for distinct
+        students, best first. Faces must all have the same size.
+        """
+        if len(faces) == 0 or len(self.labels) == 0:
+            return [[] for _ in faces]
+
+        queries = lbp_histograms(np.stack(faces), self.radius, self.neighbors, self.grid_x, self.grid_y)
+        distances = chi_square_distances(queries, self.histograms)
+
+        if not self.use_centroids:
+            # Best sample per student: sort by distance, keep each label's first hit.
+            results = []
+            for row in distances:
+                order = np.argsort(row, kind="stable")
+                _, first = np.unique(self.labels[order], return_index=True)
+                best = order[np.sort(first)][:k]
+                results.append([(int(self.labels[i]), float(row[i])) for i in best])
+            return results
+
+        k = min(k, len(self.labels))
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(distances, top):
+            candidates = candidates[np.argsort(row[candidates], kind="stable")]
+            results.append([(int(self.labels[i]), float(row[i])) for i in candidates])
+        return results
+
+
+_build_lock = threading.Lock()
+
+
+def matcher_for(model, use_centroids: bool) -> RosterMatcher:
+    """Returns the matcher for a loaded model, building it once per model version."""
+    matcher = getattr(model, "matcher", None)
+    if matcher is None or matcher.use_centroids != use_centroids:
+        with _build_lock:
+            matcher = getattr(model, "matcher", None)
+            if matcher is None or matcher.use_centroids != use_centroids:
+                matcher = RosterMatcher.from_recognizer(model.recognizer, use_centroids=use_centroids)
+                model.matcher = matcher
+    return matcher
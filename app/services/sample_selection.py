@@ -0,0 +1,79 @@
+import os
+from typing import List, Sequence
+
+from .. import config
+from ..utils.image_utils import dhash, hamming_distance
+from ..utils.lazy_import import lazy_import
+from .sample_store import normalize_crop
+
+cv2 = lazy_import("cv2")
+
+# Larger than any distance between two 64-bit hashes.
+_FAR = 65
+
+
+def crop_hash(crop) -> int:
+    """dHash of a face crop, taken after the same normalization training uses."""
+    return dhash(normalize_crop(crop))
+
+
+def select_diverse(hashes: Sequence[int], budget: int, max_duplicate_distance: int,
+                   kept: Sequence[int] = ()) -> List[int]:
+    """
+    Picks which candidates to keep, given the hashes of samples already `kept`.
+
+    Greedy farthest-first selection: repeatedly keeps the candidate farthest
+    (in Hamming distance) from everything kept so far, until the total reaches
+    `budget` or every remaining candidate is within `max_duplicate_distance`
+    bits of a kept sample. Ties go to the earlier candidate. Returns the
+    indices of the selected candidates, in order.
+    """
+    kept = list(kept)
+    nearest = [min((hamming_distance(h, k) for k in kept), default=_FAR) for h in hashes]
+    remaining = list(range(len(hashes)))
+    selected = []
+    while remaining and len(kept) < budget:
+        best = max(remaining, key=lambda i: (nearest[i], -i))
+        if nearest[best] <= max_duplicate_distance:
+            break
+        selected.append(best)
+        kept.append(hashes[best])
+        remaining.remove(best)
+        for i in remaining:
+            nearest[i] = min(nearest[i], hamming_distance(hashes[i], hashes[best]))
+    return sorted(selected)
+
+
+def directory_hashes(student_dir) -> dict:
+    """Returns {filename: dHash} for the sample images in a student's directory."""
+    hashes = {}
+    if not os.path.isdir(student_dir):
+        return hashes
+    for file in sorted(os.listdir(student_dir)):
+        if not file.endswith(('.png', '.jpg', '.jpeg')):
+            continue
+        image = cv2.imread(os.path.join(student_dir, file), cv2.IMREAD_GRAYSCALE)
+        if image is not None:
+            hashes[file] = crop_hash(image)
+    return hashes
+
+
+def sample_number(file: str) -> int:
+    """The sample number at the end of a sample filename ("Name_123_7.jpg" -> 7)."""
+    number = os.path.splitext(file)[0].rsplit("_", 1)[-1]
+    return int(number) if number.isdigit() else 0
+
+
+def plan_prune(student_dir, budget: int = None, max_duplicate_distance: int = None) -> List[str]:
+    """
+    Returns the sample files in `student_dir` that a re-selection would drop:
+    near-duplicates and, over the budget, the least diverse samples. Earlier
+    samples are preferred when otherwise equal.
+    """
+    budget = config.SAMPLES_PER_STUDENT if budget is None else budget
+    if max_duplicate_distance is None:
+        max_duplicate_distance = config.SAMPLE_DUPLICATE_MAX_DISTANCE
+    hashes = directory_hashes(student_dir)
+    files = sorted(hashes, key=lambda file: (sample_number(file), file))
+    keep = set(select_diverse([hashes[file] for file in files], budget, max_duplicate_distance))
+    return [file for i, file in enumerate(files) if i not in keep]
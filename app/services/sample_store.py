@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import uuid
+import numpy as np
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+from .. import config
+from ..utils.lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+def normalize_crop(crop: np.ndarray, size: int = None) -> np.ndarray:
+    """Resizes a grayscale face crop to the fixed square size used for training."""
+    size = size or config.SAMPLE_SIZE
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    if crop.shape != (size, size):
+        crop = cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA)
+    return np.ascontiguousarray(crop, dtype=np.uint8)
+
+
+class SampleStore:
+    """
+    Append-only store of fixed-size grayscale face crops for training.
+
+    The store is a directory holding:
+    - samples.u8: every crop as raw uint8 pixels, back to back, so the whole
+      file can be memory-mapped as an (N, size, size) array.
+    - labels.i32: the int32 label (roll number) of each row.
+    - sources.txt: the TrainingImage path each row came from, one per line.
+    - meta.json: the crop size and a generation id that changes whenever rows
+      are removed, so trained models can tell whether they are still a prefix
+      of the store.
+
+    Row i of each file describes the same sample. Writers append samples first,
+    then labels, then sources; an interrupted append is trimmed on the next access.
+    """
+
+    def __init__(self, directory, size: int):
+        self.directory = Path(directory)
+        self.size = size
+        # Re-entrant so callers can hold it across several store operations.
+        self.lock = threading.RLock()
+        self._samples_path = self.directory / "samples.u8"
+        self._labels_path = self.directory / "labels.i32"
+        self._sources_path = self.directory / "sources.txt"
+        self._meta_path = self.directory / "meta.json"
+
+    @property
+    def sample_bytes(self) -> int:
+        return self.size * self.size
+
+    # --- Metadata ---
+    def _read_meta(self) -> dict:
+        try:
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            meta = None
+        if meta is None or meta.get("size") != self.size:
+            # First use, or the crop size changed: start a fresh store.
+            meta = self._reset()
+        return meta
+
+    def _write_meta(self, meta: dict):
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _reset(self) -> dict:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in (self._samples_path, self._labels_path, self._sources_path):
+            open(path, "wb").close()
+        meta = {"generation": uuid.uuid4().hex, "size": self.size}
+        self._write_meta(meta)
+        return meta
+
+    @property
+    def generation(self) -> str:
+        with self.lock:
+            return self._read_meta()["generation"]
+
+    def reset(self):
+        """Removes every sample and starts a new generation."""
+        with self.lock:
+            self._reset()
+
+    # --- Reading ---
+    def _repair(self) -> int:
+        """Returns the number of complete rows, trimming any half-written append."""
+        self._read_meta()
+        samples_size = os.path.getsize(self._samples_path)
+        labels_size = os.path.getsize(self._labels_path)
+        sources = self._read_sources()
+        count = min(samples_size // self.sample_bytes, labels_size // 4, len(sources))
+
+        if samples_size != count * self.sample_bytes:
+            os.truncate(self._samples_path, count * self.sample_bytes)
+        if labels_size != count * 4:
+            os.truncate(self._labels_path, count * 4)
+        if len(sources) != count:
+            self._write_sources(sources[:count])
+        return count
+
+    def count(self) -> int:
+        with self.lock:
+            return self._repair()
+
+    def sources(self) -> List[str]:
+        """Returns the source path of every row."""
+        with self.lock:
+            count = self._repair()
+            return self._read_sources()[:count]
+
+    def _read_sources(self) -> List[str]:
+        with open(self._sources_path) as f:
+            return [line for line in f.read().split("\n") if line]
+
+    def _write_sources(self, sources: Sequence[str]):
+        with open(self._sources_path, "w") as f:
+            f.write("".join(f"{source}\n" for source in sources))
+
+    def load(self, start: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (samples, labels) from row `start` on.
+        `samples` is a read-only memory map, so nothing is copied or decoded.
+        """
+        with self.lock:
+            count = self._repair()
+        if count <= start:
+            return np.empty((0, self.size, self.size), np.uint8), np.empty(0, np.int32)
+
+        samples = np.memmap(self._samples_path, dtype=np.uint8, mode="r", shape=(count, self.size, self.size))
+        labels = np.fromfile(self._labels_path, dtype=np.int32, count=count)
+        return samples[start:], labels[start:]
+
+    # --- Writing ---
+    def append(self, crops: Sequence[np.ndarray], labels: Sequence[int], sources: Sequence[str]) -> int:
+        """Appends face crops with their labels and source paths. Returns the new row count."""
+        if not crops:
+            return self.count()
+        data = np.stack([normalize_crop(crop, self.size) for crop in crops])
+        label_array = np.asarray(labels, dtype=np.int32)
+
+        with self.lock:
+            count = self._repair()
+            with open(self._samples_path, "ab") as f:
+                f.write(data.tobytes())
+            with open(self._labels_path, "ab") as f:
+                f.write(label_array.tobytes())
+            with open(self._sources_path, "a") as f:
+                f.write("".join(f"{source}\n" for source in sources))
+            return count + len(data)
+
+    def compact(self, keep: np.ndarray):
+        """Keeps only the rows where `keep` is True, starting a new generation."""
+        with self.lock:
+            count = self._repair()
+            keep = np.asarray(keep, dtype=bool)[:count]
+            samples, labels = self.load()
+            sources = self._read_sources()[:count]
+
+            tmp_samples = f"{self._samples_path}.tmp"
+            tmp_labels = f"{self._labels_path}.tmp"
+            with open(tmp_samples, "wb") as f:
+                # Copy in slices to keep memory flat on large stores.
+                for start in range(0, count, 4096):
+                    f.write(np.ascontiguousarray(samples[start:start + 4096][keep[start:start + 4096]]).tobytes())
+            with open(tmp_labels, "wb") as f:
+                f.write(labels[keep].tobytes())
+            del samples
+
+            os.replace(tmp_samples, self._samples_path)
+            os.replace(tmp_labels, self._labels_path)
+            self._write_sources([source for source, kept in zip(sources, keep) if kept])
+            self._write_meta({"generation": uuid.uuid4().hex, "size": self.size})
+
+
+sample_store = SampleStore(config.SAMPLE_STORE_DIR, config.SAMPLE_SIZE)
@@ -0,0 +1,120 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from typing import Optional
+
+from . import face_rec_service
+
+# Number of finished jobs kept around for status lookups.
+MAX_JOB_HISTORY = 50
+
+
+class TrainingJob:
+    """State and progress of one background training run."""
+
+    def __init__(self, full: bool):
+        self.id = uuid.uuid4().hex
+        self.full = full
+        self.status = "queued"  # queued -> running -> succeeded | failed
+        self.phase = None
+        self.images_loaded = 0
+        self.images_total = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def report(self, phase: str, loaded: int = 0, total: int = 0):
+        """Progress callback handed to face_rec_service.train_model."""
+        self.phase = phase
+        self.images_loaded = loaded
+        self.images_total = total
+
+    def to_dict(self) -> dict:
+        if self.started_at is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "full": self.full,
+            "phase": self.phase,
+            "images_loaded": self.images_loaded,
+            "images_total": self.images_total,
+            "elapsed_seconds": round(elapsed, 1),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class TrainingJobQueue:
+    """
+    Runs model training in a background thread, one job at a time.
+
+    Requests that arrive while a job is queued or running are coalesced into that
+    job instead of starting another training run. The exception is a full
+    rebuild requested while an incremental job runs: it is queued as a
+    follow-up job, which later requests then coalesce into.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="training")
+        self._jobs = OrderedDict()
+        # The most recently submitted job.
+        self._latest = None
+        self._lock = threading.Lock()
+
+    def submit(self, full: bool = False) -> TrainingJob:
+        """Starts a training job, or returns the one that will cover this request."""
+        with self._lock:
+            job = self._latest
+            if job is not None and job.status == "queued":
+                # A full rebuild request upgrades a job that hasn't started yet.
+                job.full = job.full or full
+                return job
+            if job is not None and job.status == "running" and (job.full or not full):
+                return job
+
+            # Nothing in progress, or a full rebuild requested during an
+            # incremental run: queue a new job (the executor runs one at a time).
+            job = TrainingJob(full=full)
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_JOB_HISTORY:
+                self._jobs.popitem(last=False)
+            self._latest = job
+
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self._jobs.get(job_id)
+
+    def _run(self, job: TrainingJob):
+        # Under the lock, so submit() never upgrades a job that has already started.
+        with self._lock:
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            job.result = face_rec_service.train_model(full=job.full, progress=job.report)
+            job.status = "succeeded"
+            job.phase = "done"
+        except HTTPException as e:
+            job.status = "failed"
+            job.error = e.detail
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+
+training_jobs = TrainingJobQueue()
@@ -0,0 +1,141 @@
+"""
+Startup warm-up and readiness.
+
+Loads what the first attendance request would otherwise pay for (pooled
+database connections, and OpenCV, the cascade and the trained model in the
+worker processes, which do all detection and recognition) and records the
+outcome of each step. The app is ready once the warm-up has finished: once the
+database was reachable, or WARMUP_DB_MAX_ATTEMPTS attempts have failed.
+"""
+import asyncio
+import time
+from typing import Optional
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from .. import config
+from ..database import connection
+from .model_registry import registry
+from .sample_store import normalize_crop
+from .worker_pool import WorkerPool, enrollment_pool, recognition_pool
+
+
+def dummy_inference(with_model: bool = True) -> bool:
+    """
+    Worker-pool job: runs detection, and a prediction if a model is trained,
+    on a blank image, so the worker's OpenCV first-call setup and model load
+    happen now rather than in a request. Returns whether a model was used.
+    """
+    gray = np.full((config.SAMPLE_SIZE * 2, config.SAMPLE_SIZE * 2), 128, dtype=np.uint8)
+    registry.get_detector().detectMultiScale(gray, 1.3, 5)
+    if not with_model:
+        return False
+    try:
+        recognizer = registry.get_recognizer()
+    except HTTPException:
+        # Nothing trained yet.
+        return False
+    recognizer.predict(normalize_crop(gray))
+    return True
+
+
+def _open_connections(count: int):
+    """Checks out `count` pooled connections at once (running SELECT 1 on each), then returns them."""
+    connections = []
+    try:
+        for _ in range(count):
+            conn = connection.engine.connect()
+            connections.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in connections:
+            conn.close()
+
+
+class WarmUp:
+    """Runs the warm-up steps once, in the background, and reports readiness."""
+
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Step name -> {"ok", "seconds", "detail"}.
+        self.steps = {}
+        self._task = None
+
+    def start(self):
+        """Schedules the warm-up on the running event loop (once)."""
+        if self._task is None:
+            self.started_at = time.time()
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def skip(self):
+        """Marks the app ready without warming up (WARMUP_ENABLED off)."""
+        self.ready = True
+        self.finished_at = time.time()
+
+    async def run(self):
+        # Only the database is retried; the other steps report their problems
+        # (e.g. no model trained yet) without holding readiness back.
+        attempts = 1
+        while not await self._step("database", self._warm_database()):
+            if attempts >= config.WARMUP_DB_MAX_ATTEMPTS:
+                print(f"Warm-up: database still unreachable after {attempts} attempts; not waiting for it.")
+                break
+            attempts += 1
+            await asyncio.sleep(config.WARMUP_RETRY_INTERVAL)
+        await self._step("recognition_workers", self._warm_pool(recognition_pool, with_model=True))
+        await self._step("enrollment_workers", self._warm_pool(enrollment_pool, with_model=False))
+        self.finished_at = time.time()
+        self.ready = True
+
+    async def _step(self, name: str, job) -> bool:
+        started = time.perf_counter()
+        try:
+            detail = await job
+            ok = True
+        except Exception as e:
+            detail = getattr(e, "detail", None) or f"{type(e).__name__}: {e}"
+            ok = False
+            print(f"Warm-up step '{name}' failed: {detail}")
+        self.steps[name] = {"ok": ok, "seconds": round(time.perf_counter() - started, 3), "detail": detail}
+        return ok
+
+    async def _warm_database(self):
+        count = max(1, min(config.WARMUP_DB_CONNECTIONS, config.DB_POOL_SIZE))
+        await run_in_threadpool(_open_connections, count)
+        # The async engine (used by login) is created lazily; create and fill it
+        # now too, if its driver is installed.
+        unavailable = connection.async_engine_unavailable()
+        if unavailable:
+            print(f"Warm-up: skipping the async engine: {unavailable}")
+            return f"{count} connections (async engine skipped: {unavailable})"
+        sessionmaker = connection.get_async_sessionmaker()
+        sessions = [sessionmaker() for _ in range(count)]
+        try:
+            await asyncio.gather(*(session.execute(text("SELECT 1")) for session in sessions))
+        finally:
+            await asyncio.gather(*(session.close() for session in sessions))
+        return f"{count} connections per engine"
+
+    @staticmethod
+    async def _warm_pool(pool: WorkerPool, with_model: bool):
+        # One job per worker; the pool doesn't pin jobs to workers, so this
+        # warms most of them rather than guaranteeing every one.
+        results = await asyncio.gather(*(pool.run(dummy_inference, with_model) for _ in range(pool.workers)))
+        return f"{pool.workers} workers" + (", model loaded" if any(results) else "")
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": self.steps,
+        }
+
+
+warmup = WarmUp()
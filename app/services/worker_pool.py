@@ -0,0 +1,143 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+
+from .. import config
+from ..utils import metrics
+
+
+def _invoke(fn, args):
+    """
+    Runs a job inside a worker process.
+    HTTPException does not survive pickling, so it is sent back as (status, detail).
+    The metrics the job recorded travel back with the result.
+    """
+    try:
+        return True, fn(*args), metrics.drain()
+    except HTTPException as e:
+        return False, (e.status_code, e.detail), metrics.drain()
+
+
+def _warm_recognizer():
+    """Worker initializer: loads the recognizer and cascade before the first job arrives."""
+    from .model_registry import registry
+    metrics.start_forwarding()
+    try:
+        registry.get_detector()
+        registry.get_recognizer()
+    except HTTPException:
+        # No model trained yet; the first job will report it.
+        pass
+
+
+def _warm_detector():
+    """Worker initializer: loads the Haar cascade before the first job arrives."""
+    from .model_registry import registry
+    metrics.start_forwarding()
+    try:
+        registry.get_detector()
+    except HTTPException:
+        pass
+
+
+class WorkerPool:
+    """
+    A pool of worker processes for CPU-bound jobs, awaited from async routes.
+
+    At most `max_pending` jobs may be queued or running at once; beyond that new
+    jobs are rejected with 503 so callers back off instead of piling up. Each job
+    is given `timeout` seconds before the caller gets a 504.
+    """
+
+    def __init__(self, name: str, workers: int, max_pending: int, timeout: float, initializer=None):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.initializer = initializer
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Creates the worker processes (if not already running)."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self.initializer,
+                )
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args):
+        """Runs `fn(*args)` in a worker process and returns its result."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"The {self.name} queue is full. Please retry shortly.",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+
+        try:
+            future = self.start().submit(_invoke, fn, args)
+        except BrokenProcessPool:
+            self._release()
+            self.shutdown()
+            raise HTTPException(status_code=503, detail=f"The {self.name} workers are restarting. Please retry shortly.")
+        # The slot is freed when the job really finishes, not when the caller
+        # gives up, so timed-out jobs still count against the queue depth.
+        future.add_done_callback(self._release)
+
+        try:
+            ok, result, observations = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise HTTPException(status_code=504, detail=f"The {self.name} job timed out.")
+        except BrokenProcessPool:
+            self.shutdown()
+            raise HTTPException(status_code=503, detail=f"The {self.name} workers are restarting. Please retry shortly.")
+
+        metrics.replay(observations)
+        if not ok:
+            status_code, detail = result
+            raise HTTPException(status_code=status_code, detail=detail)
+        return result
+
+
+recognition_pool = WorkerPool(
+    name="recognition",
+    workers=config.RECOGNITION_WORKERS,
+    max_pending=config.RECOGNITION_MAX_PENDING,
+    timeout=config.RECOGNITION_JOB_TIMEOUT,
+    initializer=_warm_recognizer,
+)
+
+# A separate, smaller pool for enrollment uploads, so a bulk enrollment cannot
+# starve live attendance marking of recognition workers.
+enrollment_pool = WorkerPool(
+    name="enrollment",
+    workers=config.ENROLLMENT_WORKERS,
+    max_pending=config.ENROLLMENT_MAX_PENDING,
+    timeout=config.ENROLLMENT_JOB_TIMEOUT,
+    initializer=_warm_detector,
+)
@@ -1,18 +1,135 @@
+import io
 import numpy as np
-import cv2
 from fastapi import UploadFile
 
+from .lazy_import import lazy_import
+from .metrics import STAGE_SECONDS
+
+cv2 = lazy_import("cv2")
+Image = lazy_import("PIL.Image")
+
+# Smallest face (in pixels) the default Haar cascade can find: its window is 24x24.
+CASCADE_MIN_FACE = 24
+
+# Names of the cv2.imdecode flags that let libjpeg decode straight to 1/2,
+# 1/4 or 1/8 scale (looked up when used, so importing this doesn't load cv2).
+_REDUCED_GRAYSCALE_FLAGS = {
+    1: "IMREAD_GRAYSCALE",
+    2: "IMREAD_REDUCED_GRAYSCALE_2",
+    4: "IMREAD_REDUCED_GRAYSCALE_4",
+    8: "IMREAD_REDUCED_GRAYSCALE_8",
+}
+
 async def to_cv2_image(file: UploadFile) -> np.ndarray:
     """
     Converts a FastAPI UploadFile object to a CV2 image (numpy array).
     """
     # Read the file content into a byte stream
     contents = await file.read()
-    
+
+    return decode_image(contents)
+
+def decode_image(contents: bytes) -> np.ndarray:
+    """
+    Decodes raw image bytes into a CV2 image (numpy array).
+    Returns None if the bytes are not a decodable image.
+    """
     # Convert byte stream to a numpy array
     nparr = np.frombuffer(contents, np.uint8)
-    
+
     # Decode the numpy array into a CV2 image
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    
-    return img
\ No newline at end of file
+    with STAGE_SECONDS.time("decode"):
+        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+    return img
+
+def decode_grayscale(contents: bytes, min_dimension: int = None) -> np.ndarray:
+    """
+    Decodes raw image bytes straight to grayscale, skipping the color conversion.
+
+    If `min_dimension` is given, the image is decoded at the largest reduction
+    (1/2, 1/4 or 1/8) that keeps its long side at least that many pixels. For
+    JPEGs the reduction happens inside the decoder, which is much cheaper than
+    decoding at full resolution and resizing. Returns None if undecodable.
+    """
+    nparr = np.frombuffer(contents, np.uint8)
+
+    reduction = 1
+    if min_dimension:
+        try:
+            # Only the header is parsed here, not the pixels.
+            long_side = max(Image.open(io.BytesIO(contents)).size)
+        except Exception:
+            long_side = 0
+        while reduction < 8 and long_side // (reduction * 2) >= min_dimension:
+            reduction *= 2
+
+    with STAGE_SECONDS.time("decode"):
+        return cv2.imdecode(nparr, getattr(cv2, _REDUCED_GRAYSCALE_FLAGS[reduction]))
+
+def detect_faces(detector, gray: np.ndarray, max_dimension: int = None,
+                 min_face_fraction: float = None, max_face_fraction: float = None,
+                 scale_factor: float = 1.3, min_neighbors: int = 5) -> np.ndarray:
+    """
+    Runs a Haar cascade on a downscaled copy of `gray` and returns the face boxes
+    (x, y, w, h) in `gray`'s own coordinates.
+
+    - **max_dimension**: Downscale so the long side is at most this many pixels.
+      Faces narrower than the cascade window (CASCADE_MIN_FACE) after the
+      downscale are not found.
+    - **min_face_fraction** / **max_face_fraction**: Optional expected face
+      width as a fraction of the image width; limits the scales the cascade
+      searches. The minimum never goes below the cascade window.
+    """
+    height, width = gray.shape[:2]
+    scale = 1.0
+    if max_dimension and max(height, width) > max_dimension:
+        scale = max_dimension / max(height, width)
+
+    small = gray
+    if scale < 1.0:
+        small = cv2.resize(gray, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+    small_width = small.shape[1]
+    kwargs = {}
+    if min_face_fraction:
+        side = max(CASCADE_MIN_FACE, int(min_face_fraction * small_width))
+        kwargs["minSize"] = (side, side)
+    if max_face_fraction:
+        side = max(CASCADE_MIN_FACE, int(max_face_fraction * small_width))
+        kwargs["maxSize"] = (side, side)
+
+    faces = detector.detectMultiScale(small, scale_factor, min_neighbors, **kwargs)
+    if len(faces) == 0:
+        return np.empty((0, 4), dtype=int)
+
+    faces = np.asarray(faces)
+    if scale < 1.0:
+        # Map the boxes back to the full-resolution frame for cropping.
+        faces = np.round(faces / scale).astype(int)
+        faces[:, 2] = np.minimum(faces[:, 2], width - faces[:, 0])
+        faces[:, 3] = np.minimum(faces[:, 3], height - faces[:, 1])
+    return faces
+
+def box_iou(a, b) -> float:
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    inter_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = inter_w * inter_h
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+def dhash(gray: np.ndarray) -> int:
+    """
+    64-bit difference hash of a grayscale image: one bit per horizontally
+    adjacent pixel pair of a 9x8 thumbnail, set where brightness increases.
+    Near-identical images have hashes a few bits apart.
+    """
+    thumbnail = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
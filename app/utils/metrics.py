@@ -0,0 +1,288 @@
+"""
+In-process metrics (counters, gauges and histograms) in the Prometheus text format.
+
+Every metric recorded in worker processes is declared at the bottom of this
+module, so worker processes and the API process agree on them. Worker
+processes don't serve /metrics; instead they buffer their observations (see
+start_forwarding), which WorkerPool ships back with each job's result and
+replays here.
+
+When METRICS_ENABLED is off, recording returns immediately and timers are a
+shared no-op.
+"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .. import config
+
+_registry: Dict[str, "_Metric"] = {}
+# Observations buffered in a worker process; None when recording locally.
+_buffer: Optional[List[tuple]] = None
+
+
+def enabled() -> bool:
+    return config.METRICS_ENABLED
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def _submit(self, labels: tuple, value: float):
+        if _buffer is not None:
+            _buffer.append((self.name, labels, value))
+        else:
+            self._record(labels, value)
+
+    def _record(self, labels: tuple, value: float):
+        raise NotImplementedError
+
+    def _label_text(self, labels: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        if enabled():
+            self._submit(tuple(str(label) for label in labels), amount)
+
+    def _record(self, labels, value):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + value
+
+    def _samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{self._label_text(labels)} {_number(value)}" for labels, value in values]
+
+
+class Gauge(_Metric):
+    """
+    A value read when scraped, from a callback returning a number or {labels: number}.
+    Pass kind="counter" for running totals kept elsewhere (e.g. cache hits).
+    """
+
+    def __init__(self, name, documentation, callback: Callable, labelnames=(), kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def _record(self, labels, value):
+        pass
+
+    def _samples(self):
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        values = value.items() if isinstance(value, dict) else [((), value)]
+        return [
+            f"{self.name}{self._label_text(labels if isinstance(labels, tuple) else (labels,))} {_number(v)}"
+            for labels, v in values if v is not None
+        ]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets: Sequence[float], labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        if enabled():
+            self._submit(tuple(str(label) for label in labels), float(value))
+
+    def time(self, *labels):
+        """Context manager observing the seconds spent in its block."""
+        if not enabled():
+            return _NO_TIMER
+        return self._timer(labels)
+
+    @contextmanager
+    def _timer(self, labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _record(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts, then the sum and the count.
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def _samples(self):
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        lines = []
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = "+Inf" if math.isinf(bound) else _number(bound)
+                bucket_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{self._label_text(labels, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(labels)} {_number(values[-2])}")
+            lines.append(f"{self.name}_count{self._label_text(labels)} {values[-1]}")
+        return lines
+
+
+class _NoTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_TIMER = _NoTimer()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Worker processes ---
+def start_forwarding():
+    """Called in worker processes: buffer observations instead of recording them."""
+    global _buffer
+    _buffer = []
+
+
+def drain() -> List[tuple]:
+    """Returns and clears the observations buffered by this worker process."""
+    global _buffer
+    if not _buffer:
+        return []
+    observations, _buffer = _buffer, []
+    return observations
+
+
+def replay(observations: List[Tuple[str, tuple, float]]):
+    """Records observations shipped back from a worker process."""
+    for name, labels, value in observations:
+        metric = _registry.get(name)
+        if metric is not None:
+            metric._record(labels, value)
+
+
+# --- Per-request database query counting ---
+_request_queries: contextvars.ContextVar = contextvars.ContextVar("request_queries", default=None)
+
+
+def start_request_query_count() -> list:
+    """Starts counting the queries of the current request. Returns the counter cell."""
+    cell = [0]
+    _request_queries.set(cell)
+    return cell
+
+
+def _count_query(*_args):
+    DB_QUERIES.inc()
+    # The counter is a mutable cell, so queries run in threadpool copies of the
+    # request's context still count towards it.
+    cell = _request_queries.get()
+    if cell is not None:
+        cell[0] += 1
+
+
+def instrument_engine(engine):
+    """Counts the queries executed through a (sync) SQLAlchemy engine."""
+    if enabled():
+        from sqlalchemy import event
+        event.listen(engine, "before_cursor_execute", _count_query)
+
+
+# --- Metrics of the app ---
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram(
+    "smart_presence_stage_seconds",
+    "Time spent in each processing stage (upload read, decode, detect, predict, db, commit, ...).",
+    _LATENCY_BUCKETS, labelnames=("stage",),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "smart_presence_http_request_seconds",
+    "HTTP request latency by route.",
+    _LATENCY_BUCKETS, labelnames=("method", "route", "status"),
+)
+FACES_PER_IMAGE = Histogram(
+    "smart_presence_faces_per_image",
+    "Faces detected per recognized image.",
+    (0, 1, 2, 5, 10, 20, 40, 80, 160),
+)
+RECOGNITION_CONFIDENCE = Histogram(
+    "smart_presence_recognition_confidence",
+    "LBPH distance of each prediction (lower is more confident).",
+    (10, 20, 30, 40, 50, 60, 70, 80, 100, 125, 150, 200),
+)
+MODEL_LOAD_SECONDS = Histogram(
+    "smart_presence_model_load_seconds",
+    "Time to load a trained model (global or class shard) from disk.",
+    _LATENCY_BUCKETS,
+)
+TRAINING_SECONDS = Histogram(
+    "smart_presence_training_seconds",
+    "Duration of model training runs.",
+    (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600), labelnames=("mode",),
+)
+DB_QUERIES = Counter(
+    "smart_presence_db_queries_total",
+    "SQL statements executed.",
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "smart_presence_db_queries_per_request",
+    "SQL statements executed per HTTP request, by route.",
+    (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100), labelnames=("route",),
+)
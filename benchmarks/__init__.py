@@ -0,0 +1,2 @@
+# This file can be left empty.
+# It marks the 'benchmarks' directory as a Python package.
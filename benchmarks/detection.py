@@ -0,0 +1,106 @@
+"""
+Compares the fast face-detection path against the original full-resolution path.
+
+For every image in a directory both paths are timed end to end (decode, color
+conversion, detection), and the fast path's recall is measured against the faces
+the original path finds (a face counts as found if a fast-path box overlaps it
+with IoU >= 0.5). Results are printed as JSON.
+
+Usage:
+    python -m benchmarks.detection path/to/classroom/photos [--repeat 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from app import config
+from app.services.model_registry import registry
+from app.utils import image_utils
+
+
+def legacy_path(detector, contents: bytes):
+    image = image_utils.decode_image(contents)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    faces = detector.detectMultiScale(gray, 1.3, 5)
+    return np.asarray(faces).reshape(-1, 4), gray.shape
+
+
+def fast_path(detector, contents: bytes):
+    gray = image_utils.decode_grayscale(contents, min_dimension=config.DETECTION_DECODE_MIN_DIMENSION)
+    faces = image_utils.detect_faces(
+        detector,
+        gray,
+        max_dimension=config.DETECTION_MAX_DIMENSION,
+        min_face_fraction=config.DETECTION_MIN_FACE_FRACTION,
+        max_face_fraction=config.DETECTION_MAX_FACE_FRACTION,
+    )
+    return faces, gray.shape
+
+
+def time_path(path, detector, contents, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        faces, shape = path(detector, contents)
+        timings.append(time.perf_counter() - started)
+    return faces, shape, min(timings)
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        "mean_ms": round(statistics.mean(timings) * 1000, 2),
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 2),
+        "max_ms": round(timings[-1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fast face-detection path.")
+    parser.add_argument("images", help="Directory of classroom photos.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per image; the fastest is kept.")
+    args = parser.parse_args()
+
+    detector = registry.get_detector()
+    legacy_times, fast_times = [], []
+    reference_faces = matched_faces = 0
+
+    for file in sorted(os.listdir(args.images)):
+        if not file.lower().endswith((".png", ".jpg", ".jpeg")):
+            continue
+        with open(os.path.join(args.images, file), "rb") as f:
+            contents = f.read()
+
+        legacy_faces, legacy_shape, legacy_time = time_path(legacy_path, detector, contents, args.repeat)
+        fast_faces, fast_shape, fast_time = time_path(fast_path, detector, contents, args.repeat)
+        legacy_times.append(legacy_time)
+        fast_times.append(fast_time)
+
+        # Bring the fast-path boxes into the legacy frame (the decode may be reduced).
+        ratio = legacy_shape[1] / fast_shape[1]
+        fast_boxes = [tuple(int(v * ratio) for v in box) for box in fast_faces]
+        reference_faces += len(legacy_faces)
+        matched_faces += sum(
+            1 for box in legacy_faces if any(image_utils.box_iou(box, other) >= 0.5 for other in fast_boxes)
+        )
+
+    if not legacy_times:
+        raise SystemExit(f"No images found in {args.images}")
+
+    print(json.dumps({
+        "images": len(legacy_times),
+        "legacy": summarize(legacy_times),
+        "fast": summarize(fast_times),
+        "speedup": round(statistics.mean(legacy_times) / statistics.mean(fast_times), 2),
+        "reference_faces": reference_faces,
+        "recall": round(matched_faces / reference_faces, 3) if reference_faces else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
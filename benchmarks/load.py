@@ -0,0 +1,124 @@
+"""
+Concurrent HTTP load driver for a running instance of the app.
+
+Sends the same request from several threads and reports latency percentiles,
+throughput and status codes as JSON. Form fields and files are sent as
+multipart/form-data, as the app's upload endpoints expect.
+
+Usage:
+    # Attendance marking with a classroom photo, 8 clients, 200 requests:
+    python -m benchmarks.load http://localhost:8000/attendance/mark --method POST \\
+        --form subject=Math --file image_file=class.jpg --concurrency 8 --requests 200
+
+    # Summary reads:
+    python -m benchmarks.load http://localhost:8000/attendance/summary/Math --concurrency 16
+"""
+import argparse
+import json
+import mimetypes
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+def encode_multipart(fields, files):
+    """Builds a multipart/form-data body. Returns (body, content type)."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, path in files:
+        with open(path, "rb") as f:
+            contents = f.read()
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+            f'filename="{os.path.basename(path)}"\r\nContent-Type: {content_type}\r\n\r\n'.encode()
+            + contents + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return round(sorted_values[index] * 1000, 2)
+
+
+def split_pair(value):
+    name, _, rest = value.partition("=")
+    if not rest:
+        raise argparse.ArgumentTypeError(f"Expected name=value, got '{value}'")
+    return name, rest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive concurrent HTTP load against the app.")
+    parser.add_argument("url")
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--form", type=split_pair, action="append", default=[], help="Form field name=value.")
+    parser.add_argument("--file", type=split_pair, action="append", default=[], help="File field name=path.")
+    parser.add_argument("--header", type=split_pair, action="append", default=[], help="Header name=value.")
+    parser.add_argument("--requests", type=int, default=100, help="Total requests to send.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once.")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds.")
+    args = parser.parse_args()
+
+    headers = dict(args.header)
+    body = None
+    if args.form or args.file:
+        body, headers["Content-Type"] = encode_multipart(args.form, args.file)
+
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def send(_):
+        request = urllib.request.Request(args.url, data=body, headers=headers, method=args.method)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=args.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (urllib.error.URLError, TimeoutError) as e:
+            status = type(getattr(e, "reason", e)).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(send, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(json.dumps({
+        "url": args.url,
+        "method": args.method,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 2),
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": percentile(latencies, 1.0),
+        },
+        "status_codes": statuses,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Measures login throughput and how much password checks stall the event loop.
+
+A burst of concurrent logins is simulated by verifying one bcrypt hash many
+times from coroutines, first inline on the event loop (as the login route used
+to) and then on the password executor. While each burst runs, a ticker
+coroutine records how late the event loop wakes it up, which is the delay every
+other request on the worker would see. Results are printed as JSON.
+
+Usage:
+    python -m benchmarks.login [--logins 40] [--concurrency 20] [--rounds 12]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app import config
+from app.services import auth_service
+
+TICK_SECONDS = 0.01
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(time.perf_counter() - started - TICK_SECONDS)
+
+
+async def inline_login(password: str, hashed: str):
+    return auth_service.verify_and_update_password(password, hashed)
+
+
+async def executor_login(password: str, hashed: str):
+    return await auth_service.verify_and_update_password_async(password, hashed)
+
+
+async def run_burst(login, password: str, hashed: str, logins: int, concurrency: int) -> dict:
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with slots:
+            started = time.perf_counter()
+            verified, _ = await login(password, hashed)
+            assert verified
+            latencies.append(time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    lags = []
+    ticker = asyncio.create_task(measure_loop_lag(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    latencies.sort()
+    lags.sort()
+    return {
+        "logins_per_second": round(logins / elapsed, 2),
+        "p50_latency_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p95_latency_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+        "max_loop_lag_ms": round(lags[-1] * 1000, 1) if lags else None,
+        "loop_ticks": len(lags),
+    }
+
+
+async def run(args):
+    # Use the requested cost throughout, so no login in the burst triggers a rehash.
+    auth_service.pwd_context = auth_service.pwd_context.copy(
+        bcrypt__default_rounds=args.rounds, bcrypt__min_rounds=args.rounds, bcrypt__max_rounds=args.rounds,
+    )
+    password = "correct horse battery staple"
+    hashed = auth_service.pwd_context.hash(password)
+    return {
+        "rounds": args.rounds,
+        "logins": args.logins,
+        "concurrency": args.concurrency,
+        "password_workers": config.PASSWORD_HASH_WORKERS,
+        "inline": await run_burst(inline_login, password, hashed, args.logins, args.concurrency),
+        "executor": await run_burst(executor_login, password, hashed, args.logins, args.concurrency),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login password verification.")
+    parser.add_argument("--logins", type=int, default=40, help="Logins per burst.")
+    parser.add_argument("--concurrency", type=int, default=20, help="Logins in flight at once.")
+    parser.add_argument("--rounds", type=int, default=config.BCRYPT_ROUNDS, help="bcrypt cost of the test hash.")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
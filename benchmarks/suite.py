@@ -0,0 +1,186 @@
+"""
+End-to-end benchmark suite on a synthetic population and a local SQLite database.
+
+For each population size it times:
+- enrolling the population (store_face_samples),
+- train_model, full and incremental,
+- get_images_and_labels over the TrainingImage tree,
+- marking attendance (recognition of the faces in a classroom image, then
+  record_attendance) at several faces per image,
+- get_attendance_summary as the attendance table grows.
+
+Every size runs in its own process and scratch directory (the app binds its
+data paths at import), and the results are printed as one JSON document.
+
+Usage:
+    python -m benchmarks.suite [--students 100 1000 10000] [--samples 5]
+        [--faces 1 5 20 50] [--summary-days 5 20 60] [--repeat 5]
+        [--workdir /tmp/smart_presence_bench] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from . import synthetic
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        "runs": len(timings),
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 2),
+        "mean_ms": round(statistics.mean(timings) * 1000, 2),
+        "max_ms": round(timings[-1] * 1000, 2),
+    }
+
+
+def run_scale(args) -> dict:
+    """Runs every benchmark for one population size. Must run in a fresh process."""
+    workdir = synthetic.configure(os.path.join(args.workdir, str(args.run_scale)))
+
+    import numpy as np
+    from fastapi import HTTPException
+    from app import config
+    from app.database import migrations
+    from app.database.connection import SessionLocal, engine
+    from app.models.attendance import AttendanceRecord, Student, Subject
+    from app.services import attendance_service, face_rec_service
+
+    migrations.run_all(engine)
+    db = SessionLocal()
+    students = args.run_scale
+    factory = synthetic.FaceFactory()
+    rng = np.random.default_rng(0)
+    results = {"students": students, "samples_per_student": args.samples, "workdir": str(workdir)}
+
+    _, seconds = timed(synthetic.populate, db, students, args.samples, factory)
+    results["enroll_seconds"] = round(seconds, 3)
+
+    _, seconds = timed(face_rec_service.train_model, full=True)
+    results["train_full_seconds"] = round(seconds, 3)
+
+    # Incremental training after 1% of the students add one more sample.
+    for student in range(0, students, 100):
+        face_rec_service.store_face_samples(
+            synthetic.roll_number(student), f"Student{student}", [factory.sample(student, args.samples)]
+        )
+    _, seconds = timed(face_rec_service.train_model)
+    results["train_incremental_seconds"] = round(seconds, 3)
+
+    (faces, _), seconds = timed(face_rec_service.get_images_and_labels, config.TRAINING_IMAGE_DIR)
+    results["get_images_and_labels"] = {"images": len(faces), "seconds": round(seconds, 3)}
+    del faces
+
+    # Load the model before timing recognition.
+    attendance_service.load_recognizer()
+    results["mark_attendance"] = []
+    for face_count in args.faces:
+        if face_count > students:
+            continue
+        recognize_times, record_times = [], []
+        correct = total = 0
+        for run in range(args.repeat):
+            present = rng.choice(students, size=face_count, replace=False)
+            image, boxes = synthetic.classroom(factory, present, variant=1000 + run)
+            predictions, seconds = timed(attendance_service.predict_faces, image, boxes)
+            recognize_times.append(seconds)
+            correct += sum(
+                1 for (label, confidence), student in zip(predictions, present)
+                if label == int(synthetic.roll_number(student)) and confidence < config.RECOGNITION_CONFIDENCE_THRESHOLD
+            )
+            total += face_count
+
+            # A fresh subject per run, so every run writes its rows.
+            db.add(Subject(subjectName=f"Mark-{face_count}-{run}"))
+            db.commit()
+            started = time.perf_counter()
+            try:
+                attendance_service.record_attendance(db, f"Mark-{face_count}-{run}", predictions)
+            except HTTPException:
+                # Nobody recognized: the lookup still ran, nothing was written.
+                pass
+            record_times.append(time.perf_counter() - started)
+        results["mark_attendance"].append({
+            "faces_per_image": face_count,
+            "recognize": summarize(recognize_times),
+            "record": summarize(record_times),
+            "recognized_fraction": round(correct / total, 3),
+        })
+
+    # Summary over a growing attendance history: ~80% of students present per day.
+    db.add(Subject(subjectName="Summary"))
+    db.commit()
+    subject_id = db.query(Subject.subjectID).filter(Subject.subjectName == "Summary").scalar()
+    student_ids = [student_id for (student_id,) in db.query(Student.studentID)]
+    results["attendance_summary"] = []
+    days_written = 0
+    for days in sorted(args.summary_days):
+        for day in range(days_written, days):
+            attendance_date = date.today() - timedelta(days=day + 1)
+            present = rng.random(len(student_ids)) < 0.8
+            attendance_service.write_attendance_rows(db, [
+                {"studentID": student_id, "subjectID": subject_id,
+                 "attendance_date": attendance_date, "timestamp": datetime.now()}
+                for student_id, here in zip(student_ids, present) if here
+            ])
+        days_written = days
+        rows = db.query(AttendanceRecord).count()
+
+        timings = []
+        for _ in range(args.repeat):
+            _, seconds = timed(attendance_service.get_attendance_summary, db, "Summary", limit=min(students, 1000))
+            timings.append(seconds)
+        results["attendance_summary"].append({"days": days, "attendance_rows": rows, **summarize(timings)})
+
+    db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark training, recognition and attendance on synthetic data.")
+    parser.add_argument("--students", type=int, nargs="+", default=[100, 1000], help="Population sizes to run.")
+    parser.add_argument("--samples", type=int, default=5, help="Face samples per student.")
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 5, 20, 50], help="Faces per classroom image.")
+    parser.add_argument("--summary-days", type=int, nargs="+", default=[5, 20, 60],
+                        help="Days of attendance history to time the summary at.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per timing.")
+    parser.add_argument("--workdir", default="/tmp/smart_presence_bench", help="Scratch directory (wiped).")
+    parser.add_argument("--output", help="Also write the JSON results to this file.")
+    parser.add_argument("--run-scale", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scale:
+        print(json.dumps(run_scale(args)))
+        return
+
+    results = {"generated_at": datetime.now().isoformat(timespec="seconds"), "scales": []}
+    for students in args.students:
+        command = [
+            sys.executable, "-m", "benchmarks.suite", "--run-scale", str(students),
+            "--samples", str(args.samples), "--repeat", str(args.repeat), "--workdir", args.workdir,
+            "--faces", *map(str, args.faces), "--summary-days", *map(str, args.summary_days),
+        ]
+        output = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True).stdout
+        # The app may print warnings; the result is the last line.
+        results["scales"].append(json.loads(output.strip().splitlines()[-1]))
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document)
+    print(document)
+
+
+if __name__ == "__main__":
+    main()
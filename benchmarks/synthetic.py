@@ -0,0 +1,118 @@
+"""
+Synthetic enrolled population for benchmarks.
+
+configure() points the app's data directory and database at a scratch
+directory (a local SQLite file); it must run before any app.services or
+app.database module is imported, since those bind their paths at import.
+"""
+import os
+import shutil
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app import config
+
+
+def configure(workdir) -> Path:
+    """Redirects every data path and the database into `workdir`, starting empty."""
+    workdir = Path(workdir)
+    if workdir.exists():
+        shutil.rmtree(workdir)
+    workdir.mkdir(parents=True)
+
+    config.TRAINING_IMAGE_DIR = workdir / "TrainingImage"
+    config.SAMPLE_STORE_DIR = workdir / "SampleStore"
+    config.TRAINED_MODEL_DIR = workdir / "TrainingImageLabel"
+    config.TRAINED_MODEL_PATH = config.TRAINED_MODEL_DIR / "Trainner.yml"
+    config.MODEL_SHARD_DIR = config.TRAINED_MODEL_DIR / "shards"
+    config.TRAINING_MANIFEST_PATH = config.TRAINED_MODEL_DIR / "manifest.json"
+    config.ATTENDANCE_SPOOL_DIR = workdir / "attendance_spool"
+    config.ATTENDANCE_DEAD_LETTER_PATH = workdir / "attendance_dead_letter.jsonl"
+    config.DATABASE_URL = f"sqlite:///{workdir / 'benchmark.db'}"
+    # Keep every synthetic sample, so each run trains on exactly the requested count.
+    config.SAMPLE_DUPLICATE_MAX_DISTANCE = -1
+    config.SAMPLES_PER_STUDENT = 1 << 30
+    for directory in (config.TRAINING_IMAGE_DIR, config.MODEL_SHARD_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    if not os.path.exists(config.HAAR_CASCADE_PATH):
+        # Training only checks that the cascade exists; synthetic faces are
+        # never run through detection.
+        config.HAAR_CASCADE_PATH = workdir / "haarcascade_frontalface_default.xml"
+        config.HAAR_CASCADE_PATH.touch()
+    return workdir
+
+
+class FaceFactory:
+    """
+    Generates face-like crops: each student gets a fixed random texture, and
+    every sample of that student is the texture shifted, brightened and noised
+    slightly, so LBPH can tell students apart much as it does real faces.
+    """
+
+    def __init__(self, size: int = None, seed: int = 0):
+        self.size = size or config.SAMPLE_SIZE
+        self.seed = seed
+
+    def base(self, student: int) -> np.ndarray:
+        rng = np.random.default_rng((self.seed, student))
+        texture = rng.integers(0, 256, (self.size + 8, self.size + 8), dtype=np.uint8)
+        return cv2.GaussianBlur(texture, (7, 7), 0)
+
+    def sample(self, student: int, variant: int) -> np.ndarray:
+        rng = np.random.default_rng((self.seed, student, variant + 1))
+        dx, dy = rng.integers(0, 5, 2)
+        crop = self.base(student)[dy:dy + self.size, dx:dx + self.size].astype(np.int16)
+        crop += rng.integers(-12, 13) + rng.normal(0, 2, crop.shape).astype(np.int16)
+        return np.clip(crop, 0, 255).astype(np.uint8)
+
+
+def roll_number(student: int) -> str:
+    return str(100000 + student)
+
+
+def populate(db, students: int, samples_per_student: int, factory: FaceFactory, classes: int = 10):
+    """
+    Registers `students` students (spread over `classes` classes) and writes
+    their face samples through face_rec_service.store_face_samples, the storage
+    half of save_face_images.
+    """
+    from app.models.attendance import Student
+    from app.services.auth_service import get_password_hash
+    from app.services.face_rec_service import store_face_samples
+
+    hashed_password = get_password_hash("benchmark")
+    db.add_all([
+        Student(
+            name=f"Student{i}",
+            email=f"student{i}@benchmark.local",
+            hashed_password=hashed_password,
+            rollNumber=roll_number(i),
+            student_class=f"Class{i % classes}",
+        )
+        for i in range(students)
+    ])
+    db.commit()
+
+    for i in range(students):
+        crops = [factory.sample(i, variant) for variant in range(samples_per_student)]
+        store_face_samples(roll_number(i), f"Student{i}", crops)
+
+
+def classroom(factory: FaceFactory, students, variant: int):
+    """
+    Tiles fresh samples of `students` into one grayscale image, as a classroom
+    photo with known face boxes. Returns (image, boxes).
+    """
+    size = factory.size
+    columns = max(1, int(np.ceil(np.sqrt(len(students)))))
+    rows = max(1, int(np.ceil(len(students) / columns)))
+    image = np.full((rows * size, columns * size), 128, dtype=np.uint8)
+    boxes = []
+    for n, student in enumerate(students):
+        y, x = (n // columns) * size, (n % columns) * size
+        image[y:y + size, x:x + size] = factory.sample(student, variant)
+        boxes.append((x, y, size, size))
+    return image, boxes
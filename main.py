@@ -1,20 +1,26 @@
 from fastapi import FastAPI, Request, Depends
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles  # This import was already correct
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
 import os
+import time
 
-from app.database import connection
+from app.database import connection, migrations
 from app.database.connection import get_db
 from app.models import attendance as models
 from app.routes import attendance, face_recognition, auth
-from app.services.auth_service import try_get_current_user
-from app.config import HAAR_CASCADE_PATH
+from app.services.attendance_service import ingest as attendance_ingest, recognition_cache
+from app.services.auth_service import try_get_current_user, user_cache
+from app.services.warmup import warmup
+from app.services.worker_pool import recognition_pool, enrollment_pool
+from app.config import (HAAR_CASCADE_PATH, ATTENDANCE_INGEST_MODE, METRICS_ENABLED, AUTO_CREATE_SCHEMA,
+                        WARMUP_ENABLED)
+from app.utils import metrics
 
 templates = Jinja2Templates(directory="app/templates")
-models.Base.metadata.create_all(bind=connection.engine)
 app = FastAPI(title="Smart Presence")
 
 # --- MOUNT STATIC DIRECTORY (THIS IS THE FIX) ---
@@ -24,6 +30,56 @@ app = FastAPI(title="Smart Presence")
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 
+# --- Metrics ---
+if METRICS_ENABLED:
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        queries = metrics.start_request_query_count()
+        started = time.perf_counter()
+        response = await call_next(request)
+        # Label by route template (e.g. /attendance/summary/{subject}), not raw path.
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, request.method, route, response.status_code)
+        metrics.DB_QUERIES_PER_REQUEST.observe(queries[0], route)
+        return response
+
+    metrics.Gauge(
+        "smart_presence_worker_pool_pending", "Jobs queued or running per worker pool.",
+        lambda: {recognition_pool.name: recognition_pool.pending, enrollment_pool.name: enrollment_pool.pending},
+        labelnames=("pool",),
+    )
+    metrics.Gauge(
+        "smart_presence_attendance_ingest_backlog", "Attendance rows accepted but not yet written.",
+        lambda: attendance_ingest.backlog,
+    )
+    metrics.Gauge(
+        "smart_presence_db_pool_checkout_wait_seconds_total", "Total time spent waiting for a pooled connection.",
+        lambda: {name: stats.total_wait for name, stats in connection.pool_stats.items()},
+        labelnames=("engine",), kind="counter",
+    )
+    metrics.Gauge(
+        "smart_presence_db_pool_checkouts_total", "Connections checked out of the pool.",
+        lambda: {name: stats.checkouts for name, stats in connection.pool_stats.items()},
+        labelnames=("engine",), kind="counter",
+    )
+    metrics.Gauge(
+        "smart_presence_user_cache_lookups_total", "Authenticated-user cache lookups by result.",
+        lambda: {"hit": user_cache.hits, "miss": user_cache.misses},
+        labelnames=("result",), kind="counter",
+    )
+    metrics.Gauge(
+        "smart_presence_recognition_cache_lookups_total", "Recognition result cache lookups by result.",
+        lambda: {"hit": recognition_cache.hits, "miss": recognition_cache.misses},
+        labelnames=("result",), kind="counter",
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics_endpoint():
+    """Metrics in the Prometheus text format."""
+    if not METRICS_ENABLED:
+        return PlainTextResponse("Metrics are disabled.", status_code=404)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Include Routers
 app.include_router(auth.router)
 app.include_router(face_recognition.router)
@@ -44,6 +100,16 @@ def root(request: Request, db: Session = Depends(get_db), user: Optional[models.
         # User is not logged in, show the public landing page
         return templates.TemplateResponse("landing.html", {"request": request})
 
+@app.get("/status/db")
+def database_status():
+    """Connection pool occupancy and how long requests waited for a connection."""
+    return connection.pool_status()
+
+@app.get("/ready")
+def readiness():
+    """Ready (200) once the startup warm-up has finished; 503 until then and while shutting down."""
+    return JSONResponse(warmup.status(), status_code=200 if warmup.ready else 503)
+
 # The startup event remains the same
 @app.on_event("startup")
 async def startup_event():
@@ -51,4 +117,32 @@ async def startup_event():
         print("="*80)
         print(f"!! WARNING: Haar Cascade file not found !!")
         print(f"Please download 'haarcascade_frontalface_default.xml' and place it in: {HAAR_CASCADE_PATH.parent}")
-        print("="*80)
\ No newline at end of file
+        print("="*80)
+
+    # Schema creation is normally an explicit step (python -m app.cli.migrate_db).
+    if AUTO_CREATE_SCHEMA:
+        await run_in_threadpool(migrations.run_all, connection.engine)
+
+    # Create the worker pools up front rather than inside the first request.
+    recognition_pool.start()
+    enrollment_pool.start()
+
+    # Replays any attendance rows left in the spool and starts the batch writer.
+    if ATTENDANCE_INGEST_MODE == "write_behind":
+        attendance_ingest.start()
+
+    # Preload models, connections and workers in the background; /ready reports when done.
+    if WARMUP_ENABLED:
+        warmup.start()
+    else:
+        warmup.skip()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop advertising readiness before tearing anything down.
+    warmup.ready = False
+    recognition_pool.shutdown()
+    enrollment_pool.shutdown()
+    # Flush queued attendance rows before exiting.
+    attendance_ingest.stop()
+    await connection.dispose_async_engine()
\ No newline at end of file
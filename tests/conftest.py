@@ -0,0 +1,101 @@
+"""
+Points every data path and the database at a scratch directory (SQLite)
+before any app.services or app.database module is imported, since those bind
+their paths at import.
+"""
+import asyncio
+import shutil
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app import config
+
+_DATA_DIR = Path(tempfile.mkdtemp(prefix="smart_presence_tests_"))
+config.TRAINING_IMAGE_DIR = _DATA_DIR / "TrainingImage"
+config.SAMPLE_STORE_DIR = _DATA_DIR / "SampleStore"
+config.TRAINED_MODEL_DIR = _DATA_DIR / "TrainingImageLabel"
+config.TRAINED_MODEL_PATH = config.TRAINED_MODEL_DIR / "Trainner.yml"
+config.MODEL_SHARD_DIR = config.TRAINED_MODEL_DIR / "shards"
+config.TRAINING_MANIFEST_PATH = config.TRAINED_MODEL_DIR / "manifest.json"
+config.ATTENDANCE_SPOOL_DIR = _DATA_DIR / "attendance_spool"
+config.ATTENDANCE_DEAD_LETTER_PATH = _DATA_DIR / "attendance_dead_letter.jsonl"
+config.DATABASE_URL = f"sqlite:///{_DATA_DIR / 'test.db'}"
+for directory in (config.TRAINING_IMAGE_DIR, config.TRAINED_MODEL_DIR, config.MODEL_SHARD_DIR):
+    directory.mkdir(parents=True)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def db():
+    """A session on a freshly created schema, dropped again afterwards."""
+    from app.database.connection import Base, SessionLocal, engine
+    from app.models import attendance  # noqa: F401  (registers the tables)
+
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def roster(db):
+    """Two students (roll numbers 1001 and 1002) and a subject, "Maths"."""
+    from app.models.attendance import Student, Subject
+
+    db.add(Subject(subjectName="Maths"))
+    for roll_number in ("1001", "1002"):
+        db.add(Student(name=f"Student {roll_number}", email=f"{roll_number}@example.com",
+                       hashed_password="x", rollNumber=roll_number))
+    db.commit()
+    return db
+
+
+class FakePool:
+    """
+    Stands in for a WorkerPool in-process. Each job is answered by
+    `respond(fn, *args)` (by default it just runs `fn(*args)`), whose result is
+    returned or, if it is an exception, raised. Records the jobs and how many
+    overlapped; each job takes `delay` seconds.
+    """
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self.respond = lambda fn, *args: fn(*args)
+        self.delay = 0.0
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def run(self, fn, *args):
+        self.calls.append((fn, args))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            outcome = self.respond(fn, *args)
+        finally:
+            self.running -= 1
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    """Replaces the recognition and enrollment pools with FakePools, as `pools.recognition` / `pools.enrollment`."""
+    from app.services.worker_pool import enrollment_pool, recognition_pool
+
+    fakes = SimpleNamespace(recognition=FakePool(), enrollment=FakePool())
+    for pool, fake in ((recognition_pool, fakes.recognition), (enrollment_pool, fakes.enrollment)):
+        monkeypatch.setattr(pool, "run", fake.run)
+        monkeypatch.setattr(pool, "workers", fake.workers)
+    return fakes
@@ -0,0 +1,85 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+
+from app import config
+from app.models.attendance import AttendanceRecord
+from app.services import attendance_service
+from app.utils.cache import TTLCache
+
+
+@pytest.fixture
+def recognition(pools, monkeypatch):
+    """Recognition answered from `faces`: upload bytes -> predictions (or an exception)."""
+    faces = {}
+
+    def respond(fn, contents, student_class):
+        outcome = faces[contents]
+        return outcome if isinstance(outcome, Exception) else (outcome, ("Trainner.yml", 1))
+
+    pools.recognition.respond = respond
+    pools.recognition.delay = 0.01
+    monkeypatch.setattr(attendance_service, "recognition_cache", TTLCache(maxsize=10, ttl=60))
+    return faces
+
+
+def mark(db, uploads):
+    return asyncio.run(attendance_service.mark_attendance_batch(db, "Maths", uploads))
+
+
+def test_images_are_merged_and_recorded_once(roster, recognition, pools):
+    recognition.update({
+        b"front": [(1001, 60.0), (1002, 50.0)],
+        b"back": [(1001, 30.0), (9999, 20.0)],
+        b"blurry": HTTPException(status_code=400, detail="Could not decode the uploaded image."),
+    })
+    result = mark(roster, [("front.jpg", b"front"), ("back.jpg", b"back"), ("blurry.jpg", b"blurry")])
+
+    assert [(image["filename"], image["status"]) for image in result["images"]] == [
+        ("front.jpg", "processed"), ("back.jpg", "processed"), ("blurry.jpg", "rejected")]
+    # Each student once, with the best (lowest) confidence of all images.
+    assert sorted((r["roll_number"], r["confidence"], r["status"]) for r in result["results"]) == [
+        ("1001", 30.0, "Attendance Marked"), ("1002", 50.0, "Attendance Marked")]
+    assert roster.query(AttendanceRecord).count() == 2
+    assert pools.recognition.max_running <= pools.recognition.workers
+
+
+def test_batch_without_faces_is_rejected(roster, recognition):
+    recognition[b"empty"] = []
+    with pytest.raises(HTTPException) as error:
+        mark(roster, [("empty.jpg", b"empty")])
+    assert error.value.status_code == 400
+
+
+def test_batch_size_is_limited(roster, monkeypatch):
+    monkeypatch.setattr(config, "ATTENDANCE_BATCH_MAX_IMAGES", 2)
+    with pytest.raises(HTTPException) as error:
+        mark(roster, [(f"{i}.jpg", b"x") for i in range(3)])
+    assert error.value.status_code == 413
+
+
+def make_archive(files) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, contents in files.items():
+            archive.writestr(name, contents)
+    return buffer.getvalue()
+
+
+def test_unpack_image_archive_keeps_only_images():
+    archive = make_archive({"row1.jpg": b"1", "sub/row2.PNG": b"2", "notes.txt": b"x", "__MACOSX/.row1.jpg": b"x"})
+    assert attendance_service.unpack_image_archive(archive) == [("row1.jpg", b"1"), ("sub/row2.PNG", b"2")]
+
+
+def test_unpack_image_archive_rejects_bad_archives(monkeypatch):
+    with pytest.raises(HTTPException) as error:
+        attendance_service.unpack_image_archive(b"not a zip")
+    assert error.value.status_code == 400
+
+    monkeypatch.setattr(config, "ATTENDANCE_BATCH_MAX_IMAGE_BYTES", 4)
+    with pytest.raises(HTTPException) as error:
+        attendance_service.unpack_image_archive(make_archive({"big.jpg": b"12345"}))
+    assert error.value.status_code == 413
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+import pytest
+
+from app import config
+from app.models.attendance import AttendanceRecord, Student, Subject
+from app.services.attendance_service import (EXPORT_COLUMNS, export_csv, export_ndjson,
+                                             iter_attendance_records)
+
+
+@pytest.fixture
+def records(db):
+    """Seven records for two subjects and classes, over the first days of January 2026."""
+    db.add_all([Subject(subjectName="Maths"), Subject(subjectName="Physics")])
+    db.add_all([
+        Student(name="Ada", email="ada@example.com", hashed_password="x", rollNumber="1001", student_class="A"),
+        Student(name="Ben", email="ben@example.com", hashed_password="x", rollNumber="1002", student_class="B"),
+    ])
+    db.flush()
+    for day in range(1, 5):
+        db.add(AttendanceRecord(studentID=1, subjectID=1, attendance_date=date(2026, 1, day),
+                                timestamp=datetime(2026, 1, day, 9)))
+    for day in range(1, 4):
+        db.add(AttendanceRecord(studentID=2, subjectID=2, attendance_date=date(2026, 1, day),
+                                timestamp=datetime(2026, 1, day, 10)))
+    db.commit()
+    return db
+
+
+def record_ids(chunks):
+    return [row[0] for chunk in chunks for row in chunk]
+
+
+def test_pages_through_every_record_in_order(records):
+    chunks = list(iter_attendance_records(chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert record_ids(chunks) == list(range(1, 8))
+
+
+def test_exact_multiple_of_the_chunk_size_yields_no_empty_chunk(records):
+    assert [len(chunk) for chunk in iter_attendance_records(subject_id=1, chunk_size=2)] == [2, 2]
+
+
+def test_chunk_size_defaults_to_the_config(records, monkeypatch):
+    monkeypatch.setattr(config, "ATTENDANCE_EXPORT_CHUNK_SIZE", 4)
+    assert [len(chunk) for chunk in iter_attendance_records()] == [4, 3]
+
+
+def test_filters(records):
+    assert record_ids(iter_attendance_records(student_class="B", chunk_size=2)) == [5, 6, 7]
+    assert record_ids(iter_attendance_records(
+        start_date=date(2026, 1, 2), end_date=date(2026, 1, 3), chunk_size=2)) == [2, 3, 6, 7]
+    assert list(iter_attendance_records(subject_id=99)) == []
+
+
+def test_export_csv(records):
+    text = "".join(export_csv(iter_attendance_records(chunk_size=3)))
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0] == list(EXPORT_COLUMNS)
+    assert len(rows) == 8
+    assert rows[1][:2] == ["1", "2026-01-01"]
+
+
+def test_export_ndjson(records):
+    pieces = list(export_ndjson(iter_attendance_records(chunk_size=3)))
+    assert len(pieces) == 3
+    entries = [json.loads(line) for line in "".join(pieces).splitlines()]
+    assert len(entries) == 7
+    assert set(entries[0]) == set(EXPORT_COLUMNS)
+    assert entries[-1]["attendance_date"] == "2026-01-03"
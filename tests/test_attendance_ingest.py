@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+from datetime import date
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.services.attendance_ingest import AttendanceIngest
+
+
+def make_row(student_id: int) -> dict:
+    return {"studentID": student_id, "subjectID": 1, "attendance_date": date(2026, 1, 5)}
+
+
+class Writer:
+    """Records written rows; rows whose studentID is in `bad` are rejected."""
+
+    def __init__(self, bad=(), error=None):
+        self.bad = set(bad)
+        self.error = error
+        self.rows = []
+
+    def __call__(self, rows):
+        if self.error is not None:
+            raise self.error
+        if any(row["studentID"] in self.bad for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("bad row"))
+        self.rows.extend(rows)
+
+
+def make_ingest(tmp_path, writer, **kwargs):
+    options = dict(batch_size=10, flush_interval=0.01, max_attempts=2,
+                   dead_letter_path=tmp_path / "dead_letter.jsonl")
+    options.update(kwargs)
+    return AttendanceIngest(tmp_path / "spool", writer, **options)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def spool_files(tmp_path):
+    return sorted((tmp_path / "spool").glob("spool-*.jsonl"))
+
+
+def test_rows_are_written_and_the_spool_emptied(tmp_path):
+    writer = Writer()
+    ingest = make_ingest(tmp_path, writer)
+    ingest.start()
+    ingest.submit([make_row(i) for i in range(25)])
+    wait_for(lambda: ingest.backlog == 0)
+    [spool] = spool_files(tmp_path)
+    assert spool.stat().st_size == 0
+    ingest.stop()
+    assert sorted(row["studentID"] for row in writer.rows) == list(range(25))
+    assert spool_files(tmp_path) == []
+
+
+def test_rejected_rows_are_dead_lettered_without_blocking_the_rest(tmp_path):
+    writer = Writer(bad={3})
+    ingest = make_ingest(tmp_path, writer)
+    ingest.start()
+    ingest.submit([make_row(i) for i in range(5)])
+    ingest.submit([make_row(i) for i in range(10, 15)])
+    wait_for(lambda: ingest.backlog == 0)
+    ingest.stop()
+    assert sorted(row["studentID"] for row in writer.rows) == [0, 1, 2, 4, 10, 11, 12, 13, 14]
+    [entry] = [json.loads(line) for line in (tmp_path / "dead_letter.jsonl").read_text().splitlines()]
+    assert entry["row"]["studentID"] == 3
+
+
+def test_connection_errors_are_retried_not_dead_lettered(tmp_path):
+    writer = Writer(error=OperationalError("INSERT", {}, Exception("gone away")))
+    ingest = make_ingest(tmp_path, writer)
+    ingest.start()
+    ingest.submit([make_row(1)])
+    time.sleep(0.2)
+    assert ingest.backlog == 1
+    writer.error = None
+    wait_for(lambda: ingest.backlog == 0)
+    ingest.stop()
+    assert [row["studentID"] for row in writer.rows] == [1]
+    assert not (tmp_path / "dead_letter.jsonl").exists()
+
+
+def test_orphaned_spools_are_replayed_but_live_ones_left_alone(tmp_path):
+    live = make_ingest(tmp_path, Writer(error=OperationalError("INSERT", {}, Exception("down"))))
+    live.start()
+    live.submit([make_row(3)])
+
+    # A process that stopped with rows still queued leaves its spool behind.
+    crashed = make_ingest(tmp_path, Writer(error=OperationalError("INSERT", {}, Exception("down"))))
+    crashed.start()
+    crashed.submit([make_row(1), make_row(2)])
+    crashed.stop()
+
+    writer = Writer()
+    ingest = make_ingest(tmp_path, writer)
+    ingest.start()
+    wait_for(lambda: ingest.backlog == 0)
+    ingest.stop()
+    # Only the stopped process's rows; the running one still owns row 3.
+    assert sorted(row["studentID"] for row in writer.rows) == [1, 2]
+    assert live.backlog == 1
+    live.writer.error = None
+    live.stop()
+    assert spool_files(tmp_path) == []
+
+
+def test_spool_is_compacted_up_to_the_written_offset(tmp_path):
+    release = threading.Event()
+    written = []
+
+    def writer(rows):
+        # The second batch waits, so the queue can't drain and truncate the spool.
+        if written:
+            release.wait()
+        written.append(rows)
+
+    ingest = make_ingest(tmp_path, writer, batch_size=5, compact_bytes=200)
+    ingest.start()
+    rows = [make_row(i) for i in range(30)]
+    ingest.submit(rows)
+    wait_for(lambda: len(written) == 1 and ingest.backlog == 25)
+    wait_for(lambda: spool_files(tmp_path)[0].stat().st_size == len(spool_lines(rows[5:])))
+    [spool] = spool_files(tmp_path)
+    assert spool.read_bytes() == spool_lines(rows[5:])
+    release.set()
+    wait_for(lambda: ingest.backlog == 0)
+    ingest.stop()
+    assert sum(len(batch) for batch in written) == 30
+
+
+def spool_lines(rows) -> bytes:
+    return b"".join((json.dumps(row, default=str) + "\n").encode() for row in rows)
+
+
+def test_submit_new_skips_rows_already_queued(tmp_path):
+    # A writer that never succeeds keeps every accepted row queued.
+    ingest = make_ingest(tmp_path, Writer(error=OperationalError("INSERT", {}, Exception("down"))))
+    ingest.start()
+    try:
+        assert ingest.submit_new([make_row(1), make_row(2)]) == [make_row(1), make_row(2)]
+        assert ingest.submit_new([make_row(2), make_row(3), make_row(3)]) == [make_row(3)]
+        assert ingest.backlog == 3
+    finally:
+        ingest.stop()
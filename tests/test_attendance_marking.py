@@ -0,0 +1,59 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.database.upsert import insert_new_rows
+from app.models.attendance import AttendanceRecord
+from app.services.attendance_service import record_attendance
+
+KEY = ("studentID", "subjectID", "attendance_date")
+
+
+def insert(db, rows):
+    return insert_new_rows(db, AttendanceRecord.__table__, rows, KEY, "timestamp")
+
+
+def statuses(results):
+    return {result["roll_number"]: result["status"] for result in results}
+
+
+def test_insert_new_rows_returns_only_the_new_keys(db):
+    day = date(2026, 1, 5)
+    def rows():
+        return [{"studentID": student_id, "subjectID": 1, "attendance_date": day, "timestamp": datetime.now()}
+                for student_id in (1, 2)]
+    assert insert(db, rows()[:1]) == {(1, 1, day)}
+    assert insert(db, rows()) == {(2, 1, day)}
+    assert insert(db, rows()) == set()
+    db.commit()
+    assert db.query(AttendanceRecord).count() == 2
+
+
+def test_insert_new_rows_without_returning(db, monkeypatch):
+    # The upsert-then-select path used where RETURNING isn't available (MySQL).
+    monkeypatch.setattr(db.get_bind().dialect, "insert_executemany_returning", False)
+    test_insert_new_rows_returns_only_the_new_keys(db)
+
+
+def test_insert_new_rows_lets_other_errors_through(roster):
+    # SQLite only checks foreign keys when asked to.
+    connection = roster.connection()
+    connection.exec_driver_sql("PRAGMA foreign_keys = ON")
+    row = {"studentID": 99, "subjectID": 1, "attendance_date": date(2026, 1, 5), "timestamp": datetime.now()}
+    try:
+        with pytest.raises(IntegrityError):
+            insert(roster, [row])
+    finally:
+        roster.rollback()
+        # Pooled connection: don't leave the pragma on for later tests.
+        roster.connection().exec_driver_sql("PRAGMA foreign_keys = OFF")
+
+
+def test_second_mark_reports_already_marked(roster):
+    first = record_attendance(roster, "Maths", [(1001, 40.0)])
+    assert statuses(first) == {"1001": "Attendance Marked"}
+
+    second = record_attendance(roster, "Maths", [(1001, 35.0), (1002, 50.0)])
+    assert statuses(second) == {"1001": "Already Marked Today", "1002": "Attendance Marked"}
+    assert roster.query(AttendanceRecord).count() == 2
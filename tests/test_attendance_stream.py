@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+
+from app.services import attendance_stream
+from app.services.attendance_stream import AttendanceStream
+
+FACE = {"box": (10, 10, 50, 50), "label": 1001, "confidence": 30.0}
+
+
+@pytest.fixture
+def stream(pools, monkeypatch):
+    """A stream that sees one recognizable face per frame; `writes` fail while `failures` lasts."""
+    state = {"failures": 0, "writes": []}
+
+    def recognize_frame(fn, contents, known_boxes, student_class):
+        # Faces the tracker already knows come back unrecognized, as in recognize_frame.
+        return [dict(FACE, label=None, confidence=None) if known_boxes else dict(FACE)]
+
+    def record_attendance(db, subject, predictions):
+        if state["failures"]:
+            state["failures"] -= 1
+            raise OperationalError("INSERT", {}, Exception("database down"))
+        state["writes"].append(predictions)
+        return [{"roll_number": str(label), "status": "Attendance Marked"} for label, _ in predictions]
+
+    pools.recognition.respond = recognize_frame
+    monkeypatch.setattr(attendance_stream.attendance_service, "record_attendance", record_attendance)
+    state["stream"] = AttendanceStream(subject="Maths")
+    return state
+
+
+def attendance_events(stream, frame=b"frame"):
+    return [event for event in asyncio.run(stream.process(frame)) if event["event"] == "attendance"]
+
+
+def test_student_is_recorded_once_per_session(stream):
+    assert len(attendance_events(stream["stream"])) == 1
+    assert attendance_events(stream["stream"]) == []
+    assert stream["writes"] == [[(1001, 30.0)]]
+
+
+def test_failed_write_is_retried_on_the_next_frame(stream):
+    stream["failures"] = 1
+    with pytest.raises(HTTPException) as error:
+        attendance_events(stream["stream"])
+    assert error.value.status_code == 503
+
+    assert len(attendance_events(stream["stream"])) == 1
+    assert stream["writes"] == [[(1001, 30.0)]]
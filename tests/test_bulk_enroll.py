@@ -0,0 +1,45 @@
+from app.cli import bulk_enroll
+from app.models.attendance import Student, User, UserRole
+
+
+def write_roster(tmp_path, lines):
+    path = tmp_path / "roster.csv"
+    path.write_text("roll_number,name,email,class\n" + "".join(f"{line}\n" for line in lines))
+    return str(path)
+
+
+def test_read_roster_reports_duplicates_per_row(tmp_path):
+    roster = write_roster(tmp_path, [
+        "1001,Ann,ann@example.com,A",
+        "1002,Ben,ben@example.com,A",
+        "1001,Ann again,ann2@example.com,A",
+        "1003,Cat,Ann@Example.com,B",
+        "1004,,dan@example.com,B",
+    ])
+    students, failures = bulk_enroll.read_roster(roster, default_password="secret")
+    assert [s["roll_number"] for s in students] == ["1001", "1002"]
+    assert failures == [
+        {"roll_number": "1001", "reason": "Line 4: duplicate roll number."},
+        {"roll_number": "1003", "reason": "Line 5: duplicate email."},
+        {"roll_number": "1004", "reason": "Line 6: missing name."},
+    ]
+
+
+def test_create_students_skips_existing_and_taken_emails(db, monkeypatch):
+    monkeypatch.setattr(bulk_enroll, "get_password_hash", lambda password: f"hash:{password}")
+    db.add(Student(name="Ann", email="ann@example.com", hashed_password="x", rollNumber="1001"))
+    db.add(User(name="Teacher", email="ben@example.com", hashed_password="x", role=UserRole.teacher))
+    db.commit()
+
+    students = [
+        {"roll_number": "1001", "name": "Ann", "email": "ann@example.com", "student_class": "A", "password": "p"},
+        {"roll_number": "1002", "name": "Ben", "email": "ben@example.com", "student_class": "A", "password": "p"},
+        {"roll_number": "1003", "name": "Cat", "email": "cat@example.com", "student_class": "B", "password": "p"},
+    ]
+    created, failures = bulk_enroll.create_students(students, workers=1)
+
+    assert created == 1
+    assert failures == [{"roll_number": "1002", "reason": "Email already registered."}]
+    assert [s["roll_number"] for s in students] == ["1001", "1003"]
+    cat = db.query(Student).filter(Student.rollNumber == "1003").one()
+    assert (cat.student_class, cat.hashed_password) == ("B", "hash:p")
@@ -0,0 +1,58 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.services import face_rec_service
+
+
+class FakeUpload:
+    def __init__(self, filename: str, contents: bytes):
+        self.filename = filename
+        self.contents = contents
+
+    async def read(self) -> bytes:
+        return self.contents
+
+
+@pytest.fixture
+def enrollment(pools, monkeypatch):
+    """Two enrollment workers; `outcomes` maps upload bytes to the crops (or exception) extraction gives."""
+    state = {"outcomes": {}, "stored": [], "pool": pools.enrollment}
+    pools.enrollment.delay = 0.01
+    pools.enrollment.respond = lambda fn, contents: state["outcomes"].get(contents, [np.zeros((10, 10), dtype=np.uint8)])
+
+    def store(roll_number, name, crops):
+        state["stored"].extend(crops)
+        return [f"{roll_number}_{name}/{i}.jpg" for i in range(len(crops))]
+
+    monkeypatch.setattr(face_rec_service, "store_face_samples", store)
+    return state
+
+
+def enroll(uploads):
+    return asyncio.run(face_rec_service.save_face_images("1001", "Ann", uploads))
+
+
+def test_uploads_are_extracted_at_most_one_per_worker(enrollment):
+    result = enroll([FakeUpload(f"{i}.jpg", bytes([i])) for i in range(10)])
+    assert enrollment["pool"].max_running == 2
+    assert result["samples_saved"] == 10
+
+
+def test_bad_images_are_rejected_per_image(enrollment):
+    enrollment["outcomes"][b"bad"] = HTTPException(status_code=400, detail="Could not decode the image.")
+    enrollment["outcomes"][b"empty"] = []
+    result = enroll([FakeUpload("good.jpg", b"good"), FakeUpload("bad.jpg", b"bad"), FakeUpload("empty.jpg", b"empty")])
+    assert [image["status"] for image in result["images"]] == ["accepted", "rejected", "rejected"]
+    assert result["samples_saved"] == 1
+
+
+@pytest.mark.parametrize("status_code", [503, 504])
+def test_pool_overload_and_timeouts_fail_the_request(enrollment, status_code):
+    enrollment["outcomes"][b"busy"] = HTTPException(status_code=status_code, detail="busy")
+    with pytest.raises(HTTPException) as error:
+        enroll([FakeUpload("good.jpg", b"good"), FakeUpload("busy.jpg", b"busy")])
+    assert error.value.status_code == status_code
+    assert enrollment["stored"] == []
@@ -0,0 +1,57 @@
+import numpy as np
+
+from app.utils import image_utils
+
+
+class RecordingDetector:
+    """Stands in for a Haar cascade: records what it was asked to search."""
+
+    def __init__(self, faces=()):
+        self.faces = faces
+        self.shape = None
+        self.kwargs = None
+
+    def detectMultiScale(self, image, scale_factor, min_neighbors, **kwargs):
+        self.shape = image.shape
+        self.kwargs = kwargs
+        return self.faces
+
+
+def test_detect_faces_downscales_to_max_dimension():
+    for width in (1600, 2000, 4000):
+        detector = RecordingDetector()
+        gray = np.zeros((width * 3 // 4, width), dtype=np.uint8)
+        image_utils.detect_faces(detector, gray, max_dimension=960, min_face_fraction=0.01)
+        assert max(detector.shape) == 960
+
+
+def test_detect_faces_clamps_min_size_to_cascade_window():
+    detector = RecordingDetector()
+    gray = np.zeros((1500, 2000), dtype=np.uint8)
+    image_utils.detect_faces(detector, gray, max_dimension=960, min_face_fraction=0.01)
+    assert detector.kwargs["minSize"] == (image_utils.CASCADE_MIN_FACE, image_utils.CASCADE_MIN_FACE)
+
+
+def test_detect_faces_leaves_face_sizes_unbounded_by_default():
+    detector = RecordingDetector()
+    image_utils.detect_faces(detector, np.zeros((1500, 2000), dtype=np.uint8), max_dimension=960)
+    assert detector.kwargs == {}
+
+
+def test_detect_faces_maps_boxes_back_to_full_resolution():
+    detector = RecordingDetector(faces=[(96, 48, 48, 48)])
+    gray = np.zeros((1000, 1920), dtype=np.uint8)
+    faces = image_utils.detect_faces(detector, gray, max_dimension=960)
+    assert faces.tolist() == [[192, 96, 96, 96]]
+
+
+def test_detect_faces_keeps_small_images_at_full_size():
+    detector = RecordingDetector()
+    image_utils.detect_faces(detector, np.zeros((480, 640), dtype=np.uint8), max_dimension=960)
+    assert detector.shape == (480, 640)
+
+
+def test_box_iou():
+    assert image_utils.box_iou((0, 0, 10, 10), (0, 0, 10, 10)) == 1.0
+    assert image_utils.box_iou((0, 0, 10, 10), (20, 20, 10, 10)) == 0.0
+    assert image_utils.box_iou((0, 0, 10, 10), (5, 0, 10, 10)) == 50 / 150
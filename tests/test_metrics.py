@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import config
+from app.utils import metrics
+
+
+@pytest.fixture
+def histogram(monkeypatch):
+    monkeypatch.setattr(config, "METRICS_ENABLED", True)
+    histogram = metrics.Histogram("test_stage_seconds", "Test stages.", (0.1, 1), labelnames=("stage",))
+    yield histogram
+    del metrics._registry[histogram.name]
+
+
+def test_histogram_renders_cumulative_buckets(histogram):
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, "detect")
+    assert histogram.render() == [
+        "# HELP test_stage_seconds Test stages.",
+        "# TYPE test_stage_seconds histogram",
+        'test_stage_seconds_bucket{stage="detect",le="0.1"} 1',
+        'test_stage_seconds_bucket{stage="detect",le="1"} 2',
+        'test_stage_seconds_bucket{stage="detect",le="+Inf"} 3',
+        'test_stage_seconds_sum{stage="detect"} 5.55',
+        'test_stage_seconds_count{stage="detect"} 3',
+    ]
+    assert "test_stage_seconds_count" in metrics.render()
+
+
+def test_disabled_metrics_record_nothing(histogram, monkeypatch):
+    monkeypatch.setattr(config, "METRICS_ENABLED", False)
+    with histogram.time("detect"):
+        histogram.observe(1, "detect")
+    assert histogram.render()[2:] == []
+
+
+def test_worker_observations_are_forwarded_and_replayed(histogram, monkeypatch):
+    monkeypatch.setattr(metrics, "_buffer", None)
+    metrics.start_forwarding()
+    with histogram.time("predict"):
+        pass
+    observations = metrics.drain()
+    monkeypatch.setattr(metrics, "_buffer", None)
+    assert histogram.render()[2:] == []
+
+    metrics.replay(observations)
+    assert 'test_stage_seconds_count{stage="predict"} 1' in histogram.render()
+    assert metrics.drain() == []
+
+
+def test_queries_are_counted_per_request(monkeypatch):
+    monkeypatch.setattr(config, "METRICS_ENABLED", True)
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+    cell = metrics.start_request_query_count()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    assert cell == [2]
@@ -0,0 +1,34 @@
+from datetime import date
+
+from app.database import migrations
+from app.database.connection import engine
+from app.models.attendance import AttendanceDaily, AttendanceRecord
+
+
+def add_record(db, student_id: int, day: int):
+    db.add(AttendanceRecord(studentID=student_id, subjectID=1, attendance_date=date(2026, 1, day)))
+
+
+def test_run_all_fills_an_empty_rollup_from_existing_records(db):
+    add_record(db, 1, 5)
+    add_record(db, 2, 5)
+    add_record(db, 1, 6)
+    db.commit()
+
+    migrations.run_all(engine)
+    assert db.query(AttendanceDaily).count() == 3
+
+
+def test_run_all_leaves_a_filled_rollup_alone(db):
+    add_record(db, 1, 5)
+    db.add(AttendanceDaily(subjectID=1, day=date(2026, 1, 5), studentID=1))
+    add_record(db, 2, 5)
+    db.commit()
+
+    migrations.run_all(engine)
+    assert db.query(AttendanceDaily).count() == 1
+
+
+def test_run_all_on_an_empty_database(db):
+    migrations.run_all(engine)
+    assert db.query(AttendanceDaily).count() == 0
@@ -0,0 +1,57 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from app import config
+from app.services.model_registry import ModelRegistry, shard_path
+
+
+def save_model(path, labels):
+    rng = np.random.default_rng(len(labels))
+    faces = [rng.integers(0, 256, (20, 20), dtype=np.uint8) for _ in labels]
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(faces, np.array(labels, dtype=np.int32))
+    recognizer.save(str(path))
+
+
+@pytest.fixture
+def models(tmp_path, monkeypatch):
+    """A global model of students 1-4 and shards for classes A (1, 2), B (3) and C (4)."""
+    monkeypatch.setattr(config, "MODEL_SHARD_DIR", tmp_path)
+    monkeypatch.setattr(config, "MODEL_RELOAD_CHECK_INTERVAL", 0)
+    save_model(tmp_path / "global.yml", [1, 2, 3, 4])
+    for student_class, labels in (("A", [1, 2]), ("B", [3]), ("C", [4])):
+        save_model(shard_path(student_class), labels)
+    return ModelRegistry(model_path=tmp_path / "global.yml", shard_cache_size=2)
+
+
+def labels(model):
+    return sorted(np.asarray(model.recognizer.getLabels()).ravel().tolist())
+
+
+def test_class_shards_with_fallback_to_the_global_model(models):
+    assert labels(models.get_model("A")) == [1, 2]
+    assert labels(models.get_model("B")) == [3]
+    assert labels(models.get_model("no such class")) == [1, 2, 3, 4]
+    assert labels(models.get_model()) == [1, 2, 3, 4]
+
+
+def test_least_recently_used_shard_is_evicted(models):
+    a = models.get_model("A")
+    models.get_model("B")
+    assert models.get_model("A") is a
+    models.get_model("C")
+    assert set(models.status()["shards"]) == {"A", "C"}
+    # Evicted shards are loaded again on demand.
+    assert models.get_model("B") is not None
+    assert set(models.status()["shards"]) == {"C", "B"}
+
+
+def test_changed_shard_file_is_reloaded(models):
+    old = models.get_model("A")
+    save_model(shard_path("A"), [1, 2, 5])
+    os.utime(shard_path("A"), ns=(old.version + 1, old.version + 1))
+    assert labels(models.get_model("A")) == [1, 2, 5]
+    assert models.loaded_version("A") == (shard_path("A").name, old.version + 1)
@@ -0,0 +1,16 @@
+import asyncio
+import os
+
+from app.routes import face_recognition
+from app.services.worker_pool import WorkerPool
+
+
+def test_model_status_comes_from_a_recognition_worker(monkeypatch):
+    pool = WorkerPool("test", workers=1, max_pending=4, timeout=30)
+    monkeypatch.setattr(face_recognition, "recognition_pool", pool)
+    try:
+        status = asyncio.run(face_recognition.model_status_endpoint())
+    finally:
+        pool.shutdown()
+    assert status["worker_pid"] != os.getpid()
+    assert {"loaded", "version", "loaded_at", "shards"} <= set(status)
@@ -0,0 +1,30 @@
+import asyncio
+import threading
+
+from passlib.hash import bcrypt
+
+from app import config
+from app.services import auth_service
+
+
+def rounds(hashed: str) -> int:
+    return int(hashed.split("$")[2])
+
+
+def test_hashes_use_the_configured_cost():
+    hashed = auth_service.get_password_hash("secret")
+    assert rounds(hashed) == config.BCRYPT_ROUNDS
+    assert auth_service.verify_and_update_password("secret", hashed) == (True, None)
+    assert auth_service.verify_and_update_password("wrong", hashed) == (False, None)
+
+
+def test_outdated_hash_is_replaced_on_login():
+    old = bcrypt.using(rounds=4).hash("secret")
+    verified, new_hash = asyncio.run(auth_service.verify_and_update_password_async("secret", old))
+    assert verified and rounds(new_hash) == config.BCRYPT_ROUNDS
+    assert auth_service.verify_password("secret", new_hash)
+
+
+def test_hashing_runs_on_the_password_executor(monkeypatch):
+    monkeypatch.setattr(auth_service, "get_password_hash", lambda password: threading.current_thread().name)
+    assert asyncio.run(auth_service.get_password_hash_async("secret")).startswith("password")
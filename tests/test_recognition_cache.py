@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from app.services import attendance_service
+
+PREDICTIONS = [(1001, 42.0)]
+
+
+@pytest.fixture
+def worker(pools, monkeypatch):
+    """A recognition worker that served model `state["used"]`; the file on disk is at `state["disk"]`."""
+    state = {"used": ("Trainner.yml", 1), "disk": ("Trainner.yml", 1), "pool": pools.recognition}
+    pools.recognition.respond = lambda fn, contents, student_class: (PREDICTIONS, state["used"])
+    monkeypatch.setattr(attendance_service.registry, "model_version", lambda student_class=None: state["disk"])
+    monkeypatch.setattr(attendance_service, "recognition_cache", attendance_service.TTLCache(maxsize=10, ttl=60))
+    return state
+
+
+def recognize(contents=b"photo"):
+    return asyncio.run(attendance_service.recognize_upload(contents))
+
+
+def test_repeated_upload_is_served_from_the_cache(worker):
+    assert recognize() == PREDICTIONS
+    assert recognize() == PREDICTIONS
+    assert len(worker["pool"].calls) == 1
+
+
+def test_result_from_a_worker_still_on_the_old_model_is_not_cached_as_new(worker):
+    # Published, but the worker hasn't reloaded yet.
+    worker["disk"] = ("Trainner.yml", 2)
+    recognize()
+    recognize()
+    assert len(worker["pool"].calls) == 2
+
+    # Once the worker serves the new model, its result is reused.
+    worker["used"] = ("Trainner.yml", 2)
+    recognize()
+    recognize()
+    assert len(worker["pool"].calls) == 3
+
+
+def test_no_faces_is_cached_under_the_current_version(worker):
+    worker["used"] = None
+    recognize()
+    recognize()
+    assert len(worker["pool"].calls) == 1
@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+import pytest
+
+from app.services.roster_matcher import RosterMatcher, lbp_histograms
+
+SIZE = 64
+
+
+def synthetic_faces(rng, count: int) -> np.ndarray:
+    """Smooth random images, so neighbouring pixels are correlated like in a face."""
+    noise = rng.integers(0, 256, (count, SIZE // 8, SIZE // 8)).astype(np.uint8)
+    return np.stack([cv2.resize(image, (SIZE, SIZE), interpolation=cv2.INTER_CUBIC) for image in noise])
+
+
+@pytest.fixture(scope="module")
+def model():
+    """An LBPH model of 4 students with 3 samples each, and 10 query faces near (and far from) them."""
+    rng = np.random.default_rng(7)
+    samples = synthetic_faces(rng, 12)
+    labels = np.repeat(np.arange(1001, 1005), 3).astype(np.int32)
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(list(samples), labels)
+
+    near = np.clip(samples[::2].astype(int) + rng.integers(-12, 13, samples[::2].shape), 0, 255).astype(np.uint8)
+    queries = np.concatenate([near, synthetic_faces(rng, 4)])
+    return recognizer, samples, queries
+
+
+def test_histograms_match_the_trained_model(model):
+    recognizer, samples, _ = model
+    stored = np.vstack([np.asarray(h).reshape(1, -1) for h in recognizer.getHistograms()])
+    np.testing.assert_allclose(lbp_histograms(samples), stored, atol=1e-6)
+
+
+@pytest.mark.parametrize("faces", [1, 10])
+def test_top_match_agrees_with_predict(model, faces):
+    recognizer, _, queries = model
+    matcher = RosterMatcher.from_recognizer(recognizer)
+    matches = matcher.match(list(queries[:faces]), k=1)
+    for query, candidates in zip(queries, matches):
+        label, distance = recognizer.predict(query)
+        assert candidates[0][0] == label
+        assert candidates[0][1] == pytest.approx(distance, rel=1e-4)
+
+
+def test_candidates_are_distinct_students_best_first(model):
+    recognizer, _, queries = model
+    for candidates in RosterMatcher.from_recognizer(recognizer).match(list(queries), k=3):
+        labels = [label for label, _ in candidates]
+        distances = [distance for _, distance in candidates]
+        assert len(set(labels)) == 3
+        assert distances == sorted(distances)
@@ -0,0 +1,71 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from app import config
+from app.services import face_rec_service
+from app.services.sample_selection import crop_hash, plan_prune, select_diverse
+from app.utils.image_utils import hamming_distance
+
+
+def distinct_faces(count: int, seed: int = 0):
+    """Random crops whose hashes are far apart (checked, so the tests don't depend on luck)."""
+    rng = np.random.default_rng(seed)
+    faces = [rng.integers(20, 230, (config.SAMPLE_SIZE, config.SAMPLE_SIZE), dtype=np.uint8) for _ in range(count)]
+    hashes = [crop_hash(face) for face in faces]
+    assert all(hamming_distance(a, b) > 12 for i, a in enumerate(hashes) for b in hashes[i + 1:])
+    return faces
+
+
+def near_copy(face):
+    """The same crop, one step brighter: hashes identically."""
+    return face + 1
+
+
+def test_select_diverse_drops_near_duplicates():
+    assert select_diverse([0b0000, 0b0001, 0b1111_0000], budget=10, max_duplicate_distance=1) == [0, 2]
+
+
+def test_select_diverse_keeps_the_farthest_within_the_budget():
+    # 0 first (tie, earliest), then the candidate farthest from it.
+    assert select_diverse([0, 0b1, 0xFFFF, 0xFF], budget=2, max_duplicate_distance=0) == [0, 2]
+
+
+def test_select_diverse_counts_already_kept_samples():
+    assert select_diverse([0, 0xFF, 0xFFFF], budget=2, max_duplicate_distance=0, kept=[0]) == [2]
+    assert select_diverse([0, 0xFF], budget=1, max_duplicate_distance=0, kept=[0xFF]) == []
+
+
+@pytest.fixture
+def training_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TRAINING_IMAGE_DIR", tmp_path)
+    appended = []
+    monkeypatch.setattr(face_rec_service.sample_store, "append",
+                        lambda crops, labels, sources: appended.extend(sources))
+    return appended
+
+
+def test_store_face_samples_skips_duplicates_and_keeps_to_the_budget(training_dir, monkeypatch):
+    monkeypatch.setattr(config, "SAMPLES_PER_STUDENT", 3)
+    a, b, c, d = distinct_faces(4)
+
+    saved = face_rec_service.store_face_samples("1001", "Ann", [a, near_copy(a), b])
+    assert saved == ["1001_Ann/Ann_1001_1.jpg", "1001_Ann/Ann_1001_2.jpg"]
+
+    # A copy of a stored sample is skipped; only one more fits the budget.
+    saved = face_rec_service.store_face_samples("1001", "Ann", [near_copy(b), c, d])
+    assert len(saved) == 1 and saved[0].endswith("_3.jpg")
+    assert len(os.listdir(config.TRAINING_IMAGE_DIR / "1001_Ann")) == 3
+    assert len(training_dir) == 3
+
+
+def test_plan_prune(tmp_path):
+    a, b, c = distinct_faces(3, seed=1)
+    for number, face in enumerate([a, near_copy(a), b, c], start=1):
+        cv2.imwrite(str(tmp_path / f"Ann_1001_{number}.png"), face)
+
+    assert plan_prune(tmp_path, budget=10, max_duplicate_distance=6) == ["Ann_1001_2.png"]
+    assert len(plan_prune(tmp_path, budget=2, max_duplicate_distance=6)) == 2
+    assert plan_prune(tmp_path / "missing", budget=2, max_duplicate_distance=6) == []
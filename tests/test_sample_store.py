@@ -0,0 +1,78 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from app import config
+from app.services import face_rec_service
+from app.services.sample_store import SampleStore
+
+
+def crop(value: int, size: int = 50) -> np.ndarray:
+    return np.full((size, size), value, dtype=np.uint8)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SampleStore(tmp_path / "store", size=20)
+
+
+def test_append_and_load(store):
+    assert store.append([crop(1), crop(2, size=80)], [1001, 1002], ["a.jpg", "b.jpg"]) == 2
+    assert store.append([crop(3)], [1001], ["c.jpg"]) == 3
+
+    samples, labels = store.load()
+    assert isinstance(samples, np.memmap) and samples.shape == (3, 20, 20)
+    assert samples[:, 0, 0].tolist() == [1, 2, 3]
+    assert labels.tolist() == [1001, 1002, 1001]
+    assert store.sources() == ["a.jpg", "b.jpg", "c.jpg"]
+    assert store.load(start=2)[1].tolist() == [1001]
+
+
+def test_interrupted_append_is_trimmed(store):
+    store.append([crop(1), crop(2)], [1001, 1002], ["a.jpg", "b.jpg"])
+    # Samples and a label written, but the crash came before the source line.
+    with open(store.directory / "samples.u8", "ab") as f:
+        f.write(crop(3, size=20).tobytes())
+    with open(store.directory / "labels.i32", "ab") as f:
+        f.write(np.int32(1003).tobytes())
+
+    assert store.count() == 2
+    assert os.path.getsize(store.directory / "samples.u8") == 2 * 20 * 20
+
+
+def test_compact_keeps_rows_and_starts_a_new_generation(store):
+    store.append([crop(1), crop(2), crop(3)], [1001, 1002, 1003], ["a.jpg", "b.jpg", "c.jpg"])
+    generation = store.generation
+
+    store.compact(np.array([True, False, True]))
+    samples, labels = store.load()
+    assert samples[:, 0, 0].tolist() == [1, 3]
+    assert labels.tolist() == [1001, 1003]
+    assert store.sources() == ["a.jpg", "c.jpg"]
+    assert store.generation != generation
+
+
+def test_sync_migrates_the_tree_and_drops_deleted_images(tmp_path, monkeypatch):
+    store = SampleStore(tmp_path / "store", size=config.SAMPLE_SIZE)
+    monkeypatch.setattr(face_rec_service, "sample_store", store)
+    monkeypatch.setattr(config, "TRAINING_IMAGE_DIR", tmp_path / "TrainingImage")
+    for relative_path, value in (("1001_Ann/Ann_1001_1.jpg", 10), ("1001_Ann/Ann_1001_2.jpg", 200),
+                                 ("1002_Ben/Ben_1002_1.png", 90), ("notes/readme.jpg", 0)):
+        path = config.TRAINING_IMAGE_DIR / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(str(path), crop(value, size=120))
+
+    assert face_rec_service.sync_sample_store() == 3
+    assert store.load()[1].tolist() == [1001, 1001, 1002]
+
+    os.remove(config.TRAINING_IMAGE_DIR / "1001_Ann/Ann_1001_1.jpg")
+    generation = store.generation
+    assert face_rec_service.sync_sample_store() == 2
+    assert store.sources() == ["1001_Ann/Ann_1001_2.jpg", "1002_Ben/Ben_1002_1.png"]
+    assert store.generation != generation
+    # Re-syncing an up-to-date store changes nothing.
+    generation = store.generation
+    assert face_rec_service.sync_sample_store() == 2
+    assert store.generation == generation
@@ -0,0 +1,76 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from app import config
+from app.models.attendance import Student
+from app.services import face_rec_service
+from app.services.model_registry import shard_path
+from app.services.sample_store import sample_store
+
+
+def add_samples(count: int, seed: int):
+    """Enrolls `count` distinct random crops per student."""
+    rng = np.random.default_rng(seed)
+    for roll_number in ("1001", "1002"):
+        crops = [rng.integers(0, 256, (config.SAMPLE_SIZE, config.SAMPLE_SIZE), dtype=np.uint8) for _ in range(count)]
+        assert len(face_rec_service.store_face_samples(roll_number, roll_number, crops)) == count
+
+
+@pytest.fixture
+def store(db):
+    """An empty sample store and no trained model, for two students of class A."""
+    sample_store.reset()
+    shutil.rmtree(config.TRAINING_IMAGE_DIR)
+    config.TRAINING_IMAGE_DIR.mkdir()
+    for path in (config.TRAINED_MODEL_PATH, config.TRAINING_MANIFEST_PATH, shard_path("A")):
+        if os.path.exists(path):
+            os.remove(path)
+    for roll_number in ("1001", "1002"):
+        db.add(Student(name=roll_number, email=f"{roll_number}@example.com", hashed_password="x",
+                       rollNumber=roll_number, student_class="A"))
+    db.commit()
+
+
+def train(full: bool = False):
+    return face_rec_service._train_model(full, face_rec_service._no_progress)
+
+
+def live_files():
+    return {path: os.stat(path).st_mtime_ns for path in (config.TRAINED_MODEL_PATH, shard_path("A"))}
+
+
+def test_failed_shard_training_publishes_nothing(store, monkeypatch):
+    add_samples(2, seed=0)
+    assert train()["mode"] == "full"
+    before = live_files()
+    manifest = face_rec_service.read_training_manifest()
+
+    add_samples(1, seed=1)
+
+    def fail(*args):
+        raise RuntimeError("disk full")
+    monkeypatch.setattr(face_rec_service, "train_shards", fail)
+    with pytest.raises(Exception, match="disk full"):
+        train()
+
+    assert live_files() == before
+    assert face_rec_service.read_training_manifest() == manifest
+    assert not [f for f in os.listdir(config.TRAINED_MODEL_DIR) if ".tmp" in f]
+
+    # The retry picks up exactly the samples the failed run didn't publish.
+    monkeypatch.undo()
+    assert train() == {"message": "Model trained successfully for 2 users.", "mode": "incremental", "new_samples": 2}
+    assert face_rec_service.read_training_manifest()["rows"] == 6
+
+
+def test_full_training_removes_shards_of_vanished_classes(store):
+    add_samples(2, seed=0)
+    stale = config.MODEL_SHARD_DIR / "B-00000000.yml"
+    stale.write_text("stale")
+    train(full=True)
+    assert os.path.exists(shard_path("A"))
+    assert not os.path.exists(stale)
+    assert not [f for f in os.listdir(config.MODEL_SHARD_DIR) if ".tmp" in f]
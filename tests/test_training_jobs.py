@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from app.services import training_jobs as training_jobs_module
+from app.services.training_jobs import TrainingJobQueue
+
+
+@pytest.fixture
+def trainer(monkeypatch):
+    """Replaces train_model with one that blocks until released and records its runs."""
+    state = {"runs": [], "release": threading.Event(), "started": threading.Event()}
+
+    def train_model(full=False, progress=None):
+        state["runs"].append(full)
+        state["started"].set()
+        assert state["release"].wait(5)
+        return {"mode": "full" if full else "incremental"}
+
+    monkeypatch.setattr(training_jobs_module.face_rec_service, "train_model", train_model)
+    return state
+
+
+def wait_until_finished(*jobs):
+    deadline = time.monotonic() + 5
+    while any(job.status in ("queued", "running") for job in jobs):
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_requests_during_a_run_are_coalesced(trainer):
+    queue = TrainingJobQueue()
+    job = queue.submit()
+    assert trainer["started"].wait(5)
+    assert queue.submit() is job
+    trainer["release"].set()
+    wait_until_finished(job)
+    assert trainer["runs"] == [False]
+
+
+def test_full_rebuild_during_an_incremental_run_is_queued_as_a_follow_up(trainer):
+    queue = TrainingJobQueue()
+    incremental = queue.submit()
+    assert trainer["started"].wait(5)
+
+    follow_up = queue.submit(full=True)
+    assert follow_up is not incremental
+    assert follow_up.full and follow_up.status == "queued"
+    # Later requests coalesce into the follow-up.
+    assert queue.submit() is follow_up
+    assert queue.submit(full=True) is follow_up
+
+    trainer["release"].set()
+    wait_until_finished(incremental, follow_up)
+    assert trainer["runs"] == [False, True]
+    assert follow_up.status == "succeeded"
+
+
+def test_incremental_requests_during_a_full_run_are_coalesced(trainer):
+    queue = TrainingJobQueue()
+    running = queue.submit(full=True)
+    assert trainer["started"].wait(5)
+    assert queue.submit() is running
+    trainer["release"].set()
+    wait_until_finished(running)
+    assert trainer["runs"] == [True]
@@ -0,0 +1,44 @@
+from app.models.attendance import Student, User
+from app.services import auth_service
+from app.utils.cache import TTLCache
+
+
+def test_ttl_cache_expires_and_evicts_least_recently_used(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.utils.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_user_is_resolved_from_the_cache_until_invalidated(roster, monkeypatch):
+    monkeypatch.setattr(auth_service, "user_cache", TTLCache(maxsize=10, ttl=60))
+    user = auth_service.get_user_by_email(roster, "1001@example.com")
+    assert isinstance(user, Student) and user.rollNumber == "1001"
+
+    # Renamed behind the cache's back: the cached copy is still served...
+    roster.query(User).filter(User.email == "1001@example.com").update({"name": "Renamed"})
+    roster.commit()
+    roster.expunge_all()
+    assert auth_service.get_user_by_email(roster, "1001@example.com").name == "Student 1001"
+    assert auth_service.user_cache.stats()["hits"] == 1
+
+    # ...until the change is announced.
+    auth_service.invalidate_user("1001@example.com")
+    roster.expunge_all()
+    assert auth_service.get_user_by_email(roster, "1001@example.com").name == "Renamed"
+    assert auth_service.get_user_by_email(roster, "nobody@example.com") is None
+
+
+def test_cookie_user(roster, monkeypatch):
+    monkeypatch.setattr(auth_service, "user_cache", TTLCache(maxsize=10, ttl=60))
+    token = auth_service.create_access_token({"sub": "1002@example.com"})
+    assert auth_service.try_get_current_user(f"Bearer {token}", roster).rollNumber == "1002"
+    assert auth_service.try_get_current_user("Bearer not-a-token", roster) is None
+    assert auth_service.try_get_current_user(None, roster) is None
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from app import config
+from app.database import connection
+from app.services import warmup as warmup_module
+from app.services.warmup import WarmUp
+
+
+@pytest.fixture
+def steps(pools, monkeypatch):
+    """Fakes the database and worker pools; `state["db_failures"]` sets how often connecting fails."""
+    state = {"db_failures": 0, "connects": 0, "pools": pools}
+
+    def open_connections(count):
+        state["connects"] += 1
+        if state["connects"] <= state["db_failures"]:
+            raise ConnectionError("database down")
+
+    pools.recognition.respond = pools.enrollment.respond = lambda fn, with_model: False
+    monkeypatch.setattr(warmup_module, "_open_connections", open_connections)
+    monkeypatch.setattr(config, "WARMUP_RETRY_INTERVAL", 0)
+    return state
+
+
+def test_skips_the_async_engine_without_its_driver(steps, monkeypatch):
+    monkeypatch.setattr(connection, "async_engine_unavailable", lambda: "No module named 'aiomysql'")
+    monkeypatch.setattr(connection, "get_async_sessionmaker", lambda: pytest.fail("async engine created"))
+    warm = WarmUp()
+    asyncio.run(warm.run())
+    assert warm.ready
+    assert warm.steps["database"]["ok"]
+    assert "async engine skipped" in warm.steps["database"]["detail"]
+
+
+def test_gives_up_on_the_database_after_the_attempt_limit(steps, monkeypatch):
+    monkeypatch.setattr(config, "WARMUP_DB_MAX_ATTEMPTS", 3)
+    steps["db_failures"] = 100
+    warm = WarmUp()
+    asyncio.run(warm.run())
+    assert steps["connects"] == 3
+    assert warm.ready and not warm.steps["database"]["ok"]
+
+
+def test_warms_the_worker_pools_not_the_api_process(steps, monkeypatch):
+    monkeypatch.setattr(connection, "async_engine_unavailable", lambda: "not installed")
+    monkeypatch.setattr(warmup_module, "dummy_inference", lambda *args: pytest.fail("ran in the API process"))
+    steps["db_failures"] = 1
+    warm = WarmUp()
+    asyncio.run(warm.run())
+    assert set(warm.steps) == {"database", "recognition_workers", "enrollment_workers"}
+    assert steps["connects"] == 2
+    assert len(steps["pools"].recognition.calls) == steps["pools"].recognition.workers
+    assert len(steps["pools"].enrollment.calls) == steps["pools"].enrollment.workers
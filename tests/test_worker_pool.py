@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.worker_pool import WorkerPool
+
+
+def test_full_queue_is_rejected_with_503():
+    pool = WorkerPool("test", workers=1, max_pending=1, timeout=5)
+    pool._pending = 1
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(pool.run(time.sleep, 0))
+    assert error.value.status_code == 503
+    assert error.value.headers == {"Retry-After": "1"}
+    # Nothing was started for the rejected job.
+    assert pool._executor is None
+
+
+def test_slow_job_times_out_with_504_and_keeps_its_slot_until_done():
+    pool = WorkerPool("test", workers=1, max_pending=4, timeout=30)
+    try:
+        # Start the worker first, so the timeout measures the job, not process start-up.
+        asyncio.run(pool.run(time.sleep, 0))
+        pool.timeout = 0.5
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(pool.run(time.sleep, 2))
+        assert error.value.status_code == 504
+        assert pool.pending == 1
+    finally:
+        pool.shutdown()
+
+
+def test_job_results_are_returned():
+    pool = WorkerPool("test", workers=1, max_pending=4, timeout=30)
+    try:
+        assert asyncio.run(pool.run(divmod, 7, 2)) == (3, 1)
+        assert pool.pending == 0
+    finally:
+        pool.shutdown()